@@ -24,6 +24,8 @@ from janis_core import (
 from janis_core.translations import CwlTranslator
 from requests.utils import requote_uri
 
+from janisdk.shed.registry import ToolEntry
+
 
 class TocObject:
     def __init__(self, title, description, url):
@@ -150,7 +152,7 @@ def get_toc(title, intro_text, subpages, caption="Contents", max_depth=1):
 
 
 def get_tool_toc(
-    alltoolsmap: Dict[str, Dict[str, Tool]],
+    alltoolsmap: Dict[str, Dict[str, ToolEntry]],
     title,
     intro_text,
     subpages,
@@ -241,12 +243,16 @@ def prepare_container_warning_for_workflow(tool: Workflow):
     """
 
 
-def get_tool_row(tools: Dict[str, Tool]):
-    distincted = {t.version(): t for t in tools.values()}
-    versions = sort_tool_versions(list(distincted.keys()))
+def get_tool_row(tools: Dict[str, ToolEntry]):
+    versions = sort_tool_versions(list(tools.keys()))
     latestversion = versions[0]
 
-    tool = distincted[latestversion]
+    entry = tools[latestversion]
+    was_loaded = entry.is_loaded
+    tool = entry.tool()
+    if not was_loaded:
+        entry.release()
+
     meta: Metadata = tool.bind_metadata() or tool.metadata
     sd = meta.short_documentation
     sdstr = f'<p style="color: black; margin-bottom: 10px">{sd}' if sd else ""
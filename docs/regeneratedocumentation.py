@@ -33,6 +33,8 @@ from janis_core import (
 )
 
 import janis_unix, janis_bioinformatics
+from janisdk.shed.hydrationcache import ShedSnapshot
+from janisdk.shed.registry import ToolRegistry
 
 # Import modules here so that the tool toolbox knows about them
 
@@ -114,12 +116,12 @@ def prepare_tool(
 
 
 def prepare_all_tools():
-    JanisShed.hydrate(modules=[janis_unix, janis_bioinformatics])
+    # The snapshot only re-imports the modules that changed since the last run
+    shed = ShedSnapshot(modules=[janis_unix, janis_bioinformatics]).hydrate()
 
-    data_types = JanisShed.get_all_datatypes()
-    tools = {
-        ts[0].id(): {t.version(): t for t in ts} for ts in JanisShed.get_all_tools()
-    }
+    data_types = shed.get_all_datatypes()
+    # {id: {version: ToolEntry}}, tools are only built when they're documented
+    tools = ToolRegistry.from_snapshot(shed).by_id()
 
     Logger.info(f"Preparing documentation for {len(tools)} tools")
     Logger.info(f"Preparing documentation for {len(data_types)} data_types")
@@ -139,9 +141,7 @@ def prepare_all_tools():
             f"Preparing {toolname}, found {len(tool_versions)} version[s] ({','.join(tool_versions)})"
         )
 
-        defaulttool = toolsbyversion[default_version]
-        if isclass(defaulttool):
-            defaulttool = defaulttool()
+        defaulttool = toolsbyversion[default_version].tool()
         try:
             tool_path_components = list(
                 filter(
@@ -155,7 +155,8 @@ def prepare_all_tools():
 
         # (toolURL, tool, isPrimary)
         toolurl_to_tool = [(toolname.lower(), defaulttool, True)] + [
-            (get_tool_url(toolname, v), toolsbyversion[v], False) for v in tool_versions
+            (get_tool_url(toolname, v), toolsbyversion[v].tool(), False)
+            for v in tool_versions
         ]
 
         path_components = "/".join(tool_path_components)
@@ -178,6 +179,9 @@ def prepare_all_tools():
             tool_module_index, tool_path_components, toolname, root_key=ROOT_KEY
         )
 
+        for entry in toolsbyversion.values():
+            entry.release()
+
         Logger.log("Prepared " + toolname)
 
     for d in data_types:
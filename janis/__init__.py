@@ -25,3 +25,12 @@ _Proudly made on Planet Earth._
 
 from janis_core.__meta__ import __version__
 from janis_core import *
+import janis_core as _janis_core
+from janis_core.toolbox.entrypoints import TOOLS
+from janis.extensions import ExtensionLoader, SymbolIndex, lazy_namespace
+
+# Extensions are only imported when one of their symbols is first accessed, and
+# `from janis import *` exports what janis_core does (not the helpers above)
+_public = [k for k in vars(_janis_core) if not k.startswith("_")]
+_loader = ExtensionLoader(TOOLS, "extension", index=SymbolIndex(TOOLS))
+__getattr__, __dir__ = lazy_namespace(globals(), _loader, _public)
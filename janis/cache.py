@@ -0,0 +1,21 @@
+import os
+
+
+def get_cache_dir(*components: str) -> str:
+    """
+    Directory that janis (and janisdk) can keep its caches in, this is:
+
+        - $JANIS_CACHEDIR, or
+        - $JANIS_CONFIGDIR/cache, or
+        - ~/.janis/cache
+
+    The directory is NOT created, as callers should handle a read-only home.
+    """
+    base = os.getenv("JANIS_CACHEDIR")
+    if not base:
+        configdir = os.getenv("JANIS_CONFIGDIR") or os.path.join(
+            os.path.expanduser("~"), ".janis"
+        )
+        base = os.path.join(configdir, "cache")
+
+    return os.path.join(base, *components)
@@ -0,0 +1,319 @@
+"""
+Lazy loading of the Janis extensions (tool sheds, data types).
+
+The `janis`, `janis.tools` and `janis.data_types` namespaces used to load every
+installed extension (and copy every public symbol into their globals) as soon as
+they were imported. With a few sheds installed that makes `import janis` take
+several seconds, so instead each namespace now owns an `ExtensionLoader`, and
+resolves a symbol through its module-level `__getattr__` the first time it's
+accessed, importing only the extensions it needs to find it.
+
+Finding which extension exports a symbol would still mean importing the
+extensions, so the loader keeps a `SymbolIndex` on disk (in the janis cache dir)
+that maps each symbol to its extension. It's keyed on the installed
+distributions (name, version, and a hash of their RECORD or metadata), so it's
+rebuilt automatically when an extension is installed, upgraded or removed. A
+symbol that isn't in an up to date index doesn't exist, so looking it up (eg:
+hasattr) doesn't import any extension, other than one that failed to import
+when the index was built (eg: a dependency wasn't installed yet), which is
+retried once in each process. An editable install that has gained a
+symbol since the index was built needs `janisdk index` to rebuild it, which
+also prints the index.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from janis_core.utils.logger import Logger
+
+from janis.cache import get_cache_dir
+
+
+class SymbolIndex:
+    """
+    On-disk map of {symbol: entrypoint name} for one entry point group.
+    """
+
+    VERSION = 1
+
+    def __init__(self, group: str, path: Optional[str] = None):
+        self.group = group
+        self.path = path or get_cache_dir(f"symbols.{group}.json")
+
+        self.key: Optional[list] = None
+        # symbol -> entrypoint name
+        self.symbols: Dict[str, str] = {}
+        # entrypoint name -> module
+        self.modules: Dict[str, str] = {}
+        # entrypoints that failed to import when the index was built
+        self.failed: List[str] = []
+
+    @staticmethod
+    def compute_key(entrypoints: list) -> list:
+        key = []
+        for entrypoint in entrypoints:
+            dist = getattr(entrypoint, "dist", None)
+            name, version, fingerprint = None, None, None
+            if dist is not None:
+                name, version = dist.name, dist.version
+                # the RECORD has the hash of every installed file, so it changes
+                # when an extension is reinstalled with different contents
+                for filename in ["RECORD", "METADATA", "PKG-INFO"]:
+                    try:
+                        text = dist.read_text(filename)
+                    except OSError:
+                        text = None
+                    if text:
+                        fingerprint = hashlib.sha256(text.encode()).hexdigest()
+                        break
+            key.append([entrypoint.name, entrypoint.value, name, version, fingerprint])
+        return key
+
+    def read(self) -> bool:
+        try:
+            with open(self.path) as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if d.get("version") != self.VERSION or d.get("group") != self.group:
+            return False
+
+        self.key = d.get("key")
+        self.symbols = d.get("symbols", {})
+        self.modules = d.get("modules", {})
+        self.failed = d.get("failed", [])
+        return True
+
+    def write(self):
+        d = {
+            "version": self.VERSION,
+            "group": self.group,
+            "key": self.key,
+            "symbols": self.symbols,
+            "modules": self.modules,
+            "failed": self.failed,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w+") as f:
+                json.dump(d, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            Logger.debug(f"Couldn't write janis symbol index to '{self.path}': {e}")
+
+    def is_valid_for(self, entrypoints: list) -> bool:
+        # round trip through json so tuples / floats compare the same way
+        key = json.loads(json.dumps(self.compute_key(entrypoints)))
+        return self.key is not None and self.key == key
+
+    def rebuild(self, loader: "ExtensionLoader"):
+        """
+        Import every extension and record the symbols each one exports. When
+        two extensions export the same symbol the last one wins.
+        """
+        entrypoints = loader.entrypoints()
+        self.key = self.compute_key(entrypoints)
+        self.symbols, self.modules, self.failed = {}, {}, []
+
+        for entrypoint in entrypoints:
+            self.modules[entrypoint.name] = entrypoint.value
+            m = loader.load(entrypoint)
+            if m is None:
+                self.failed.append(entrypoint.name)
+                continue
+            for k in m.__dict__:
+                if not k.startswith("_"):
+                    self.symbols[k] = entrypoint.name
+
+        self.write()
+
+    def add(self, entrypoints: list, name: str, module):
+        """
+        Add the symbols of an extension that failed to import when the index was
+        built, unless an extension registered after it exports them too
+
+        :param entrypoints: every entrypoint of the group, in order
+        """
+        order = {e.name: i for i, e in enumerate(entrypoints)}
+        for k in module.__dict__:
+            if k.startswith("_"):
+                continue
+            owner = self.symbols.get(k)
+            if owner is None or order.get(owner, -1) < order[name]:
+                self.symbols[k] = name
+        self.failed = [f for f in self.failed if f != name]
+
+
+class ExtensionLoader:
+    """
+    Resolves public symbols from the modules bound to an entry point group,
+    importing each extension at most once, and only when it's needed.
+    """
+
+    def __init__(
+        self, group: str, description: str, index: Optional[SymbolIndex] = None
+    ):
+        """
+        :param group: entry point group, eg: janis_core.toolbox.entrypoints.TOOLS
+        :param description: how to describe the extension when it fails to import,
+            eg: "Couldn't import janis {description} '{name}'"
+        :param index: Persistent symbol index, if None every lookup walks the extensions
+        """
+        self.group = group
+        self.description = description
+        self.index = index
+        self._index_checked = False
+
+        self._entrypoints = None
+        # entrypoint name -> module (None if it failed to import)
+        self._loaded: Dict[str, Optional[object]] = {}
+
+    def entrypoints(self) -> list:
+        if self._entrypoints is None:
+            import importlib_metadata
+
+            self._entrypoints = list(
+                importlib_metadata.entry_points().get(self.group, [])
+            )
+        return self._entrypoints
+
+    def load(self, entrypoint):
+        if entrypoint.name in self._loaded:
+            return self._loaded[entrypoint.name]
+
+        m = None
+        try:
+            m = entrypoint.load()
+        except ImportError as e:
+            Logger.critical(
+                f"Couldn't import janis {self.description} '{entrypoint.name}': {e}"
+            )
+
+        self._loaded[entrypoint.name] = m
+        return m
+
+    def get_index(self, rebuild=False) -> Optional[SymbolIndex]:
+        """
+        Return the symbol index, (re)building it if the installed extensions
+        don't match the index on disk.
+        """
+        if self.index is None:
+            return None
+        if rebuild or not self._index_checked:
+            self._index_checked = True
+            if rebuild or not (
+                self.index.read() and self.index.is_valid_for(self.entrypoints())
+            ):
+                Logger.log(f"Rebuilding janis symbol index for '{self.group}'")
+                self.index.rebuild(self)
+        return self.index
+
+    def _retry_failed(self, index: SymbolIndex):
+        """
+        Import the extensions that failed to import when the index was built
+        (each at most once in this process), and add the symbols of those that
+        now import to the index
+        """
+        added = False
+        for entrypoint in self.entrypoints():
+            if entrypoint.name not in index.failed or entrypoint.name in self._loaded:
+                continue
+            m = self.load(entrypoint)
+            if m is not None:
+                index.add(self.entrypoints(), entrypoint.name, m)
+                added = True
+        if added:
+            index.write()
+
+    def resolve(self, name: str):
+        """
+        Find the extension that exports 'name', and return that value. When two
+        extensions export the same symbol, the last registered extension wins (as
+        it did when every symbol was copied into the namespace on import).
+
+        :raises AttributeError: if no extension exports 'name'
+        """
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        # get_index rebuilds an index that doesn't match the installed extensions
+        index = self.get_index()
+        if index is not None:
+            if name not in index.symbols and index.failed:
+                self._retry_failed(index)
+            if name not in index.symbols:
+                raise AttributeError(name)
+            for entrypoint in self.entrypoints():
+                if entrypoint.name == index.symbols[name]:
+                    m = self.load(entrypoint)
+                    if m is not None and name in m.__dict__:
+                        return m.__dict__[name]
+
+        # No index, or the extension the index has no longer exports it (eg: an
+        # editable install), so look through the extensions
+        for entrypoint in reversed(self.entrypoints()):
+            m = self.load(entrypoint)
+            if m is not None and name in m.__dict__:
+                if index is not None:
+                    index.rebuild(self)
+                return m.__dict__[name]
+
+        raise AttributeError(name)
+
+    def symbols(self) -> List[str]:
+        """
+        All public symbols exported by the extensions, from the symbol index if
+        there is one, otherwise this loads EVERY extension.
+        """
+        index = self.get_index()
+        if index is not None:
+            return sorted(index.symbols)
+
+        names = set()
+        for entrypoint in self.entrypoints():
+            m = self.load(entrypoint)
+            if m is None:
+                continue
+            names.update(k for k in m.__dict__ if not k.startswith("_"))
+        return sorted(names)
+
+
+def lazy_namespace(
+    namespace: dict, loader: ExtensionLoader, public: Iterable[str] = ()
+):
+    """
+    Build the module-level (PEP 562) __getattr__ and __dir__ for a namespace
+    module, which should be bound as:
+
+        __getattr__, __dir__ = lazy_namespace(globals(), loader, public)
+
+    A resolved symbol is cached in the namespace, so __getattr__ is only ever
+    called once per symbol. The `__all__` is the namespace's own `public` names
+    plus the symbol names of the extensions, so `from janis import *` still
+    exports every extension symbol (but not the helpers that built the
+    namespace), and building it doesn't import any extension.
+    """
+    public = list(public)
+
+    def __getattr__(name: str):
+        if name == "__all__":
+            return sorted(set(public).union(loader.symbols()))
+
+        try:
+            value = loader.resolve(name)
+        except AttributeError:
+            raise AttributeError(
+                f"module '{namespace['__name__']}' has no attribute '{name}'"
+            )
+
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace).union(loader.symbols()))
+
+    return __getattr__, __dir__
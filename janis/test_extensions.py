@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from types import ModuleType
+
+from janis.extensions import ExtensionLoader, SymbolIndex, lazy_namespace
+
+
+class MockEntryPoint:
+    def __init__(self, name, module=None):
+        self.name = name
+        self.value = name
+        self.module = module
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        if self.module is None:
+            raise ImportError(f"No module named '{self.name}'")
+        return self.module
+
+
+def mock_module(name, **symbols):
+    m = ModuleType(name)
+    m.__dict__.update(symbols)
+    return m
+
+
+def mock_loader(*entrypoints, index=None):
+    loader = ExtensionLoader("janis.test", "extension", index=index)
+    loader._entrypoints = list(entrypoints)
+    return loader
+
+
+class TestExtensionLoader(unittest.TestCase):
+    def test_only_imports_required_extension(self):
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        last = MockEntryPoint("last", mock_module("last", Cat=2))
+        loader = mock_loader(first, last)
+
+        self.assertEqual(2, loader.resolve("Cat"))
+        self.assertEqual(0, first.loads)
+        self.assertEqual(1, last.loads)
+
+    def test_last_extension_wins(self):
+        loader = mock_loader(
+            MockEntryPoint("first", mock_module("first", Echo=1)),
+            MockEntryPoint("last", mock_module("last", Echo=2)),
+        )
+        self.assertEqual(2, loader.resolve("Echo"))
+
+    def test_failed_import_is_only_attempted_once(self):
+        broken = MockEntryPoint("broken")
+        loader = mock_loader(broken)
+        self.assertRaises(AttributeError, loader.resolve, "Echo")
+        self.assertRaises(AttributeError, loader.resolve, "Cat")
+        self.assertEqual(1, broken.loads)
+
+    def test_private_symbols_are_not_resolved(self):
+        loader = mock_loader(MockEntryPoint("ext", mock_module("ext", _private=1)))
+        self.assertRaises(AttributeError, loader.resolve, "_private")
+
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "symbols.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_index_is_reused(self):
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        last = MockEntryPoint("last", mock_module("last", Cat=2))
+        mock_loader(first, last, index=SymbolIndex("janis.test", self.path)).resolve(
+            "Cat"
+        )
+
+        first2 = MockEntryPoint("first", mock_module("first", Echo=1))
+        last2 = MockEntryPoint("last", mock_module("last", Cat=2))
+        loader = mock_loader(first2, last2, index=SymbolIndex("janis.test", self.path))
+
+        self.assertEqual(1, loader.resolve("Echo"))
+        self.assertEqual(1, first2.loads)
+        self.assertEqual(0, last2.loads)
+
+    def test_missing_symbol_does_not_import_extensions(self):
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        mock_loader(first, index=SymbolIndex("janis.test", self.path)).get_index()
+
+        first2 = MockEntryPoint("first", mock_module("first", Echo=1))
+        loader = mock_loader(first2, index=SymbolIndex("janis.test", self.path))
+        self.assertRaises(AttributeError, loader.resolve, "NotARealSymbol")
+        self.assertEqual(0, first2.loads)
+
+    def test_index_rebuilt_when_extension_added(self):
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        mock_loader(first, index=SymbolIndex("janis.test", self.path)).resolve("Echo")
+
+        added = MockEntryPoint("added", mock_module("added", Cat=2))
+        index = SymbolIndex("janis.test", self.path)
+        loader = mock_loader(first, added, index=index)
+
+        self.assertEqual(2, loader.resolve("Cat"))
+        self.assertEqual("added", index.symbols["Cat"])
+
+    def test_index_records_failed_extensions(self):
+        index = SymbolIndex("janis.test", self.path)
+        mock_loader(MockEntryPoint("broken"), index=index).get_index()
+        self.assertListEqual(["broken"], index.failed)
+
+    def test_failed_extension_is_retried(self):
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        mock_loader(
+            first, MockEntryPoint("later"), index=SymbolIndex("janis.test", self.path)
+        ).get_index()
+
+        # its dependency was installed since
+        later = MockEntryPoint("later", mock_module("later", Cat=2, Echo=3))
+        index = SymbolIndex("janis.test", self.path)
+        loader = mock_loader(first, later, index=index)
+        self.assertEqual(2, loader.resolve("Cat"))
+        self.assertEqual([], index.failed)
+        # it's registered last, so it wins
+        self.assertEqual("later", index.symbols["Echo"])
+
+        # and it's in the index for the next process
+        first = MockEntryPoint("first", mock_module("first", Echo=1))
+        later = MockEntryPoint("later", mock_module("later", Cat=2, Echo=3))
+        loader = mock_loader(first, later, index=SymbolIndex("janis.test", self.path))
+        self.assertEqual(2, loader.resolve("Cat"))
+        self.assertRaises(AttributeError, loader.resolve, "NotARealSymbol")
+        self.assertEqual((0, 1), (first.loads, later.loads))
+
+    def test_failed_extension_is_retried_once(self):
+        mock_loader(
+            MockEntryPoint("broken"), index=SymbolIndex("janis.test", self.path)
+        ).get_index()
+
+        broken = MockEntryPoint("broken")
+        loader = mock_loader(broken, index=SymbolIndex("janis.test", self.path))
+        self.assertRaises(AttributeError, loader.resolve, "Echo")
+        self.assertRaises(AttributeError, loader.resolve, "Cat")
+        self.assertEqual(1, broken.loads)
+
+
+class TestLazyNamespace(unittest.TestCase):
+    def test_getattr_caches_value(self):
+        namespace = {"__name__": "janis.test", "Core": 0}
+        loader = mock_loader(MockEntryPoint("ext", mock_module("ext", Echo=1)))
+        getattr_, _ = lazy_namespace(namespace, loader)
+
+        self.assertEqual(1, getattr_("Echo"))
+        self.assertEqual(1, namespace["Echo"])
+
+    def test_all_includes_extensions(self):
+        namespace = {"__name__": "janis.test", "Core": 0, "lazy_namespace": 1}
+        loader = mock_loader(MockEntryPoint("ext", mock_module("ext", Echo=1)))
+        getattr_, _ = lazy_namespace(namespace, loader, ["Core"])
+
+        self.assertListEqual(["Core", "Echo"], getattr_("__all__"))
+
+    def test_all_does_not_import_extensions(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index = SymbolIndex("janis.test", os.path.join(tmpdir, "symbols.json"))
+            mock_loader(
+                MockEntryPoint("ext", mock_module("ext", Echo=1)), index=index
+            ).get_index()
+
+            ext = MockEntryPoint("ext", mock_module("ext", Echo=1))
+            loader = mock_loader(ext, index=SymbolIndex("janis.test", index.path))
+            getattr_, _ = lazy_namespace({"__name__": "janis.test"}, loader)
+
+            self.assertListEqual(["Echo"], getattr_("__all__"))
+            self.assertEqual(0, ext.loads)
@@ -0,0 +1,36 @@
+def add_index_args(parser):
+    parser.description = (
+        "Print (or rebuild) the on-disk index that maps the symbols exported by "
+        "janis extensions (tools and data types) to the extension that exports them"
+    )
+
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the index, even if the installed extensions haven't changed",
+    )
+    parser.add_argument(
+        "--symbols",
+        action="store_true",
+        help="Print every symbol and the module it's exported from",
+    )
+
+    return parser
+
+
+def do_index(args):
+    from janis_core.toolbox.entrypoints import TOOLS, DATATYPES
+    from janis.extensions import ExtensionLoader, SymbolIndex
+
+    for group, attr in [(TOOLS, "extension"), (DATATYPES, "types")]:
+        loader = ExtensionLoader(group, attr, index=SymbolIndex(group))
+        index = loader.get_index(rebuild=args.rebuild)
+
+        print(f"{group}: {len(index.symbols)} symbols ({index.path})")
+        for name, module in index.modules.items():
+            failed = " (FAILED TO IMPORT)" if name in index.failed else ""
+            print(f"    {name}: {module}{failed}")
+
+        if args.symbols:
+            for symbol, name in sorted(index.symbols.items()):
+                print(f"    {symbol}\t{index.modules.get(name, name)}")
@@ -1,46 +1,108 @@
 import argparse, sys, os, subprocess
 
-from janis_core import Logger
-
+# Only the argument definitions are imported here, each subcommand imports its
+# (heavy) dependencies when it's run, so `janisdk --help` or `janisdk version`
+# don't pay for importing janis_core, janis_assistant or the engines.
 from janisdk.container import do_container, add_container_args
 from janisdk.fromcwl import do_fromcwl, add_fromcwl_args
 from janisdk.fromwdl import do_fromwdl, add_fromwdl_args
-from janisdk.runtest import runner as test_runner
-
-from janis_assistant.management.configuration import JanisConfiguration
+from janisdk.index import do_index, add_index_args
+from janisdk.runtest import add_runtest_args
+from janisdk.server import do_serve, add_serve_args, forward_to_server
 
 
-def process_args():
-    cmds = {"container": do_container, "run-test": do_runtest, "fromcwl": do_fromcwl, "fromwdl": do_fromwdl}
-
+def build_parser():
     parser = argparse.ArgumentParser(description="Execute a workflow")
     subparsers = parser.add_subparsers(help="subcommand help", dest="command")
     parser.add_argument("-d", "--debug", action="store_true")
 
     subparsers.add_parser("version")
     add_container_args(subparsers.add_parser("container"))
-    test_runner.add_runtest_args(subparsers.add_parser("run-test"))
+    add_runtest_args(subparsers.add_parser("run-test"))
     add_fromcwl_args(subparsers.add_parser("fromcwl"))
     add_fromwdl_args(subparsers.add_parser("fromwdl"))
+    add_index_args(subparsers.add_parser("index"))
+    add_serve_args(subparsers.add_parser("serve"))
+
+    return parser
+
+
+def process_args():
+    argv = sys.argv[1:]
+    args = build_parser().parse_args(argv)
+
+    # Forward to a warm `janisdk serve` process if there's one running
+    if args.command not in (None, "version", "serve"):
+        rc = forward_to_server(argv)
+        if rc is not None:
+            sys.exit(rc)
+
+    return run_command(argv)
+
+
+def run_command(argv):
+    cmds = {
+        "version": do_version,
+        "container": do_container,
+        "run-test": do_runtest,
+        "fromcwl": do_fromcwl,
+        "fromwdl": do_fromwdl,
+        "index": do_index,
+        "serve": do_serve,
+    }
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.command:
+        return parser.print_help()
 
-    args = parser.parse_args()
     return cmds[args.command](args)
 
 
+def do_version(args):
+    # importing janis.__meta__ would run janis/__init__ (and import janis_core),
+    # so read it like setup.py does
+    import importlib.util
+
+    spec = importlib.util.find_spec("janis")
+    meta = {}
+    with open(os.path.join(spec.submodule_search_locations[0], "__meta__.py")) as f:
+        exec(f.read(), meta)
+
+    print(meta["__version__"])
+
+
 def do_runtest(args):
+    import time
+
+    start = time.time()
+    from janis_core import Logger
+    from janisdk.runtest import runner as test_runner
+
     config = None
     if args.config:
+        from janis_assistant.management.configuration import JanisConfiguration
+
         config = JanisConfiguration.initial_configuration(path=args.config)
 
+    Logger.info(f"Importing the test runner took {time.time() - start:.2f}s")
+
     runner_path = test_runner.__file__
 
     cli_args = sys.argv[2:]
     run_test_commands = ["python", runner_path] + cli_args
 
+    commands = run_test_commands
     if config:
         commands = config.template.template.prepare_run_test_command(run_test_commands)
-    else:
-        commands = run_test_commands
+
+    # Only re-exec when the template wraps the command (eg: to submit it to a
+    # cluster), otherwise run it here with janis and the shed already imported
+    # (or with --array, where each element of the job array is submitted instead,
+    # and --watch, which needs to be where the modules are being edited)
+    if commands == run_test_commands or args.array or args.watch:
+        Logger.info("Running test in-process")
+        return test_runner.execute(args)
 
     joined_command = "' '".join(commands)
     Logger.info(f"Deploying test with command: '{joined_command}'")
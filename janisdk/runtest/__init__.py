@@ -0,0 +1,181 @@
+import argparse
+
+
+def add_runtest_args(parser):
+    parser.add_argument("tool", nargs="?", help="Name of tool to test")
+
+    parser.add_argument(
+        "--all-tools",
+        action="store_true",
+        help="Run the test cases of every tool in the shed (that has tests), "
+        "scheduled by the resources each tool needs, longest first",
+    )
+    parser.add_argument(
+        "--changed-since",
+        metavar="GIT_REF",
+        help="Run the test cases of the tools in the shed that the changes since "
+        "this git ref (in the repository of the current directory, including "
+        "uncommitted changes) affect, through the data types, base classes and "
+        "sub-tools they're built from",
+    )
+    parser.add_argument(
+        "--module",
+        action="append",
+        help="With --all-tools or --changed-since, only test tools from this "
+        "module (eg: bioinformatics)",
+    )
+    parser.add_argument(
+        "--provider",
+        action="append",
+        help="With --all-tools or --changed-since, only test tools from this "
+        "provider (eg: samtools)",
+    )
+
+    parser.add_argument(
+        "--test-case", help="Name of test case as listed in tool.tests()"
+    )
+
+    # EngineType.cromwell, but without importing janis_assistant to build the parser
+    parser.add_argument("-e", "--engine", help="engine", default="cromwell")
+
+    parser.add_argument("-c", "--config", help="Path to janis config")
+
+    parser.add_argument(
+        "-o", "--output", help="Dry run test by providing a dictionary of output"
+    )
+
+    parser.add_argument(
+        "--replay",
+        help="Check the recorded outputs in this JSON-lines file (or directory of "
+        "them) against the expected outputs of their test cases, without running "
+        "an engine. Each line is: "
+        '{"tool": ..., "test_case": ..., "output": {...}}',
+    )
+    parser.add_argument(
+        "--replay-report",
+        help="With --replay, where to write the combined report "
+        "(default: tests_output/replay_report.json)",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Run up to N test cases concurrently, capped by the cpus and memory "
+        "the tools declare, and what this machine has (default: 1, or with "
+        "--all-tools, as many as the machine can fit)",
+    )
+
+    parser.add_argument(
+        "--array",
+        action="store_true",
+        help="With a --config whose template submits to a scheduler (eg: slurm), "
+        "submit the test cases of the tool (or --all-tools) as one job array, wait "
+        "for it, and report the results of every element",
+    )
+    # the job array batch directory an element runs a test case of
+    parser.add_argument("--array-element", help=argparse.SUPPRESS)
+
+    parser.add_argument(
+        "--queue",
+        help="A work queue directory on a filesystem shared by the nodes: add the "
+        "test cases of the tool (or --all-tools) to it, to be run by --worker",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="With --queue, claim and run test cases from the queue until it's "
+        "finished (start one on each node), then print the report of every job",
+    )
+
+    parser.add_argument(
+        "--engine-session",
+        action="store_true",
+        help="Start one Cromwell server, submit every test case (of the tool, "
+        "--all-tools or the --worker) to it, and stop it at the end, instead of "
+        "starting Cromwell for each test case",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Run the test cases of the tool, then watch its modules (and those of "
+        "its sub-tools and data types) and rerun the test cases whose definition "
+        "changed each time one is saved",
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Once a test case of a tool fails, skip its remaining test cases and "
+        "abort its running ones, and abort each test case as soon as one of its "
+        "jobs fails",
+    )
+
+    parser.add_argument(
+        "--fast-fixtures",
+        action="store_true",
+        help="Run the test cases with small versions of their FASTQ, VCF and BAM "
+        "inputs (the first 1000 reads or records, set JANISDK_FIXTURE_RECORDS "
+        "to change it, and JANISDK_FIXTURE_REGION to take the reads of an "
+        "indexed BAM from one region or contig), generated once and cached",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run the test cases even if there's a cached result (and nothing the "
+        "result depends on, eg: the tool, its containers, the test inputs, has changed)",
+    )
+
+    parser.add_argument(
+        "--no-input-store",
+        action="store_true",
+        help="Don't stage the remote test inputs from the local input store (shared "
+        "by the test runs on this machine), let janis localise them",
+    )
+
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Show the recorded runs (of the tool / test case if given) instead of "
+        "running the tests, with the runs that regressed from their baseline",
+    )
+    parser.add_argument(
+        "--regression-tolerance",
+        type=float,
+        default=0.25,
+        help="Flag a test case whose wall time or peak memory moved by more than "
+        "this fraction from the median of its previous runs (default: 0.25)",
+    )
+
+    parser.add_argument(
+        "--timings-json",
+        help="Write how long each phase (eg: resolving the tool, running the engine, "
+        "comparing the outputs) of each test case took to this JSON file",
+    )
+
+    # For updating test-framework API endpoint
+    parser.add_argument(
+        "--test-manager-url", help="API endpoint to update run status in Test Manager"
+    )
+
+    parser.add_argument(
+        "--test-manager-token", help="Authentication token for Test Manager API"
+    )
+
+    parser.add_argument(
+        "--test-id",
+        help="Test identification to be attached to the notification message",
+    )
+
+    parser.add_argument(
+        "--slack-notification-url", help="Slack webhook to send notifications to"
+    )
+
+    parser.add_argument(
+        "--batch-report",
+        action="store_true",
+        help="Send one Test Manager update and one Slack summary for the whole run, "
+        "instead of one per test case",
+    )
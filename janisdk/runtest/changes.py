@@ -0,0 +1,86 @@
+"""
+run-test --changed-since <git ref>: only run the test cases of the tools that
+the changes (since the ref, including the uncommitted ones) could affect.
+
+The changed files are mapped to the shed modules they're the source of, and
+through the shed's DependencyIndex to the tools built from those modules (and
+the workflows that use them). Changed files that test cases point at (eg: an
+expected output) select those tools too.
+"""
+
+import os
+import subprocess
+import sys
+from typing import List, Optional, Set
+
+from janis_core import Logger
+
+from janisdk.shed.dependencyindex import DependencyIndex, ToolKey
+from janisdk.shed.registry import ToolRegistry
+
+
+def _git(args: List[str], cwd: Optional[str] = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def get_changed_files(ref: str, cwd: Optional[str] = None) -> Set[str]:
+    """
+    The (real) paths of the files that changed since ref, in the git repository
+    of cwd: committed since its merge base with ref (so the changes on ref's
+    branch don't count), uncommitted or untracked
+    """
+    toplevel = _git(["rev-parse", "--show-toplevel"], cwd=cwd).strip()
+    try:
+        base = _git(["merge-base", ref, "HEAD"], cwd=toplevel).strip()
+    except Exception:
+        base = ref
+
+    changed = _git(["diff", "--name-only", base, "--"], cwd=toplevel).splitlines()
+    changed += _git(
+        ["ls-files", "--others", "--exclude-standard"], cwd=toplevel
+    ).splitlines()
+    return {os.path.realpath(os.path.join(toplevel, p)) for p in changed if p}
+
+
+def get_changed_modules(changed_files: Set[str]) -> Set[str]:
+    """
+    The names of the (imported) modules whose source is one of changed_files
+    """
+    modules = set()
+    for modname, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.realpath(path) in changed_files:
+            modules.add(modname)
+    return modules
+
+
+def find_affected_tools(
+    ref: str, registry: Optional[ToolRegistry] = None, cwd: Optional[str] = None
+) -> Set[ToolKey]:
+    changed_files = get_changed_files(ref, cwd=cwd)
+    if not changed_files:
+        Logger.info(f"Nothing has changed since {ref}")
+        return set()
+
+    # building the index imports the modules of every tool
+    index = DependencyIndex.build(registry)
+    changed_modules = {
+        m for m in get_changed_modules(changed_files) if index.in_shed(m)
+    }
+    affected = index.affected_tools(changed_modules, changed_files)
+    Logger.info(
+        f"{len(changed_files)} files changed since {ref} ({len(changed_modules)} "
+        f"modules of the shed), affecting {len(affected)} tool versions"
+    )
+    if changed_modules:
+        Logger.debug(f"Changed modules: {', '.join(sorted(changed_modules))}")
+    return affected
@@ -0,0 +1,240 @@
+"""
+Compare large test outputs without reading them more than once.
+
+ToolTestSuiteRunner reads an output file in full for each check (eg: once for
+its md5, and again, line by line, for its line count), one output at a time.
+The StreamingToolTestSuiteRunner instead works out everything the checks of a
+test case need from each file (its size, md5 and line count), and computes them
+in one streamed pass over each file, with the files read in parallel on a thread
+pool (hashlib releases the GIL while hashing large chunks). The checks then use
+these precomputed stats.
+"""
+
+import codecs
+import hashlib
+import locale
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set
+
+from janis_core import Logger, Array, File
+from janis_core.tool.test_classes import TTestPreprocessor
+from janis_core.tool.test_suite_runner import ToolTestSuiteRunner
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# how many output files to read at once
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+MD5 = "md5"
+LINE_COUNT = "line_count"
+
+# the stats each preprocessor needs from a file
+_PREPROCESSOR_NEEDS = {
+    TTestPreprocessor.FileMd5: {MD5},
+    TTestPreprocessor.LineCount: {LINE_COUNT},
+}
+
+
+class FileStats:
+    def __init__(
+        self,
+        size: int,
+        mtime_ns: int,
+        md5: Optional[str] = None,
+        line_count: Optional[int] = None,
+        decode_error: Optional[UnicodeDecodeError] = None,
+    ):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.md5 = md5
+        self.line_count = line_count
+        # why the file couldn't be read as text, for its line count
+        self.decode_error = decode_error
+
+    def is_current(self, path: str) -> bool:
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns) == (self.size, self.mtime_ns)
+
+
+def compute_file_stats(
+    path: str, needs: Iterable[str] = (MD5, LINE_COUNT), chunk_size=CHUNK_SIZE
+) -> FileStats:
+    """
+    Compute the stats of a file in one pass over it. The line count matches
+    reading the file in text mode (universal newlines: \\n, \\r\\n or \\r end a
+    line, and a last line without a line ending is counted), and the file is
+    decoded as it would be there, so a binary file has a decode_error instead.
+    """
+    needs = set(needs)
+    stat = os.stat(path)
+    md5 = hashlib.md5() if MD5 in needs else None
+    count_lines = LINE_COUNT in needs
+    decoder = None
+    decode_error = None
+    if count_lines:
+        # the encoding open() reads text with
+        encoding = locale.getpreferredencoding(False)
+        decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+
+    lines = 0
+    previous_last = b""
+    last = b""
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            chunk = view[:n]
+            if md5:
+                md5.update(chunk)
+            if count_lines:
+                data = buffer if n == chunk_size else bytes(chunk)
+                lines += data.count(b"\n")
+                carriage_returns = data.count(b"\r")
+                if carriage_returns:
+                    lines += carriage_returns - data.count(b"\r\n")
+                # a \r\n split across two chunks was counted twice
+                if previous_last == b"\r" and data[:1] == b"\n":
+                    lines -= 1
+                previous_last = data[-1:]
+            if decoder:
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError as e:
+                    decode_error, decoder = e, None
+            last = bytes(chunk[-1:])
+
+    if decoder:
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            decode_error = e
+
+    if count_lines and last not in (b"", b"\n", b"\r"):
+        lines += 1
+
+    return FileStats(
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        md5=md5.hexdigest() if md5 else None,
+        line_count=lines if count_lines else None,
+        decode_error=decode_error,
+    )
+
+
+def compute_all_file_stats(
+    needs: Dict[str, Set[str]], workers: int = DEFAULT_WORKERS
+) -> Dict[str, FileStats]:
+    """
+    :param needs: {path: the stats needed of it}
+    :return: {path: FileStats}, without the files that couldn't be read
+    """
+    if not needs:
+        return {}
+
+    def compute(path):
+        try:
+            return path, compute_file_stats(path, needs[path])
+        except OSError as e:
+            Logger.debug(f"Couldn't compute the stats of '{path}': {e}")
+            return path, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(needs)))) as pool:
+        return {p: s for p, s in pool.map(compute, needs) if s is not None}
+
+
+class ExpectedFileContents(str):
+    """
+    The contents of an expected output's expected_file (rather than its
+    expected_value), for the operators that take either a path or contents
+    """
+
+    pass
+
+
+class StreamingToolTestSuiteRunner(ToolTestSuiteRunner):
+    def __init__(self, tool, config=None, workers: int = DEFAULT_WORKERS):
+        super().__init__(tool, config=config)
+        self.workers = workers
+        self._file_stats: Dict[str, FileStats] = {}
+
+    def run_one_test_case(self, t, engine, output=None):
+        if output is None:
+            # run it here, so the stats can be computed before the checks
+            output = self.run(input=t.input, engine=engine)
+            if output is None:
+                # the run failed, so every check fails (the super class would
+                # run it again), and the output is still None
+                failed = [
+                    f"Error interpreting test case: {str(test_logic)} - the run "
+                    f"didn't return any outputs"
+                    for test_logic in t.output
+                ]
+                return failed, [], None
+
+        self._file_stats = compute_all_file_stats(
+            self.get_file_stats_needs(t, output), workers=self.workers
+        )
+        try:
+            return super().run_one_test_case(t=t, engine=engine, output=output)
+        finally:
+            self._file_stats = {}
+
+    def get_expected_value(self, test_logic):
+        expected = super().get_expected_value(test_logic)
+        if test_logic.expected_value is None and test_logic.expected_file is not None:
+            return ExpectedFileContents(expected)
+        return expected
+
+    def get_file_stats_needs(self, t, output: Dict) -> Dict[str, Set[str]]:
+        """
+        {path: stats} that the expected outputs of test case t need
+        """
+        needs: Dict[str, Set[str]] = {}
+        for test_logic in t.output:
+            stats = _PREPROCESSOR_NEEDS.get(test_logic.preprocessor)
+            if not stats or test_logic.tag not in output:
+                continue
+            try:
+                output_type = self.tool.outputs_map().get(test_logic.tag).outtype
+                path = self._extract_workflow_output(
+                    test_logic=test_logic,
+                    output_value=output[test_logic.tag],
+                    output_type=output_type,
+                )
+                if isinstance(output_type, Array):
+                    output_type = output_type.subtype()
+                if LINE_COUNT in stats and not isinstance(output_type, File):
+                    continue
+                if isinstance(path, str) and os.path.isfile(path):
+                    needs.setdefault(path, set()).update(stats)
+            except Exception as e:
+                # the check itself will report this
+                Logger.debug(f"Couldn't find the file for '{test_logic.tag}': {e}")
+
+        return needs
+
+    def _get_file_stats(self, path: str, need: str) -> FileStats:
+        stats = self._file_stats.get(path)
+        if stats is None or getattr(stats, need) is None or not stats.is_current(path):
+            stats = compute_file_stats(path, [need])
+        return stats
+
+    def read_md5(self, file_path: str) -> str:
+        return self._get_file_stats(file_path, MD5).md5
+
+    def line_count(self, output_value, output_type) -> int:
+        subtype = (
+            output_type.subtype() if isinstance(output_type, Array) else output_type
+        )
+        if isinstance(subtype, File):
+            stats = self._get_file_stats(output_value, LINE_COUNT)
+            if stats.decode_error:
+                # as reading it in text mode would
+                raise stats.decode_error
+            return stats.line_count
+        return super().line_count(output_value=output_value, output_type=output_type)
@@ -0,0 +1,169 @@
+"""
+Pick up the status changes of a Cromwell run as soon as its jobs finish.
+
+Janis polls Cromwell's metadata on a timer that backs off from 5 to 60 seconds
+over a run (Cromwell.get_poll_interval), so a job that finishes waits up to a
+minute before janis sees it, and a test case's run ends that much later.
+
+While a test case runs, watch_engine_status() makes janis's poll wait on an
+RcFileWatcher instead: the poll happens as soon as a job of the run writes its
+rc (return code) file, or after janis's interval if none does. As Cromwell only
+records a job's status once it has checked for its rc file (on its own backoff),
+polls follow every few seconds for a while after. Without inotify the watcher
+lists the run's directories every second, so the delay is about the same.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from janis_core import Logger
+
+from janisdk.runtest.events import PathWatcher
+
+# the directories of a Cromwell execution that don't have rc files, and can be
+# large (eg: the localised inputs)
+SKIP_DIRS = {"inputs", "tmp", "cacheCopy"}
+
+# how often the watcher checks whether janis stopped polling, and (without
+# inotify) lists the run's directories
+CHECK_INTERVAL = 1
+
+# after an rc file changes, poll every FOLLOW_UP_INTERVAL seconds, FOLLOW_UP_POLLS
+# times, until Cromwell has recorded the job's status (janis wants at least 3s
+# between polls, so the metadata is processed)
+FOLLOW_UP_INTERVAL = 3
+FOLLOW_UP_POLLS = 10
+
+
+class RcFileWatcher:
+    """
+    Waits for an rc file to be written anywhere under an execution directory
+    """
+
+    def __init__(self, execution_dir: str, check_interval: float = CHECK_INTERVAL):
+        self.execution_dir = os.path.abspath(execution_dir)
+        self._watcher = PathWatcher(
+            [self.execution_dir],
+            min_interval=min(check_interval, 0.5),
+            max_interval=check_interval,
+        )
+        self._rc_files = self.find_rc_files()
+
+    def _directories(self):
+        for root, dirs, files in os.walk(self.execution_dir):
+            dirs[:] = [
+                d for d in dirs if d not in SKIP_DIRS and not d.startswith("glob-")
+            ]
+            yield root, files
+
+    def find_rc_files(self) -> Dict[str, float]:
+        """
+        {path: mtime} of the rc files, and watch any new directory
+        """
+        rc_files = {}
+        directories = []
+        for root, files in self._directories():
+            directories.append(root)
+            if "rc" in files:
+                try:
+                    rc_files[os.path.join(root, "rc")] = os.stat(
+                        os.path.join(root, "rc")
+                    ).st_mtime
+                except OSError:
+                    pass
+        if directories:
+            self._watcher.paths = directories
+        return rc_files
+
+    def wait(self, timeout: float, should_stop=None) -> bool:
+        """
+        Wait (up to timeout seconds) for an rc file to be written
+
+        :param should_stop: returns whether to stop waiting early
+        :return: whether an rc file was written
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if should_stop and should_stop():
+                return False
+            self._watcher.wait()
+            rc_files = self.find_rc_files()
+            changed = rc_files != self._rc_files
+            self._rc_files = rc_files
+            if changed:
+                return True
+        return False
+
+    def close(self):
+        self._watcher.close()
+
+
+class _Followed:
+    def __init__(self, watcher: RcFileWatcher):
+        self.watcher = watcher
+        self.follow_ups = 0
+
+
+@contextmanager
+def watch_engine_status():
+    """
+    While in this context, a Cromwell (of this process) polls its metadata as soon
+    as one of its jobs writes its rc file
+    """
+    try:
+        from janis_assistant.engines.cromwell.main import Cromwell
+    except ImportError:
+        yield
+        return
+
+    original = Cromwell.get_poll_interval
+    followed: Dict[int, _Followed] = {}
+    lock = threading.Lock()
+
+    def stopped(engine) -> bool:
+        # janis's internals, so a version without them just polls on its interval
+        timer = getattr(engine, "_timer_thread", None)
+        return bool(getattr(engine, "should_stop", False)) or (
+            timer is not None and timer.is_set()
+        )
+
+    def get_poll_interval(engine):
+        interval = original(engine)
+        execution_dir = getattr(engine, "execution_dir", None)
+        if not execution_dir or not os.path.isdir(execution_dir):
+            return interval
+
+        # poll_metadata runs on a timer thread, which waits here for the next
+        # poll. Anything going wrong here falls back to janis's own interval.
+        try:
+            with lock:
+                state = followed.get(id(engine))
+                if state is None:
+                    state = _Followed(RcFileWatcher(execution_dir))
+                    followed[id(engine)] = state
+
+            if state.follow_ups > 0:
+                # Cromwell might not have recorded the job's status yet
+                state.follow_ups -= 1
+                interval = min(interval, FOLLOW_UP_INTERVAL)
+
+            if state.watcher.wait(interval, should_stop=lambda: stopped(engine)):
+                state.follow_ups = FOLLOW_UP_POLLS
+        except Exception as e:
+            # eg: the watcher was closed as the run finished
+            Logger.debug(f"Stopped watching {execution_dir} for rc files: {e}")
+            return interval
+        return 0
+
+    Cromwell.get_poll_interval = get_poll_interval
+    try:
+        yield
+    finally:
+        Cromwell.get_poll_interval = original
+        with lock:
+            for state in followed.values():
+                state.watcher.close()
+            followed.clear()
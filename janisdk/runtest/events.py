@@ -0,0 +1,221 @@
+"""
+Waiting for files to change, rather than checking them on a fixed interval.
+
+On Linux, the PathWatcher is woken by inotify as soon as something in the
+directories it watches is created, written, renamed or deleted. Elsewhere (and
+for what inotify doesn't see, eg: writes from another node of a shared
+filesystem) it falls back to polling the directories' listings, on an interval
+that's short while they're changing and backs off (up to max_interval) while
+they're not.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from janis_core import Logger
+
+MIN_INTERVAL = 0.5
+MAX_INTERVAL = 10
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            if hasattr(libc, "inotify_init1"):
+                _libc = libc
+        except OSError as e:
+            Logger.debug(f"Couldn't load libc for inotify: {e}")
+    return _libc
+
+
+def _inotify_init() -> Optional[int]:
+    """
+    An inotify file descriptor, or None if inotify isn't available
+    """
+    libc = _get_libc()
+    if libc is None:
+        return None
+    fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        # eg: the limit on inotify instances was reached
+        Logger.debug(f"Couldn't start inotify: {os.strerror(ctypes.get_errno())}")
+        return None
+    return fd
+
+
+def _nearest_existing(path: str) -> str:
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+def _drain(fd: int):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class PathWatcher:
+    """
+    Waits for something in the given directories (or files) to change. They
+    don't need to exist yet: their nearest existing parent is watched until
+    they're created. The paths can be changed (by assigning them), the inotify
+    watches of what's no longer needed are then removed.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = self.min_interval
+
+        self._inotify = _inotify_init()
+        # {watched path: inotify watch descriptor}
+        self._watched: Dict[str, int] = {}
+        self.paths = paths
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self._fingerprint = self._get_fingerprint()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    @property
+    def paths(self) -> List[str]:
+        return self._paths
+
+    @paths.setter
+    def paths(self, paths: Iterable[str]):
+        self._paths = [os.path.abspath(p) for p in paths]
+        if self._inotify is not None:
+            self._update_watches()
+
+    def _update_watches(self):
+        """
+        Watch the nearest existing path of each path, and remove the watches that
+        are no longer needed (the path was dropped, or has since been created)
+        """
+        wanted = {_nearest_existing(p) for p in self._paths}
+        for path in set(self._watched) - wanted:
+            wd = self._watched.pop(path)
+            # paths of the same directory (eg: through a symlink) share a watch
+            if wd not in self._watched.values():
+                # fails if the directory was deleted, which removed its watch
+                _libc.inotify_rm_watch(self._inotify, wd)
+
+        for path in wanted - set(self._watched):
+            wd = _libc.inotify_add_watch(self._inotify, path.encode(), _IN_MASK)
+            if wd >= 0:
+                self._watched[path] = wd
+            else:
+                Logger.debug(
+                    f"Couldn't watch '{path}': {os.strerror(ctypes.get_errno())}"
+                )
+
+    def _get_fingerprint(self):
+        fingerprint = []
+        for path in self.paths:
+            try:
+                if os.path.isdir(path):
+                    with os.scandir(path) as entries:
+                        stats = [(e.name, e.stat()) for e in entries]
+                    fingerprint.append(
+                        sorted((n, s.st_mtime_ns, s.st_size) for n, s in stats)
+                    )
+                else:
+                    st = os.stat(path)
+                    fingerprint.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                # doesn't exist (yet), or was removed while listing it
+                fingerprint.append(None)
+        return fingerprint
+
+    def wait(self) -> bool:
+        """
+        Wait until something changes, the watcher is woken, or the poll interval
+        passes.
+
+        :return: whether something changed
+        """
+        fds = [self._wake_read]
+        if self._inotify is not None:
+            self._update_watches()
+            fds.append(self._inotify)
+
+        readable, _, _ = select.select(fds, [], [], self.interval)
+        if self._wake_read in readable:
+            _drain(self._wake_read)
+        if self._inotify is not None and self._inotify in readable:
+            _drain(self._inotify)
+
+        # the listings are compared whichever woke us, so what inotify doesn't
+        # see is still picked up (on the next interval)
+        fingerprint = self._get_fingerprint()
+        changed = fingerprint != self._fingerprint
+        self._fingerprint = fingerprint
+
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return changed
+
+    def wake(self):
+        """
+        Return from wait() now (eg: from another thread, to stop waiting)
+        """
+        try:
+            os.write(self._wake_write, b"\0")
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (self._inotify, self._wake_read, self._wake_write):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._inotify = None
+        self._watched.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,123 @@
+"""
+--fail-fast: stop running what can no longer pass.
+
+    - for a tool, once one of its test cases fails, its remaining test cases
+      aren't started (they're reported as skipped), and the ones that are
+      running are aborted
+    - for a test case, its run is aborted as soon as one of its jobs fails: janis
+      only collects the outputs of a run that succeeds, so none of its expected
+      outputs could pass
+
+A run is aborted the way `janis abort` does it, by writing the abort semaphore
+in the run's janis dir, which its workflow manager checks every few seconds (so
+this works from another process too).
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from janis_core import Logger
+
+from janisdk.runtest.events import MIN_INTERVAL, PathWatcher
+from janisdk.runtest.timings import TimedToolTestSuiteRunner
+
+# the longest a failed job of a running test case can go unnoticed, when its
+# database changes aren't reported by inotify
+POLL_INTERVAL = 5
+
+
+def abort_run(output_dir: str) -> bool:
+    """
+    Ask the janis run in output_dir to abort
+    """
+    from janis_assistant.management.workflowmanager import WorkflowManager
+
+    return WorkflowManager.mark_aborted(os.path.join(output_dir, "janis"), None)
+
+
+def get_failed_job(output_dir: str) -> Optional[str]:
+    """
+    The name of a failed job of the janis run in output_dir, or None
+    """
+    path = os.path.join(output_dir, "janis", "database", "task.db")
+    if not os.path.exists(path):
+        return None
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=1)
+        try:
+            row = connection.execute(
+                "SELECT name FROM jobs WHERE status IN ('failed', '\"failed\"') LIMIT 1"
+            ).fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        # it might not have been created yet, or is being written
+        Logger.debug(f"Couldn't check '{path}' for failed jobs: {e}")
+        return None
+    return row[0] if row else None
+
+
+class FailedJobWatcher:
+    """
+    Aborts the janis run in output_dir (from a background thread) as soon as one
+    of its jobs fails. The run's database is checked when it changes, which
+    inotify reports at once (or polling notices within poll_interval).
+    """
+
+    def __init__(self, output_dir: str, poll_interval: float = POLL_INTERVAL):
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self.failed_job: Optional[str] = None
+        self._stopped = threading.Event()
+        self._changes = None
+        self._thread = None
+
+    def _watch(self):
+        changed = True
+        while not self._stopped.is_set():
+            failed_job = get_failed_job(self.output_dir) if changed else None
+            if failed_job:
+                Logger.warn(
+                    f"Aborting the run in '{self.output_dir}' as the job "
+                    f"'{failed_job}' failed (--fail-fast)"
+                )
+                self.failed_job = failed_job
+                abort_run(self.output_dir)
+                return
+            changed = self._changes.wait()
+
+    def __enter__(self):
+        self._changes = PathWatcher(
+            [os.path.join(self.output_dir, "janis", "database")],
+            min_interval=min(MIN_INTERVAL, self.poll_interval),
+            max_interval=self.poll_interval,
+        )
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._changes.wake()
+        self._thread.join()
+        self._changes.close()
+
+
+class FailFastToolTestSuiteRunner(TimedToolTestSuiteRunner):
+    """
+    A (timed) ToolTestSuiteRunner that aborts the run as soon as one of its jobs
+    fails
+    """
+
+    def __init__(self, tool, config=None, timer=None):
+        super().__init__(tool, config=config, timer=timer)
+        self.failed_job: Optional[str] = None
+
+    def run(self, input, engine):
+        with FailedJobWatcher(self.output_dir) as watcher:
+            try:
+                return super().run(input=input, engine=engine)
+            finally:
+                self.failed_job = watcher.failed_job
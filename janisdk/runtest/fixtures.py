@@ -0,0 +1,479 @@
+"""
+Fast fixtures: small but still valid versions of the (large) input files of test
+cases, for run-test --fast-fixtures.
+
+    - FASTQ (.fastq, .fq, gzipped or not): the first N reads, so paired FASTQs
+      stay paired
+    - VCF (.vcf, .vcf.gz): the header and the first N records, bgzipped and
+      reindexed (.tbi) with bgzip / tabix or pysam
+    - BAM: the header and the first N reads (of one region or contig, with
+      $JANISDK_FIXTURE_REGION, when the BAM is indexed), reindexed (.bai) with
+      samtools or pysam
+
+Other inputs, and inputs with secondary files that can't be rebuilt, are run as
+they are. The outputs of a test case run with fixtures aren't the ones its
+expected outputs describe (eg: an md5 or line count of the full data), so only
+its structural checks (that the files exist, the size of a list) are run, the
+others are reported as not comparable. A fixture is named by the sha256 of the
+input it was made from (and how it was made), so it's only generated once per
+machine, and is kept in the janis cache dir as:
+
+    objects/ab/abcdef...    the fixture files, named by the sha256 of their
+                            contents, read-only
+    fixtures/<key>.json     the recipe (source digest, kind, N) -> objects
+    digests/<md5>.json      the sha256 of a source, by its path, size and mtime
+    locks/<key>.lock        held (flock) while a fixture is generated
+    tmp/                    fixtures being generated
+"""
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from janis_core import Logger, Array, File, apply_secondary_file_format_to_filename
+from janis_core.tool.test_classes import TTestExpectedOutput, TTestPreprocessor
+
+from janis.cache import get_cache_dir
+from janisdk.runtest.inputstore import InputStore, _is_remote, link_or_copy
+
+ENV_RECORDS = "JANISDK_FIXTURE_RECORDS"
+ENV_REGION = "JANISDK_FIXTURE_REGION"
+DEFAULT_RECORDS = 1000
+
+
+class FixtureUnavailable(Exception):
+    pass
+
+
+def get_fixture_records() -> int:
+    return int(os.getenv(ENV_RECORDS, DEFAULT_RECORDS))
+
+
+def get_fixture_region() -> Optional[str]:
+    """
+    The region (eg: chr20, or chr20:1-100000) the BAM fixtures are taken from
+    """
+    return os.getenv(ENV_REGION) or None
+
+
+def get_fixture_recipe() -> Dict:
+    """
+    How the fast fixtures are made, for the cached results of test cases run
+    with them
+    """
+    return {
+        "version": FixtureStore.VERSION,
+        "records": get_fixture_records(),
+        "region": get_fixture_region(),
+        # only the structural checks are run
+        "checks": sorted(p.value for p in STRUCTURAL_PREPROCESSORS),
+    }
+
+
+# the checks that don't depend on the contents of the inputs
+STRUCTURAL_PREPROCESSORS = {
+    TTestPreprocessor.FileExists,
+    TTestPreprocessor.ListOfFilesExist,
+    TTestPreprocessor.ListSize,
+}
+
+
+def split_fixture_outputs(
+    outputs: List[TTestExpectedOutput],
+) -> Tuple[List[TTestExpectedOutput], List[TTestExpectedOutput]]:
+    """
+    Split the expected outputs of a test case into the ones that can still be
+    checked when it's run with fixtures, and the ones that can't
+    """
+    comparable, not_comparable = [], []
+    for expected in outputs or []:
+        if expected.preprocessor in STRUCTURAL_PREPROCESSORS:
+            comparable.append(expected)
+        else:
+            not_comparable.append(expected)
+    return comparable, not_comparable
+
+
+def get_kind(path: str) -> Optional[str]:
+    lower = path.lower()
+    if lower.endswith((".fastq", ".fq", ".fastq.gz", ".fq.gz")):
+        return "fastq"
+    if lower.endswith(".vcf"):
+        return "vcf"
+    if lower.endswith(".vcf.gz"):
+        return "vcf.gz"
+    if lower.endswith(".bam"):
+        return "bam"
+    return None
+
+
+# the secondary files each kind can rebuild
+REBUILDABLE_SECONDARIES = {
+    "fastq": set(),
+    "vcf": set(),
+    "vcf.gz": {".tbi", "^.tbi"},
+    "bam": {".bai", "^.bai"},
+}
+
+
+def _has_executable(name: str) -> bool:
+    return shutil.which(name) is not None
+
+
+def _import_pysam():
+    try:
+        import pysam
+
+        return pysam
+    except ImportError:
+        return None
+
+
+def _open_text(path: str):
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    return gzip.open(path, "rt") if gzipped else open(path)
+
+
+def downsample_fastq(source: str, dest: str, records: int):
+    with _open_text(source) as inp:
+        lines = [line for _, line in zip(range(records * 4), inp)]
+    if dest.lower().endswith(".gz"):
+        # no timestamp in the gzip header, so the same reads are the same fixture
+        with open(dest, "wb") as raw, gzip.GzipFile(
+            fileobj=raw, mode="wb", mtime=0
+        ) as out:
+            out.write("".join(lines).encode())
+    else:
+        with open(dest, "w+") as out:
+            out.writelines(lines)
+
+
+def _head_vcf(source: str, dest: str, records: int):
+    with _open_text(source) as inp, open(dest, "w+") as out:
+        for line in inp:
+            if not line.startswith("#"):
+                if records <= 0:
+                    break
+                records -= 1
+            out.write(line)
+
+
+def downsample_vcf(source: str, dest: str, records: int):
+    _head_vcf(source, dest, records)
+
+
+def downsample_vcf_gz(source: str, dest: str, records: int, index: str = None):
+    plain = dest[: -len(".gz")]
+    _head_vcf(source, plain, records)
+
+    pysam = _import_pysam()
+    if _has_executable("bgzip") and _has_executable("tabix"):
+        subprocess.run(["bgzip", "-f", plain], check=True)
+        subprocess.run(["tabix", "-f", "-p", "vcf", dest], check=True)
+    elif pysam:
+        pysam.tabix_compress(plain, dest, force=True)
+        os.remove(plain)
+        pysam.tabix_index(dest, preset="vcf", force=True)
+    else:
+        raise FixtureUnavailable("bgzipping a VCF needs bgzip and tabix, or pysam")
+
+    if index and index != f"{dest}.tbi":
+        os.replace(f"{dest}.tbi", index)
+
+
+def _find_bam_index(source: str) -> Optional[str]:
+    for sec in sorted(REBUILDABLE_SECONDARIES["bam"]):
+        index = apply_secondary_file_format_to_filename(source, sec)
+        if os.path.exists(index):
+            return index
+    return None
+
+
+def downsample_bam(
+    source: str, dest: str, records: int, index: str = None, region: str = None
+):
+    """
+    :param region: only keep the reads of this region (or contig), which needs
+        source to be indexed
+    """
+    source_index = _find_bam_index(source) if region else None
+    if region and not source_index:
+        Logger.warn(
+            f"{source} isn't indexed, so its fixture is the first {records} reads "
+            f"rather than the reads of {region}"
+        )
+        region = None
+
+    pysam = _import_pysam()
+    if _has_executable("samtools"):
+        header = subprocess.run(
+            ["samtools", "view", "-H", source],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        view_command = ["samtools", "view", source]
+        if region:
+            view_command = ["samtools", "view", "-X", source, source_index, region]
+        with subprocess.Popen(
+            view_command,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ) as view:
+            reads = [line for _, line in zip(range(records), view.stdout)]
+            view.kill()
+        subprocess.run(
+            ["samtools", "view", "-b", "-o", dest, "-"],
+            check=True,
+            input=header + "".join(reads),
+            universal_newlines=True,
+        )
+        subprocess.run(["samtools", "index", dest, index or f"{dest}.bai"], check=True)
+    elif pysam:
+        with pysam.AlignmentFile(
+            source, "rb", index_filename=source_index
+        ) as inp, pysam.AlignmentFile(dest, "wb", template=inp) as out:
+            reads = inp.fetch(region=region) if region else inp.fetch(until_eof=True)
+            for _, read in zip(range(records), reads):
+                out.write(read)
+        pysam.index(dest, index or f"{dest}.bai")
+    else:
+        raise FixtureUnavailable("downsampling a BAM needs samtools or pysam")
+
+
+DOWNSAMPLERS: Dict[str, Callable] = {
+    "fastq": downsample_fastq,
+    "vcf": downsample_vcf,
+    "vcf.gz": downsample_vcf_gz,
+    "bam": downsample_bam,
+}
+
+
+class FixtureStore:
+    # bump when the fixtures that are generated change
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        records: Optional[int] = None,
+        region: Optional[str] = None,
+    ):
+        self.path = path or get_cache_dir("runtest", "fixtures")
+        self.records = records if records is not None else get_fixture_records()
+        self.region = region or get_fixture_region()
+
+    # layout
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.path, "objects", digest[:2], digest)
+
+    def _recipe_path(self, key: str) -> str:
+        return os.path.join(self.path, "fixtures", f"{key}.json")
+
+    @contextmanager
+    def _lock(self, key: str):
+        lock_path = os.path.join(self.path, "locks", f"{key}.lock")
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_json(path: str, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}.tmp", "w+") as f:
+            json.dump(value, f)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def source_digest(self, source: str) -> str:
+        """
+        The sha256 of source, which is only hashed again when it changes
+        """
+        stat = os.stat(source)
+        fingerprint = f"{os.path.realpath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+        record_path = os.path.join(
+            self.path,
+            "digests",
+            f"{hashlib.md5(fingerprint.encode()).hexdigest()}.json",
+        )
+        try:
+            with open(record_path) as f:
+                return json.load(f)["sha256"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = InputStore._hash(source)
+        self._write_json(record_path, {"source": source, "sha256": digest})
+        return digest
+
+    def fixture_key(self, source: str, kind: str, secondary_files: List[str]) -> str:
+        recipe = {
+            "version": self.VERSION,
+            "source": self.source_digest(source),
+            "kind": kind,
+            "records": self.records,
+            # only the BAM fixtures are taken from a region
+            "region": self.region if kind == "bam" else None,
+            "secondary_files": sorted(secondary_files),
+        }
+        return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode()).hexdigest()
+
+    # generating
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._recipe_path(key)) as f:
+                objects = json.load(f)["objects"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if all(os.path.exists(self.object_path(d)) for d in objects.values()):
+            return objects
+        return None
+
+    def _store_object(self, path: str) -> str:
+        digest = InputStore._hash(path)
+        object_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.chmod(path, 0o444)
+        os.replace(path, object_path)
+        return digest
+
+    def generate(self, source: str, secondary_files: List[str] = None) -> Dict:
+        """
+        The fixture of source (and its secondary files), generating it if it
+        hasn't been already.
+
+        :return: {"": the object of the fixture, secondary file: its object}
+        """
+        secondary_files = secondary_files or []
+        kind = get_kind(source)
+        if kind is None:
+            raise FixtureUnavailable(f"there's no fast fixture for {source}")
+        unbuildable = set(secondary_files) - REBUILDABLE_SECONDARIES[kind]
+        if unbuildable:
+            raise FixtureUnavailable(
+                f"the secondary files ({', '.join(sorted(unbuildable))}) of "
+                f"{source} can't be rebuilt"
+            )
+
+        key = self.fixture_key(source, kind, secondary_files)
+        objects = self._lookup(key)
+        if objects:
+            return objects
+
+        with self._lock(key):
+            # another worker might have generated it while we were waiting
+            objects = self._lookup(key)
+            if objects:
+                return objects
+
+            tmp_dir = os.path.join(self.path, "tmp", f"{key}.{os.getpid()}")
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                dest = os.path.join(tmp_dir, os.path.basename(source))
+                Logger.info(
+                    f"Generating a fast fixture of {source} ({self.records} records)"
+                )
+                downsample = DOWNSAMPLERS[kind]
+                if kind == "bam":
+                    downsample = partial(downsample, region=self.region)
+                if REBUILDABLE_SECONDARIES[kind]:
+                    # the index the kind builds, where it's expected to be
+                    index = next(
+                        (
+                            apply_secondary_file_format_to_filename(dest, s)
+                            for s in secondary_files
+                        ),
+                        None,
+                    )
+                    downsample(source, dest, self.records, index=index)
+                else:
+                    downsample(source, dest, self.records)
+
+                sec_paths = {
+                    sec: apply_secondary_file_format_to_filename(dest, sec)
+                    for sec in secondary_files
+                }
+                for sec_path in sec_paths.values():
+                    if not os.path.exists(sec_path):
+                        # eg: .bai and ^.bai, the index was only written once
+                        shutil.copyfile(sec_paths[secondary_files[0]], sec_path)
+
+                objects = {"": self._store_object(dest)}
+                for sec, sec_path in sec_paths.items():
+                    objects[sec] = self._store_object(sec_path)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            self._write_json(self._recipe_path(key), {"objects": objects})
+
+        return objects
+
+    # staging
+
+    def stage(self, source: str, dest_dir: str, secondary_files: List[str] = None):
+        """
+        Stage the fixture of the local source (and its secondary files) into
+        dest_dir.
+
+        :return: the path of the staged fixture
+        """
+        objects = self.generate(source, secondary_files)
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, os.path.basename(source))
+        for sec, digest in objects.items():
+            path = apply_secondary_file_format_to_filename(dest, sec) if sec else dest
+            if os.path.exists(path):
+                os.remove(path)
+            link_or_copy(self.object_path(digest), path)
+        return dest
+
+    def _stage_value(self, value, dest_dir: str, secondary_files: List[str]):
+        if isinstance(value, list):
+            return [
+                self._stage_value(v, os.path.join(dest_dir, str(i)), secondary_files)
+                for i, v in enumerate(value)
+            ]
+        if (
+            not isinstance(value, str)
+            or _is_remote(value)
+            or get_kind(value) is None
+            or not os.path.exists(value)
+        ):
+            return value
+        try:
+            return self.stage(value, dest_dir, secondary_files)
+        except FixtureUnavailable as e:
+            Logger.info(f"Using the original input, as {e}")
+            return value
+
+    def stage_inputs(self, tool, inputs: Dict, dest_dir: str) -> Dict:
+        """
+        Replace the local File (and Array(File)) inputs of tool that have a fast
+        fixture with it
+        """
+        staged = dict(inputs)
+        for inp in tool.tool_inputs():
+            value = inputs.get(inp.id())
+            intype = inp.intype
+            if isinstance(intype, Array):
+                intype = intype.fundamental_type()
+            if value is None or not isinstance(intype, File):
+                continue
+
+            staged[inp.id()] = self._stage_value(
+                value, os.path.join(dest_dir, inp.id()), intype.secondary_files() or []
+            )
+        return staged
@@ -0,0 +1,300 @@
+"""
+A local SQLite history of every test case that run-test runs, so we can see how
+a test case's wall time and memory change over time, and flag the runs that
+moved beyond a tolerance from their baseline: the median of the previous
+successful runs of the same test case and engine (across tool versions and
+containers, so an upgrade that makes a tool slower is flagged). Cached results,
+dry runs and skipped test cases aren't recorded, as nothing was run.
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from janis_core import Logger
+
+from janis.cache import get_cache_dir
+
+# the number of previous runs the baseline is the median of
+BASELINE_RUNS = 5
+# relative change (0.25 = 25%) beyond which a run is flagged
+DEFAULT_TOLERANCE = 0.25
+# ignore changes smaller than these, as short runs are noisy
+MIN_WALL_TIME_CHANGE = 5
+MIN_MEMORY_CHANGE_MB = 100
+
+
+class TestRun:
+    __slots__ = (
+        "id",
+        "started",
+        "tool",
+        "version",
+        "test_case",
+        "engine",
+        "containers",
+        "timings",
+        "wall_time",
+        "peak_memory_mb",
+        "succeeded",
+    )
+
+    def __init__(self, **kwargs):
+        for k in self.__slots__:
+            setattr(self, k, kwargs.get(k))
+
+    @staticmethod
+    def from_row(row) -> "TestRun":
+        d = dict(row)
+        d["containers"] = json.loads(d["containers"] or "null")
+        d["timings"] = json.loads(d["timings"] or "null")
+        d["succeeded"] = bool(d["succeeded"])
+        return TestRun(**d)
+
+
+class Regression:
+    def __init__(self, run: TestRun, metric: str, value: float, baseline: float):
+        self.run = run
+        self.metric = metric
+        self.value = value
+        self.baseline = baseline
+
+    @property
+    def change(self) -> float:
+        return (self.value - self.baseline) / self.baseline
+
+    def __str__(self):
+        return (
+            f"{self.run.tool}/{self.run.test_case} ({self.run.engine}): {self.metric} "
+            f"{self.value:.1f} vs baseline {self.baseline:.1f} ({self.change:+.0%})"
+        )
+
+
+class RunHistory:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_cache_dir("runtest", "history.sqlite")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # several test workers can record at once
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        try:
+            self._create_tables()
+        except sqlite3.Error:
+            self.connection.close()
+            raise
+
+    def _create_tables(self):
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started REAL NOT NULL,
+                    tool TEXT NOT NULL,
+                    version TEXT,
+                    test_case TEXT NOT NULL,
+                    engine TEXT,
+                    containers TEXT,
+                    timings TEXT,
+                    wall_time REAL,
+                    peak_memory_mb REAL,
+                    succeeded INTEGER NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS runs_test_case "
+                "ON runs (tool, test_case, engine, id)"
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, tool_id: str, test_case: str, result: Dict) -> Optional[TestRun]:
+        """
+        Record the result of run_test_case (unless it's cached, a dry run, was
+        skipped, or was run with fast fixtures)
+        """
+        if (
+            result.get("cached")
+            or result.get("dry_run")
+            or result.get("skipped")
+            or result.get("fast_fixtures")
+        ):
+            return None
+
+        timings = result.get("timings") or {}
+        run = TestRun(
+            started=time.time() - timings.get("total", 0),
+            tool=tool_id,
+            version=result.get("tool_version"),
+            test_case=test_case,
+            engine=result.get("engine"),
+            containers=result.get("containers"),
+            timings=timings,
+            wall_time=timings.get("total"),
+            peak_memory_mb=result.get("peak_memory_mb"),
+            succeeded=not result["failed"] and not result["execution_error"],
+        )
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started, tool, version, test_case, engine, "
+                "containers, timings, wall_time, peak_memory_mb, succeeded) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run.started,
+                    run.tool,
+                    run.version,
+                    run.test_case,
+                    run.engine,
+                    json.dumps(run.containers),
+                    json.dumps(run.timings),
+                    run.wall_time,
+                    run.peak_memory_mb,
+                    int(run.succeeded),
+                ),
+            )
+        run.id = cursor.lastrowid
+        return run
+
+    def runs(
+        self,
+        tool_id: Optional[str] = None,
+        test_case: Optional[str] = None,
+        limit: Optional[int] = 50,
+    ) -> List[TestRun]:
+        """
+        The most recent runs first
+        """
+        query, params = "SELECT * FROM runs", []
+        conditions = []
+        if tool_id:
+            conditions.append("tool = ? COLLATE NOCASE")
+            params.append(tool_id)
+        if test_case:
+            conditions.append("test_case = ?")
+            params.append(test_case)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return [TestRun.from_row(r) for r in self.connection.execute(query, params)]
+
+    def baseline_runs(self, run: TestRun, n: int = BASELINE_RUNS) -> List[TestRun]:
+        """
+        The n successful runs of the same test case (and engine) before run
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM runs WHERE tool = ? AND test_case = ? AND engine IS ? "
+            "AND succeeded = 1 AND id < ? ORDER BY id DESC LIMIT ?",
+            (run.tool, run.test_case, run.engine, run.id, n),
+        )
+        return [TestRun.from_row(r) for r in rows]
+
+    def check_regressions(
+        self, run: TestRun, tolerance: float = DEFAULT_TOLERANCE
+    ) -> List[Regression]:
+        """
+        The metrics (wall time, peak memory) of run that moved (up or down) by more
+        than tolerance from the median of its baseline runs
+        """
+        if not run.succeeded:
+            return []
+        baseline_runs = self.baseline_runs(run)
+        if not baseline_runs:
+            return []
+
+        regressions = []
+        for metric, min_change in [
+            ("wall_time", MIN_WALL_TIME_CHANGE),
+            ("peak_memory_mb", MIN_MEMORY_CHANGE_MB),
+        ]:
+            value = getattr(run, metric)
+            values = [getattr(r, metric) for r in baseline_runs]
+            values = [v for v in values if v is not None]
+            if value is None or not values:
+                continue
+            baseline = statistics.median(values)
+            if baseline <= 0 or abs(value - baseline) < min_change:
+                continue
+            if abs(value - baseline) / baseline > tolerance:
+                regressions.append(Regression(run, metric, value, baseline))
+
+        return regressions
+
+    def record_and_check(
+        self,
+        tool_id: str,
+        test_case: str,
+        result: Dict,
+        tolerance: float = DEFAULT_TOLERANCE,
+    ) -> List[Regression]:
+        try:
+            run = self.record(tool_id, test_case, result)
+            if not run:
+                return []
+            regressions = self.check_regressions(run, tolerance=tolerance)
+        except (OSError, sqlite3.Error) as e:
+            Logger.warn(f"Couldn't record the test run to '{self.path}': {e}")
+            return []
+
+        for r in regressions:
+            Logger.warn(f"Performance regression: {r}")
+        return regressions
+
+
+def open_run_history(path: Optional[str] = None) -> Optional[RunHistory]:
+    """
+    The RunHistory, or None (with a warning) if it can't be opened, eg: the
+    cache dir is read-only, or the database is locked
+    """
+    try:
+        return RunHistory(path)
+    except (OSError, sqlite3.Error) as e:
+        Logger.warn(
+            f"Couldn't open the run history at '{path or get_cache_dir('runtest')}', "
+            f"not recording the test runs: {e}"
+        )
+        return None
+
+
+def print_history(runs: List[TestRun], history: RunHistory, tolerance: float):
+    from tabulate import tabulate
+
+    rows = []
+    for run in runs:
+        regressions = history.check_regressions(run, tolerance=tolerance)
+        rows.append(
+            (
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(run.started)),
+                f"{run.tool}/{run.version}",
+                run.test_case,
+                run.engine,
+                "PASSED" if run.succeeded else "FAILED",
+                None if run.wall_time is None else round(run.wall_time, 1),
+                run.peak_memory_mb,
+                ", ".join(f"{r.metric} {r.change:+.0%}" for r in regressions),
+            )
+        )
+
+    print(
+        tabulate(
+            rows,
+            headers=[
+                "Started",
+                "Tool",
+                "Test",
+                "Engine",
+                "Status",
+                "Wall time (s)",
+                "Peak memory (MB)",
+                "Regressions",
+            ],
+        )
+    )
@@ -0,0 +1,309 @@
+"""
+A local, content-addressed store of the (remote) input files of test cases.
+
+Test cases point at the same reference genomes and FASTQs again and again. The
+first test on a machine downloads each one into the store, and every test case
+after that has it staged (hardlinked, or reflinked, or as a last resort copied)
+into its own directory, so the engine only sees local files.
+
+The store (in the janis cache dir) is laid out as:
+
+    objects/ab/abcdef...    the files, named by the sha256 of their contents,
+                            read-only so a hardlinked input can't be modified
+    sources/<md5>.json      the source (url) -> object, with its last modified
+    locks/<md5>.lock        held (flock) while a source is downloaded
+    tmp/                    partial downloads, renamed into objects/ when done
+    store.lock              shared while staging, exclusive while evicting
+
+so test workers on the same machine can share it: a source is only downloaded
+once, and an object isn't evicted while it's being staged. When the store is
+bigger than its max size, the least recently staged objects are evicted.
+"""
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from janis_core import Logger, Array, File, apply_secondary_file_format_to_filename
+
+from janis.cache import get_cache_dir
+
+ENV_MAX_SIZE_GB = "JANISDK_INPUT_STORE_MAX_SIZE_GB"
+DEFAULT_MAX_SIZE_GB = 50
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def _is_remote(source) -> bool:
+    return (
+        isinstance(source, str) and "://" in source and not source.startswith("file://")
+    )
+
+
+def _default_download(source: str, dest: str):
+    from janis_assistant.management.filescheme import FileScheme
+
+    FileScheme.get_filescheme_for_url(source).cp_from(source, dest, force=True)
+
+
+def _default_last_modified(source: str) -> Optional[str]:
+    from janis_assistant.management.filescheme import FileScheme
+
+    return FileScheme.get_type_by_prefix(source).last_modified(source)
+
+
+def _default_exists(source: str) -> bool:
+    from janis_assistant.management.filescheme import FileScheme
+
+    return FileScheme.get_filescheme_for_url(source).exists(source)
+
+
+def link_or_copy(source: str, dest: str) -> str:
+    """
+    Hardlink source to dest, else reflink it, else copy it.
+
+    :return: how it was staged, one of "hardlink", "reflink" or "copy"
+    """
+    try:
+        os.link(source, dest)
+        return "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+
+    try:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return "reflink"
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+
+    shutil.copyfile(source, dest)
+    return "copy"
+
+
+class InputStore:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size_gb: Optional[float] = None,
+        download: Callable[[str, str], Any] = _default_download,
+        last_modified: Callable[[str], Optional[str]] = _default_last_modified,
+        exists: Callable[[str], bool] = _default_exists,
+    ):
+        """
+        :param download: download(source, dest) a remote file
+        :param last_modified: the last modified of a source (or None if unknown),
+            a stored source is downloaded again if this changes
+        :param exists: whether a (secondary) source exists
+        """
+        self.path = path or get_cache_dir("runtest", "inputs")
+        self.max_size_gb = (
+            max_size_gb
+            if max_size_gb is not None
+            else float(os.getenv(ENV_MAX_SIZE_GB, DEFAULT_MAX_SIZE_GB))
+        )
+        self._download = download
+        self._last_modified = last_modified
+        self._exists = exists
+
+    # layout
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.path, "objects", digest[:2], digest)
+
+    def _source_key(self, source: str) -> str:
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def _record_path(self, source: str) -> str:
+        return os.path.join(self.path, "sources", f"{self._source_key(source)}.json")
+
+    @contextmanager
+    def _lock(self, path: str, exclusive=True):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a+") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _store_lock(self, exclusive=False):
+        return self._lock(os.path.join(self.path, "store.lock"), exclusive=exclusive)
+
+    # fetching
+
+    def _read_record(self, source: str) -> Optional[Dict]:
+        try:
+            with open(self._record_path(source)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _lookup(self, source: str, last_modified: Optional[str]) -> Optional[str]:
+        record = self._read_record(source)
+        if not record:
+            return None
+        # if we can't get the last modified (eg: offline), trust what we have
+        if last_modified and record.get("last_modified") != last_modified:
+            return None
+        path = self.object_path(record["sha256"])
+        return path if os.path.exists(path) else None
+
+    def fetch(self, source: str) -> str:
+        """
+        The path of source in the store, downloading it if it isn't there. The
+        caller should hold the store lock (shared) until it's done with the path.
+        """
+        last_modified = self._last_modified(source)
+        path = self._lookup(source, last_modified)
+        if path:
+            return path
+
+        lock_path = os.path.join(self.path, "locks", f"{self._source_key(source)}.lock")
+        with self._lock(lock_path):
+            # another worker might have downloaded it while we were waiting
+            path = self._lookup(source, last_modified)
+            if path:
+                return path
+
+            tmp_dir = os.path.join(self.path, "tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            tmp_path = os.path.join(
+                tmp_dir, f"{self._source_key(source)}.{os.getpid()}.part"
+            )
+            Logger.info(f"Downloading test input {source} into the input store")
+            try:
+                self._download(source, tmp_path)
+                digest = self._hash(tmp_path)
+                path = self.object_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, 0o444)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            record = {
+                "source": source,
+                "sha256": digest,
+                "last_modified": last_modified,
+            }
+            record_path = self._record_path(source)
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            with open(f"{record_path}.{os.getpid()}.tmp", "w+") as f:
+                json.dump(record, f)
+            os.replace(f"{record_path}.{os.getpid()}.tmp", record_path)
+
+        return path
+
+    @staticmethod
+    def _hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    # staging
+
+    def stage(self, source: str, dest_dir: str, secondary_files: List[str] = None):
+        """
+        Stage the remote source (and its secondary files) into dest_dir.
+
+        :return: the local path of the staged source
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, os.path.basename(source.split("?")[0]))
+
+        with self._store_lock():
+            self._stage_one(source, dest)
+            for sec in secondary_files or []:
+                sec_source = apply_secondary_file_format_to_filename(source, sec)
+                sec_dest = apply_secondary_file_format_to_filename(dest, sec)
+                if not self._exists(sec_source):
+                    Logger.warn(
+                        f"Couldn't find the secondary file {sec_source}, skipping"
+                    )
+                    continue
+                self._stage_one(sec_source, sec_dest)
+
+        return dest
+
+    def _stage_one(self, source: str, dest: str):
+        path = self.fetch(source)
+        if os.path.exists(dest):
+            os.remove(dest)
+        how = link_or_copy(path, dest)
+        # the object was just used
+        os.utime(path)
+        Logger.debug(f"Staged {source} to {dest} ({how})")
+
+    def stage_inputs(self, tool, inputs: Dict, dest_dir: str) -> Dict:
+        """
+        Replace the remote File (and Array(File)) inputs of tool with staged
+        local files
+        """
+        staged = dict(inputs)
+        for inp in tool.tool_inputs():
+            value = inputs.get(inp.id())
+            intype = inp.intype
+            if isinstance(intype, Array):
+                intype = intype.fundamental_type()
+            if value is None or not isinstance(intype, File):
+                continue
+
+            secondary_files = intype.secondary_files()
+            inp_dir = os.path.join(dest_dir, inp.id())
+            if isinstance(value, list):
+                staged[inp.id()] = [
+                    self.stage(v, os.path.join(inp_dir, str(i)), secondary_files)
+                    if _is_remote(v)
+                    else v
+                    for i, v in enumerate(value)
+                ]
+            elif _is_remote(value):
+                staged[inp.id()] = self.stage(value, inp_dir, secondary_files)
+
+        self.evict()
+        return staged
+
+    # eviction
+
+    def evict(self):
+        """
+        Remove the least recently staged objects until the store is smaller than
+        max_size_gb. Staged inputs that were hardlinked (or copied) are unaffected.
+        """
+        objects_dir = os.path.join(self.path, "objects")
+        if not os.path.exists(objects_dir):
+            return
+
+        with self._store_lock(exclusive=True):
+            objects = []
+            for root, _, files in os.walk(objects_dir):
+                for fn in files:
+                    fp = os.path.join(root, fn)
+                    try:
+                        stat = os.stat(fp)
+                        objects.append((stat.st_mtime, stat.st_size, fp))
+                    except OSError:
+                        continue
+
+            max_size = self.max_size_gb * 1024**3
+            total = sum(o[1] for o in objects)
+            for _, size, fp in sorted(objects):
+                if total <= max_size:
+                    break
+                try:
+                    os.remove(fp)
+                    total -= size
+                except OSError:
+                    pass
@@ -0,0 +1,135 @@
+"""
+Submit many test cases as one job array, instead of one scheduler job each.
+
+`run-test --array` (with a config whose template submits to a scheduler, eg:
+slurm) writes the selected (tool, test case) jobs to a batch directory, and
+submits one array job through the template, where each element runs the test
+case at its index (`run-test --array-element <batch dir>`) and writes its result
+back to the batch directory. The submission waits for the whole array, and the
+results are collected into one report.
+
+The batch directory (in tests_output, which the nodes need to share) has:
+
+    jobs.json           [{"tool_id": ..., "test_case": ...}, ...]
+    results/<i>.json    the result of element i
+    <tool>/<test case>  the output directory of each test case
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from janis_core import Logger
+
+from janisdk.runtest.scheduling import TestJob, failed_result
+
+# the variable the scheduler sets to the index of the array element
+ARRAY_INDEX_VARIABLES = ["SLURM_ARRAY_TASK_ID", "PBS_ARRAY_INDEX", "PBS_ARRAYID"]
+
+# how to make a submission an array (of n elements) that blocks until it's done,
+# by the executable the template submits with
+ARRAY_SUBMIT_ARGS = {
+    "sbatch": lambda n: [f"--array=0-{n - 1}", "--wait"],
+    "qsub": lambda n: ["-J", f"0-{n - 1}", "-W", "block=true"],
+}
+
+
+def get_array_index() -> Optional[int]:
+    for variable in ARRAY_INDEX_VARIABLES:
+        value = os.getenv(variable)
+        if value is not None and value.isdigit():
+            return int(value)
+    return None
+
+
+def prepare_array_command(commands: List[str], n: int) -> Optional[List[str]]:
+    """
+    Turn the (templated) submission of one command into an array of n elements
+
+    :return: None if the executable isn't a scheduler we know how to do this for
+    """
+    if not commands:
+        return None
+    array_args = ARRAY_SUBMIT_ARGS.get(os.path.basename(commands[0]))
+    if array_args is None:
+        return None
+    return [commands[0], *array_args(n), *commands[1:]]
+
+
+class JobArray:
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+
+    @staticmethod
+    def create(output_dir: str, jobs: List[TestJob]) -> "JobArray":
+        arrays_dir = os.path.join(output_dir, "arrays")
+        os.makedirs(arrays_dir, exist_ok=True)
+        # unique, as two arrays can be created in the same second (eg: by two
+        # users of a shared output dir)
+        array = JobArray(
+            tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=arrays_dir)
+        )
+        os.makedirs(os.path.join(array.path, "results"))
+        with open(os.path.join(array.path, "jobs.json"), "w+") as f:
+            json.dump(
+                [{"tool_id": j.tool_id, "test_case": j.test_case} for j in jobs], f
+            )
+        return array
+
+    def jobs(self) -> List[TestJob]:
+        with open(os.path.join(self.path, "jobs.json")) as f:
+            return [TestJob(**j) for j in json.load(f)]
+
+    def job_output_dir(self, job: TestJob) -> str:
+        return os.path.join(self.path, job.tool_id, job.test_case)
+
+    def result_path(self, index: int) -> str:
+        return os.path.join(self.path, "results", f"{index}.json")
+
+    def write_result(self, index: int, result: Dict[str, Any]):
+        path = self.result_path(index)
+        with open(f"{path}.{os.getpid()}.tmp", "w+") as f:
+            json.dump(result, f)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def results(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        (tool, test case, result) of every element, in order
+        """
+        results = []
+        for index, job in enumerate(self.jobs()):
+            try:
+                with open(self.result_path(index)) as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = failed_result(
+                    f"Array element {index} didn't write a result, see its "
+                    f"scheduler log"
+                )
+            results.append((job.tool_id, job.test_case, result))
+        return results
+
+
+def submit_job_array(template, element_command: List[str], n: int) -> int:
+    """
+    Submit element_command as an array of n elements through the environment
+    template, and wait for it to finish.
+
+    :return: the exit code of the submission
+    """
+    commands = template.prepare_run_test_command(element_command)
+    array_commands = prepare_array_command(commands or [], n)
+    if commands == element_command or array_commands is None:
+        raise Exception(
+            f"The environment template ({template.__class__.__name__}) doesn't "
+            f"submit to a scheduler that supports job arrays "
+            f"({', '.join(ARRAY_SUBMIT_ARGS)})"
+        )
+
+    Logger.info(
+        f"Submitting {n} test cases as one job array: '{' '.join(array_commands)}'"
+    )
+    return subprocess.run(array_commands).returncode
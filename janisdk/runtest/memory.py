@@ -0,0 +1,195 @@
+"""
+Measure the peak memory of one test case's run, for the run history.
+
+The MemorySampler samples, on an interval while the test case runs:
+
+    - the resident memory of the processes this process started (the engine,
+      and the jobs it runs, including containers a runtime runs in the process
+      tree, eg: singularity), and
+    - the memory of the docker containers those jobs started, which the docker
+      daemon runs outside the process tree. They're found through the cidfile
+      of the `docker run` (cwltool and Cromwell's local backend both pass one),
+      and their memory read from their cgroup.
+
+The peak is the largest total of a sample. A test case's jobs only run in the
+process tree of the process that runs it when the engine is started for it: a
+Cromwell the config points at (cromwell.url, eg: with --engine-session) runs
+the jobs of every test case, so their memory isn't measured (None).
+
+This needs /proc (Linux), elsewhere the memory isn't measured.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from janis_core import Logger
+
+DEFAULT_INTERVAL = 1
+
+# where a container's memory usage is, by its id, for cgroup v2 and v1 with the
+# systemd or cgroupfs driver
+CONTAINER_MEMORY_FILES = [
+    "/sys/fs/cgroup/system.slice/docker-{cid}.scope/memory.current",
+    "/sys/fs/cgroup/docker/{cid}/memory.current",
+    "/sys/fs/cgroup/memory/system.slice/docker-{cid}.scope/memory.usage_in_bytes",
+    "/sys/fs/cgroup/memory/docker/{cid}/memory.usage_in_bytes",
+]
+
+
+def _read(path: str, mode: str = "r"):
+    try:
+        with open(path, mode) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def get_descendants(pid: int) -> Set[int]:
+    """
+    The pids of every (living) process under pid
+    """
+    children: Dict[int, Set[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        stat = _read(f"/proc/{entry}/stat")
+        if not stat:
+            continue
+        # the command (field 2) is in parentheses and can have spaces
+        ppid = int(stat[stat.rindex(")") + 2 :].split()[1])
+        children.setdefault(ppid, set()).add(int(entry))
+
+    descendants, stack = set(), [pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            if child not in descendants:
+                descendants.add(child)
+                stack.append(child)
+    return descendants
+
+
+def get_rss_bytes(pid: int) -> int:
+    status = _read(f"/proc/{pid}/status") or ""
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+def get_cidfile(pid: int) -> Optional[str]:
+    """
+    The cidfile of a `docker run` process
+    """
+    cmdline = _read(f"/proc/{pid}/cmdline", "rb")
+    if not cmdline:
+        return None
+    args = cmdline.decode(errors="replace").split("\0")
+    if not args or os.path.basename(args[0]) != "docker" or "run" not in args:
+        return None
+    for i, arg in enumerate(args):
+        if arg.startswith("--cidfile="):
+            return arg[len("--cidfile=") :]
+        if arg == "--cidfile" and i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def get_container_memory_bytes(cid: str) -> int:
+    for template in CONTAINER_MEMORY_FILES:
+        value = _read(template.format(cid=cid))
+        if value and value.strip().isdigit():
+            return int(value)
+    return 0
+
+
+class MemorySampler:
+    def __init__(self, pid: Optional[int] = None, interval: float = DEFAULT_INTERVAL):
+        """
+        :param pid: the process whose descendants are sampled (default: this one)
+        :param interval: seconds between samples
+        """
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak_bytes: Optional[int] = None
+        self._cids: Dict[str, str] = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return os.path.isdir("/proc/self")
+
+    def _container_ids(self, pids: Iterable[int]) -> Set[str]:
+        cids = set()
+        for pid in pids:
+            cidfile = get_cidfile(pid)
+            if not cidfile:
+                continue
+            # the file is written once docker has created the container
+            if cidfile not in self._cids:
+                cid = (_read(cidfile) or "").strip()
+                if not cid:
+                    continue
+                self._cids[cidfile] = cid
+            cids.add(self._cids[cidfile])
+        return cids
+
+    def sample(self) -> int:
+        """
+        The memory (bytes) of the process tree, and its docker containers
+        """
+        pids = get_descendants(self.pid)
+        total = sum(get_rss_bytes(p) for p in pids)
+        total += sum(get_container_memory_bytes(c) for c in self._container_ids(pids))
+        self.peak_bytes = max(self.peak_bytes or 0, total)
+        return total
+
+    def _sample_until_stopped(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                Logger.debug(f"Couldn't sample the memory of the test case: {e}")
+            if self._stopped.wait(self.interval):
+                return
+
+    def start(self):
+        if not self.is_supported():
+            return
+        self._thread = threading.Thread(target=self._sample_until_stopped, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Optional[float]:
+        """
+        :return: the peak memory (MB), or None if it wasn't sampled
+        """
+        if self._thread:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        return self.peak_mb()
+
+    def peak_mb(self) -> Optional[float]:
+        if self.peak_bytes is None:
+            return None
+        return round(self.peak_bytes / 1024**2, 1)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def uses_external_engine(engine, config) -> bool:
+    """
+    Whether the jobs of a run are run by an engine that was already running (so
+    they're not under the process that runs the test case)
+
+    :param config: the JanisConfiguration of the run (or None)
+    """
+    if getattr(engine, "value", engine) != "cromwell" or config is None:
+        return False
+    return bool(getattr(getattr(config, "cromwell", None), "url", None))
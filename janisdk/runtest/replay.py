@@ -0,0 +1,180 @@
+"""
+Replay recorded engine outputs through the expected-output checks of the test
+cases, without running an engine.
+
+A recording is a JSON object:
+
+    {"tool": "bwamem", "test_case": "basic", "output": {"out": "/path/to/out.bam"}}
+
+and recordings are read from a JSON-lines file, or a directory of them (every
+*.jsonl file, and every *.json file with one recording, recursively). Each
+tool's recordings are checked in one worker (so its remote expected files are
+only downloaded once), and the workers run in parallel.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from janis_core import Logger
+
+from janisdk.runtest.scheduling import failed_result
+
+
+class RecordedOutput:
+    def __init__(self, tool_id: str, test_case: str, output: Dict, source: str):
+        """
+        :param source: where the recording was read from (path, or path:line)
+        """
+        self.tool_id = tool_id
+        self.test_case = test_case
+        self.output = output
+        self.source = source
+
+    @staticmethod
+    def from_dict(d: Dict, source: str) -> "RecordedOutput":
+        if not isinstance(d, dict):
+            raise ValueError(f"a recording must be an object, not {type(d).__name__}")
+        missing = [k for k in ("tool", "test_case", "output") if k not in d]
+        if missing:
+            raise ValueError(f"recording is missing: {', '.join(missing)}")
+        if not isinstance(d["output"], dict):
+            raise ValueError("the 'output' of a recording must be a dictionary")
+        return RecordedOutput(d["tool"], d["test_case"], d["output"], source)
+
+
+def _read_jsonl(path: str) -> Iterator[RecordedOutput]:
+    with open(path) as f:
+        for i, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield RecordedOutput.from_dict(json.loads(line), f"{path}:{i}")
+            except ValueError as e:
+                Logger.warn(f"Skipping the recording at {path}:{i}: {e}")
+
+
+def read_recorded_outputs(path: str) -> List[RecordedOutput]:
+    if os.path.isfile(path):
+        return list(_read_jsonl(path))
+
+    recordings = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for fn in sorted(files):
+            fp = os.path.join(root, fn)
+            if fn.endswith(".jsonl"):
+                recordings.extend(_read_jsonl(fp))
+            elif fn.endswith(".json"):
+                try:
+                    with open(fp) as f:
+                        recordings.append(RecordedOutput.from_dict(json.load(f), fp))
+                except ValueError as e:
+                    Logger.warn(f"Skipping the recording at {fp}: {e}")
+
+    return recordings
+
+
+def _replay_tool(
+    tool_id: str, recordings: List[Tuple[str, Dict, str]], engine: str
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Runs in the pool worker: check each (test case, output, source) of one tool
+    """
+    from janisdk.runtest.runner import run_test_case
+
+    results = []
+    for test_case, output, source in recordings:
+        try:
+            result = run_test_case(
+                tool_id=tool_id,
+                test_case=test_case,
+                engine=engine,
+                output=output,
+                use_cache=False,
+            )
+        except Exception as e:
+            result = {
+                "failed": [],
+                "succeeded": [],
+                "output": output,
+                "execution_error": str(e),
+            }
+        result["test_case"] = test_case
+        results.append((source, result))
+
+    return results
+
+
+def replay(
+    recordings: List[RecordedOutput], engine: str, jobs: Optional[int] = None
+) -> List[Tuple[RecordedOutput, Dict[str, Any]]]:
+    """
+    :return: (recording, result) in the order of recordings
+    """
+    by_tool: Dict[str, List[RecordedOutput]] = {}
+    for r in recordings:
+        by_tool.setdefault(r.tool_id, []).append(r)
+
+    by_source = {r.source: r for r in recordings}
+    results: Dict[str, Dict[str, Any]] = {}
+
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(by_tool)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _replay_tool,
+                tool_id,
+                [(r.test_case, r.output, r.source) for r in tool_recordings],
+                engine,
+            ): tool_id
+            for tool_id, tool_recordings in by_tool.items()
+        }
+        for future in as_completed(futures):
+            tool_id = futures[future]
+            try:
+                for source, result in future.result():
+                    results[source] = result
+            except Exception as e:
+                # eg: the worker crashed, each of its recordings failed
+                error = f"Couldn't replay the recordings of '{tool_id}': {repr(e)}"
+                Logger.critical(error)
+                for r in by_tool[tool_id]:
+                    results.setdefault(
+                        r.source,
+                        {
+                            **failed_result(error),
+                            "output": r.output,
+                            "test_case": r.test_case,
+                        },
+                    )
+
+    return [(by_source[s], results[s]) for s in by_source]
+
+
+def write_replay_report(
+    results: List[Tuple[RecordedOutput, Dict[str, Any]]], report_path: str
+):
+    succeeded = [r for _, r in results if not r["failed"] and not r["execution_error"]]
+    report = {
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "results": [
+            {
+                "tool": recording.tool_id,
+                "test_case": recording.test_case,
+                "source": recording.source,
+                "failed": result["failed"],
+                "succeeded": result["succeeded"],
+                "execution_error": result["execution_error"],
+                "timings": result.get("timings"),
+            }
+            for recording, result in results
+        ],
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w+") as f:
+        json.dump(report, f, indent=2)
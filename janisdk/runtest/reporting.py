@@ -0,0 +1,371 @@
+"""
+Report test results to the Test Manager API and Slack.
+
+Reports are sent by a StatusReporter on a background thread, through one pooled
+session (with retries and backoff), so a slow endpoint doesn't hold up the tests.
+It either sends an update (and notification) per test case, or, with batch=True,
+combines the run into one Test Manager update and one Slack summary when it's
+closed.
+"""
+
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from janis_core import Logger
+
+
+class UpdateStatusOption:
+    def __init__(self, url: str, token: str, method: Optional[str] = "patch"):
+        self.url = url
+        self.token = token
+        self.method = method
+
+
+class NotificationOption:
+    def __init__(
+        self, url: str, tool_name: str, test_case: str, test_id: Optional[str] = None
+    ):
+        self.url = url
+        self.tool_name = tool_name
+        self.test_case = test_case
+        self.test_id = test_id
+
+
+# seconds to wait for an endpoint (to connect, or for a response)
+REQUEST_TIMEOUT = 30
+
+
+def is_succeeded(result: Dict) -> bool:
+    return len(result["failed"]) == 0 and not result["execution_error"]
+
+
+def update_status(result: Dict, option: UpdateStatusOption, session=None):
+    Logger.info(f"Updating test status via {option.method} {option.url}")
+
+    status = "test-succeeded" if is_succeeded(result) else "test-failed"
+    data = {"status": status, **result}
+
+    headers = {"Authorization": f"Bearer {option.token}"}
+    resp = (session or requests).request(
+        method=option.method,
+        url=option.url,
+        json=data,
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    Logger.info("status updated")
+    Logger.info(f"Response code {resp.status_code}")
+    Logger.info(f"Response:\n{resp.text}")
+
+    return resp.status_code, resp.text
+
+
+def send_slack_blocks(url: str, blocks: List[Dict], session=None):
+    resp = (session or requests).post(
+        url=url, json={"blocks": blocks}, timeout=REQUEST_TIMEOUT
+    )
+
+    if resp.status_code == requests.codes.ok:
+        Logger.info("Notification sent")
+    else:
+        Logger.warn("Failed to send slack notification")
+        Logger.warn(f"{resp.status_code}: {resp.text}")
+
+    return resp.status_code, resp.text
+
+
+def send_slack_notification(result: Dict, option: NotificationOption, session=None):
+    Logger.info("sending notification to Slack")
+
+    if is_succeeded(result):
+        failed = False
+        status = "Test Succeeded"
+        icon = ":white_check_mark:"
+    else:
+        failed = True
+        status = "Test Failed"
+        icon = ":x:"
+
+    test_description = ""
+    if option.test_id:
+        test_description = f" *{option.test_id}*"
+
+    summary_block = {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"{icon} {status}{test_description}: {option.tool_name} - {option.test_case}",
+        },
+    }
+
+    blocks = [summary_block]
+
+    if failed and result["failed"]:
+        failed_expected_output = []
+
+        for f in result["failed"]:
+            failed_expected_output.append(f":black_small_square: {f}")
+
+        failed_block = {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "\n".join(failed_expected_output)},
+        }
+
+        blocks.append(failed_block)
+
+    if result["execution_error"]:
+        execution_error_block = {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": f"{result['execution_error']}"},
+        }
+
+        blocks.append(execution_error_block)
+
+    return send_slack_blocks(option.url, blocks, session=session)
+
+
+def update_status_summary(
+    results: List[Tuple[str, str, Dict]], option: UpdateStatusOption, session=None
+):
+    """
+    One Test Manager update for a whole run of (tool, test case, result)
+    """
+    Logger.info(
+        f"Updating test status of {len(results)} test cases via {option.method} {option.url}"
+    )
+
+    succeeded = all(is_succeeded(r) for _, _, r in results)
+    data = {
+        "status": "test-succeeded" if succeeded else "test-failed",
+        "results": [
+            {
+                "tool": tool_id,
+                "test_case": test_case,
+                "status": "test-succeeded" if is_succeeded(r) else "test-failed",
+                **r,
+            }
+            for tool_id, test_case, r in results
+        ],
+    }
+
+    headers = {"Authorization": f"Bearer {option.token}"}
+    resp = (session or requests).request(
+        method=option.method,
+        url=option.url,
+        json=data,
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    Logger.info(f"Response code {resp.status_code}")
+    return resp.status_code, resp.text
+
+
+def send_slack_summary(
+    results: List[Tuple[str, str, Dict]],
+    url: str,
+    test_id: Optional[str] = None,
+    session=None,
+):
+    """
+    One Slack notification for a whole run of (tool, test case, result)
+    """
+    Logger.info("sending summary notification to Slack")
+
+    failed = [(t, tc, r) for t, tc, r in results if not is_succeeded(r)]
+    icon = ":x:" if failed else ":white_check_mark:"
+    test_description = f" *{test_id}*" if test_id else ""
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"{icon} {len(results) - len(failed)}/{len(results)} "
+                f"test cases succeeded{test_description}",
+            },
+        }
+    ]
+
+    if failed:
+        lines = []
+        for tool_id, test_case, r in failed:
+            reason = (
+                r["execution_error"] or f"{len(r['failed'])} expected output FAILED"
+            )
+            lines.append(f":black_small_square: {tool_id} - {test_case}: {reason}")
+        blocks.append(
+            {"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)}}
+        )
+
+    return send_slack_blocks(url, blocks, session=session)
+
+
+def create_session(retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    A session with pooled connections, that retries connection errors and
+    (rate limited, or server) error responses with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,  # retry PATCH / POST too
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class StatusReporter:
+    """
+    Send test results to the Test Manager and Slack from a background thread.
+
+        with StatusReporter(...) as reporter:
+            for ...:
+                reporter.report(result, tool_id, test_case)
+
+    Leaving the block (or close()) waits for everything to be sent.
+    """
+
+    def __init__(
+        self,
+        test_manager_url: Optional[str] = None,
+        test_manager_token: Optional[str] = None,
+        slack_notification_url: Optional[str] = None,
+        test_id: Optional[str] = None,
+        batch: bool = False,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+    ):
+        self.update_status_option = None
+        if test_manager_url and test_manager_token:
+            self.update_status_option = UpdateStatusOption(
+                url=test_manager_url, token=test_manager_token
+            )
+        self.slack_notification_url = slack_notification_url
+        self.test_id = test_id
+        self.batch = batch
+
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+        self.results: List[Tuple[str, str, Dict]] = []
+        self._queue = queue.Queue()
+        self._session = None
+        self._thread = None
+
+    @staticmethod
+    def from_args(args) -> "StatusReporter":
+        return StatusReporter(
+            test_manager_url=args.test_manager_url,
+            test_manager_token=args.test_manager_token,
+            slack_notification_url=args.slack_notification_url,
+            test_id=args.test_id,
+            batch=args.batch_report,
+        )
+
+    @property
+    def is_enabled(self) -> bool:
+        return bool(self.update_status_option or self.slack_notification_url)
+
+    def report(self, result: Dict, tool_id: str, test_case: str):
+        """
+        Queue the result to be sent, this doesn't wait for the network
+        """
+        if not self.is_enabled:
+            return
+        if self.batch:
+            self.results.append((tool_id, test_case, result))
+            return
+
+        if self.update_status_option:
+            self._submit(
+                update_status,
+                result,
+                self.update_status_option,
+                failure=f"Failed to update test status to {self.update_status_option.url}",
+            )
+        if self.slack_notification_url:
+            option = NotificationOption(
+                url=self.slack_notification_url,
+                tool_name=tool_id,
+                test_case=test_case,
+                test_id=self.test_id,
+            )
+            self._submit(
+                send_slack_notification,
+                result,
+                option,
+                failure=f"Failed to send notifications to Slack {self.slack_notification_url}",
+            )
+
+    def close(self):
+        """
+        Send the summary (with batch=True), and wait for everything to be sent
+        """
+        if self.batch and self.results:
+            if self.update_status_option:
+                self._submit(
+                    update_status_summary,
+                    self.results,
+                    self.update_status_option,
+                    failure=f"Failed to update test status to {self.update_status_option.url}",
+                )
+            if self.slack_notification_url:
+                self._submit(
+                    send_slack_summary,
+                    self.results,
+                    self.slack_notification_url,
+                    self.test_id,
+                    failure=f"Failed to send notifications to Slack {self.slack_notification_url}",
+                )
+            self.results = []
+
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _submit(self, func, *args, failure: str):
+        if self._thread is None:
+            # started on the first report, so it's not running while the test
+            # runners are forked
+            self._session = create_session(
+                retries=self.retries, backoff_factor=self.backoff_factor
+            )
+            self._thread = threading.Thread(
+                target=self._send_loop, name="janisdk-reporter", daemon=True
+            )
+            self._thread.start()
+        self._queue.put((func, args, failure))
+
+    def _send_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            func, args, failure = item
+            try:
+                func(*args, session=self._session)
+            except Exception as e:
+                Logger.warn(f"{failure}: {repr(e)}")
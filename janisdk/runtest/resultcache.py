@@ -0,0 +1,308 @@
+"""
+Cache the results of test cases, so a test case is only run again when
+something that could change its result has changed.
+
+A result is keyed on a hash of:
+
+    - the tool translated to WDL (so any change to the tool, or to a step of a
+      workflow, changes the key),
+    - the containers the tool uses (their digest when we can find it, looked up
+      again once the cached digest is older than the max digest age, as a tag
+      can be pushed again),
+    - the test case's inputs (local files are hashed by their contents),
+    - the test case's expected outputs (the contents of any expected files, and
+      the source of the operators and preprocessors),
+    - the engine.
+
+Only results of test cases that ran (ie: not a dry run with a provided output)
+and that didn't fail to execute are cached, so an engine or infrastructure
+failure is retried. Entries older than the max age are evicted, and then the
+least recently used entries until the cache is under the max size.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import time
+from types import CodeType
+from typing import Any, Dict, Optional
+
+from janis_core import Logger
+
+from janis.cache import get_cache_dir
+
+ENV_MAX_SIZE_MB = "JANISDK_RESULT_CACHE_MAX_SIZE_MB"
+ENV_MAX_AGE_DAYS = "JANISDK_RESULT_CACHE_MAX_AGE_DAYS"
+ENV_DIGEST_MAX_AGE_HOURS = "JANISDK_DIGEST_MAX_AGE_HOURS"
+
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_DIGEST_MAX_AGE_HOURS = 24
+
+# (path, mtime, size) -> sha256 of the contents
+_file_hashes: Dict[tuple, str] = {}
+
+
+def _hash_file(path: str) -> str:
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+def _hash_code(value) -> Optional[str]:
+    """
+    The hash of the source of a function or class, or of its bytecode (and
+    constants) when the source isn't available (eg: it was exec'd)
+    """
+    try:
+        source = inspect.getsource(value).encode()
+    except (OSError, TypeError):
+        code = getattr(value, "__code__", None)
+        if not isinstance(code, CodeType):
+            # eg: a builtin
+            return None
+        consts = [c for c in code.co_consts if not isinstance(c, CodeType)]
+        source = code.co_code + repr(consts).encode()
+    return hashlib.sha256(source).hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """
+    A JSON-serialisable form of value, where local files are replaced by the
+    hash of their contents, and callables by their qualified name (or an
+    instance by its repr) and the hash of their source.
+    """
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        values = [_canonical(v) for v in value]
+        return sorted(values, key=json.dumps) if isinstance(value, set) else values
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            return {"file": value, "sha256": _hash_file(value)}
+        return value
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if hasattr(value, "value") and hasattr(type(value), "__members__"):
+        # Enum, eg: TTestPreprocessor
+        return value.value
+    if callable(value):
+        if not hasattr(value, "__qualname__"):
+            # an instance (eg: TableTolerance), by its parameters if it has a
+            # __repr__ (the default one has its id, which changes every run)
+            cls = type(value)
+            name = f"{cls.__module__}.{cls.__qualname__}"
+            if cls.__repr__ is not object.__repr__:
+                name = repr(value)
+            return {"callable": name, "sha256": _hash_code(cls)}
+        name = f"{getattr(value, '__module__', '')}.{value.__qualname__}"
+        return {"callable": name, "sha256": _hash_code(value)}
+    return repr(value)
+
+
+def _expire_digest(container: str, cache_location: str, max_age_hours: float):
+    """
+    Forget the digest janis cached for container if it's older than
+    max_age_hours, so it's looked up again (the tag may have been pushed again)
+    """
+    from janis_assistant.data.container import (
+        get_cache_path_from_container,
+        in_memory_cache,
+    )
+
+    path = get_cache_path_from_container(
+        cache_location=cache_location, container=container
+    )
+    try:
+        if time.time() - os.stat(path).st_mtime <= max_age_hours * 3600:
+            return
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        Logger.debug(f"Couldn't remove the cached digest of {container}: {e}")
+    in_memory_cache.pop(container, None)
+
+
+def get_container_digests(
+    tool, config=None, max_age_hours: Optional[float] = None
+) -> Dict[str, str]:
+    """
+    {container: container@digest} for the containers of tool, where we can't
+    find a digest the container (tag) is used as is.
+
+    :param max_age_hours: look up the digests cached before this again
+    """
+    containers = sorted(set(c for c in (tool.containers() or {}).values() if c))
+    if not containers:
+        return {}
+
+    if max_age_hours is None:
+        max_age_hours = float(
+            os.getenv(ENV_DIGEST_MAX_AGE_HOURS, DEFAULT_DIGEST_MAX_AGE_HOURS)
+        )
+
+    try:
+        from janis_assistant.data.container import get_digest_from_container
+
+        cache_location = getattr(config, "digest_cache_location", None)
+        cache_location = cache_location or get_cache_dir("digests")
+        digests = {}
+        for c in containers:
+            _expire_digest(c, cache_location, max_age_hours)
+            digest = get_digest_from_container(c, cache_location=cache_location)
+            digests[c] = digest or c
+        return digests
+    except Exception as e:
+        Logger.debug(f"Couldn't get the digests of the containers: {repr(e)}")
+        return {c: c for c in containers}
+
+
+def compute_test_case_key(
+    tool,
+    test_case,
+    engine: str,
+    config=None,
+    containers: Dict[str, str] = None,
+    fixtures: Optional[Dict] = None,
+) -> str:
+    """
+    :param tool: the Tool to run
+    :param test_case: the TTestCase (of tool) to run
+    :param engine: the EngineType (or its value) to run the test case with
+    :param containers: the container digests of tool if they've already been
+        looked up (see get_container_digests)
+    :param fixtures: how the fast fixtures the test case is run with are made
+        (see get_fixture_recipe), if it's run with them
+    """
+    translated = tool.translate("wdl", to_console=False, allow_empty_container=True)
+    if isinstance(translated, tuple):
+        # workflow: (workflow, inputs, tools)
+        translated = list(translated)
+
+    expected_outputs = [
+        {
+            "tag": o.tag,
+            "preprocessor": o.preprocessor,
+            "operator": o.operator,
+            "expected_value": o.expected_value,
+            "expected_file": o.expected_file,
+            "file_diff_source": o.file_diff_source,
+            "array_index": o.array_index,
+            "suffix": o.suffix,
+            "preprocessor_params": o.preprocessor_params,
+        }
+        for o in test_case.output
+    ]
+
+    structure = {
+        "version": ResultCache.VERSION,
+        "tool": [tool.id(), tool.version(), translated],
+        "containers": containers
+        if containers is not None
+        else get_container_digests(tool, config=config),
+        "inputs": test_case.input,
+        "outputs": expected_outputs,
+        "engine": getattr(engine, "value", engine),
+    }
+    if fixtures is not None:
+        structure["fixtures"] = fixtures
+
+    serialised = json.dumps(_canonical(structure), sort_keys=True)
+    return hashlib.sha256(serialised.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    A directory of {key}.json results. An entry's mtime is when it was last
+    used, which is what the eviction orders by.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size_mb: Optional[float] = None,
+        max_age_days: Optional[float] = None,
+    ):
+        self.path = path or get_cache_dir("runtest", "results")
+        self.max_size_mb = (
+            max_size_mb
+            if max_size_mb is not None
+            else float(os.getenv(ENV_MAX_SIZE_MB, DEFAULT_MAX_SIZE_MB))
+        )
+        self.max_age_days = (
+            max_age_days
+            if max_age_days is not None
+            else float(os.getenv(ENV_MAX_AGE_DAYS, DEFAULT_MAX_AGE_DAYS))
+        )
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.entry_path(key)
+        try:
+            with open(path) as f:
+                record = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - record.get("created", 0) > self.max_age_days * 86400:
+            return None
+        return record.get("result")
+
+    def put(self, key: str, result: Dict[str, Any]):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            path = self.entry_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w+") as f:
+                json.dump({"created": time.time(), "result": result}, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            Logger.warn(f"Couldn't cache the test result to '{self.path}': {e}")
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the entries older than max_age_days, and then the least recently
+        used until the cache is smaller than max_size_mb.
+        """
+        try:
+            names = [n for n in os.listdir(self.path) if n.endswith(".json")]
+        except OSError:
+            return
+
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+            except OSError:
+                continue
+
+        now = time.time()
+        max_size = self.max_size_mb * 1024 * 1024
+        total = sum(e[1] for e in entries)
+
+        # least recently used first
+        for mtime, size, name in sorted(entries):
+            if now - mtime <= self.max_age_days * 86400 and total <= max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+                total -= size
+            except OSError:
+                pass
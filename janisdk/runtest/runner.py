@@ -1,27 +1,66 @@
+import argparse
 import ast
-import requests
-from typing import List, Dict, Any, Optional
-from janis_core.tool.test_suite_runner import ToolTestSuiteRunner
-from janis_core.tool import test_helpers
+import os
+import shlex
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from janis_core.tool.test_classes import TTestCase
+from janis_core.tool.test_helpers import print_test_report
 from janis_core import Logger
 from janis_assistant.engines.enginetypes import EngineType
 
-
-class UpdateStatusOption:
-    def __init__(self, url: str, token: str, method: Optional[str] = "patch"):
-        self.url = url
-        self.token = token
-        self.method = method
-
-
-class NotificationOption:
-    def __init__(
-        self, url: str, tool_name: str, test_case: str, test_id: Optional[str] = None
-    ):
-        self.url = url
-        self.tool_name = tool_name
-        self.test_case = test_case
-        self.test_id = test_id
+from janisdk.runtest import add_runtest_args
+from janisdk.runtest.reporting import (
+    NotificationOption,
+    StatusReporter,
+    UpdateStatusOption,
+    send_slack_notification,
+    update_status,
+)
+from janisdk.runtest.changes import find_affected_tools
+from janisdk.runtest.enginestatus import watch_engine_status
+from janisdk.runtest.failfast import FailFastToolTestSuiteRunner
+from janisdk.runtest.history import open_run_history, print_history
+from janisdk.runtest.fixtures import (
+    FixtureStore,
+    get_fixture_recipe,
+    split_fixture_outputs,
+)
+from janisdk.runtest.inputstore import InputStore
+from janisdk.runtest.jobarray import (
+    ARRAY_INDEX_VARIABLES,
+    JobArray,
+    get_array_index,
+    submit_job_array,
+)
+from janisdk.runtest.memory import MemorySampler, uses_external_engine
+from janisdk.runtest.replay import (
+    read_recorded_outputs,
+    replay,
+    write_replay_report,
+)
+from janisdk.runtest.resultcache import (
+    ResultCache,
+    compute_test_case_key,
+    get_container_digests,
+)
+from janisdk.runtest.scheduling import (
+    DurationHistory,
+    ResourceScheduler,
+    TestJob,
+    get_tool_resources,
+    run_test_cases_in_parallel,
+    skipped_result,
+)
+from janisdk.runtest.session import SESSION_ENGINES, EngineSession
+from janisdk.runtest.timings import (
+    PhaseTimer,
+    TimedToolTestSuiteRunner,
+    write_timings_json,
+)
+from janisdk.runtest.watch import ToolWatcher
+from janisdk.runtest.workqueue import QueueWorker, WorkQueue
+from janisdk.shed.hydrationcache import get_one_tool
+from janisdk.shed.registry import ToolRegistry
 
 
 class TestCasesNotFound(Exception):
@@ -34,14 +73,31 @@ def run_test_case(
     engine: EngineType,
     output: Optional[Dict] = None,
     config: str = None,
+    output_dir: Optional[str] = None,
+    use_cache: bool = True,
+    use_input_store: bool = True,
+    fail_fast: bool = False,
+    fast_fixtures: bool = False,
 ) -> Dict[str, Any]:
-    tool = test_helpers.get_one_tool(tool_id)
+    timer = PhaseTimer()
+
+    with timer.phase("resolve_tool"):
+        tool = get_one_tool(tool_id)
 
     if not tool:
         raise Exception(f"Tool {tool_id} not found")
 
-    runner = ToolTestSuiteRunner(tool, config=config)
-    tests_to_run = [tc for tc in tool.tests() if tc.name.lower() == test_case.lower()]
+    # abort the run as soon as one of its jobs fails
+    runner_class = (
+        FailFastToolTestSuiteRunner if fail_fast else TimedToolTestSuiteRunner
+    )
+    runner = runner_class(tool, config=config, timer=timer)
+    if output_dir:
+        runner.output_dir = output_dir
+    with timer.phase("load_tests"):
+        tests_to_run = [
+            tc for tc in tool.tests() if tc.name.lower() == test_case.lower()
+        ]
 
     if not tests_to_run:
         raise Exception(f"Test case {test_case} not found")
@@ -56,29 +112,174 @@ def run_test_case(
             "Dryrun: validating test using provided output data without running the workflow"
         )
 
+    # what was run, for the run history
+    dry_run = output is not None
+    run_details = {
+        "tool_version": tool.version(),
+        "engine": getattr(engine, "value", engine),
+        "containers": None,
+        "dry_run": dry_run,
+        "fast_fixtures": fast_fixtures and not dry_run,
+    }
+    # looking up the digests can take a request per container, they're only
+    # needed for the cache key, and for the run history (which doesn't record
+    # runs with fast fixtures)
+    if not dry_run and (use_cache or not run_details["fast_fixtures"]):
+        run_details["containers"] = get_container_digests(tool, config=config)
+
+    # a dry run doesn't run the engine, so there's nothing to save by caching it
+    cache, cache_key = None, None
+    if use_cache and not dry_run:
+        try:
+            with timer.phase("cache_lookup"):
+                cache = ResultCache()
+                cache_key = compute_test_case_key(
+                    tool,
+                    tests_to_run[0],
+                    engine,
+                    config,
+                    containers=run_details["containers"],
+                    fixtures=get_fixture_recipe() if fast_fixtures else None,
+                )
+                cached = cache.get(cache_key)
+            if cached is not None:
+                Logger.info(
+                    f"Using the cached result of {tool_id}/{test_case} "
+                    f"(nothing it depends on has changed), run with --no-cache to rerun"
+                )
+                return {
+                    **cached,
+                    **run_details,
+                    "cached": True,
+                    "timings": timer.to_dict(),
+                }
+        except Exception as e:
+            Logger.warn(f"Couldn't look up the cached test result: {repr(e)}")
+            cache = None
+
+    test_to_run = tests_to_run[0]
+    if use_input_store and not dry_run:
+        test_to_run = stage_test_inputs(tool, test_to_run, runner, timer)
+    not_comparable = []
+    if fast_fixtures and not dry_run:
+        test_to_run, not_comparable = stage_test_fixtures(
+            tool, test_to_run, runner, timer
+        )
+
     failed = set()
     succeeded = set()
     execution_error = ""
 
+    sampler = None
     try:
-        failed, succeeded, output = runner.run_one_test_case(
-            t=tests_to_run[0], engine=engine, output=output
-        )
+        # the memory of the engine and its jobs, unless they're shared
+        if not dry_run and not uses_external_engine(engine, runner.config):
+            sampler = MemorySampler()
+            sampler.start()
+        with watch_engine_status():
+            failed, succeeded, output = runner.run_one_test_case(
+                t=test_to_run, engine=engine, output=output
+            )
     except Exception as e:
         execution_error = str(e)
     except SystemExit as e:
         execution_error = f"Workflow execution failed (exit code: {e.code})"
 
-    return {
+    peak_memory_mb = sampler.stop() if sampler else None
+
+    if getattr(runner, "failed_job", None):
+        execution_error = (
+            f"Aborted as the job '{runner.failed_job}' failed (--fail-fast)"
+        )
+
+    result = {
         "failed": list(failed),
         "succeeded": list(succeeded),
         "output": output,
         "execution_error": execution_error,
     }
+    if not_comparable:
+        result["not_comparable"] = [str(o) for o in not_comparable]
+
+    # don't cache an execution error, as it could be the engine or infrastructure
+    if cache and not execution_error:
+        with timer.phase("cache_store"):
+            cache.put(cache_key, result)
+
+    result.update(run_details)
+    result["cached"] = False
+    result["timings"] = timer.to_dict()
+    result["peak_memory_mb"] = peak_memory_mb
+    return result
+
+
+def stage_test_inputs(tool, test_case, runner, timer: PhaseTimer):
+    """
+    Stage the remote inputs of test_case from the local input store, next to
+    (as janis wants an empty directory) the runner's output directory
+    """
+    staging_dir = os.path.join(
+        os.path.dirname(runner.cached_input_files_dir),
+        "staged_inputs",
+        tool.id(),
+        test_case.name,
+    )
+    try:
+        with timer.phase("stage_inputs"):
+            inputs = InputStore().stage_inputs(tool, test_case.input, staging_dir)
+        return TTestCase(name=test_case.name, input=inputs, output=test_case.output)
+    except Exception as e:
+        Logger.warn(
+            f"Couldn't stage the inputs of {tool.id()}/{test_case.name} from the "
+            f"input store, janis will localise them instead: {repr(e)}"
+        )
+        return test_case
+
+
+def stage_test_fixtures(
+    tool, test_case, runner, timer: PhaseTimer
+) -> Tuple[TTestCase, List]:
+    """
+    Replace the (local) inputs of test_case that have a fast fixture with it,
+    and drop the expected outputs that can't be checked with fixtures
+
+    :return: (the test case to run, the expected outputs that were dropped)
+    """
+    fixtures_dir = os.path.join(
+        os.path.dirname(runner.cached_input_files_dir),
+        "fixtures",
+        tool.id(),
+        test_case.name,
+    )
+    try:
+        with timer.phase("stage_fixtures"):
+            inputs = FixtureStore().stage_inputs(tool, test_case.input, fixtures_dir)
+    except Exception as e:
+        Logger.warn(
+            f"Couldn't generate the fast fixtures of {tool.id()}/{test_case.name}, "
+            f"running it with its original inputs: {repr(e)}"
+        )
+        return test_case, []
+
+    if inputs == test_case.input:
+        # none of its inputs have a fixture, so its outputs can all be checked
+        return test_case, []
+
+    comparable, not_comparable = split_fixture_outputs(test_case.output)
+    if not_comparable:
+        Logger.info(
+            f"Not checking {len(not_comparable)} expected outputs of "
+            f"{tool.id()}/{test_case.name} that depend on the full inputs "
+            f"(--fast-fixtures)"
+        )
+    return (
+        TTestCase(name=test_case.name, input=inputs, output=comparable),
+        not_comparable,
+    )
 
 
 def find_test_cases(tool_id: str):
-    tool = test_helpers.get_one_tool(tool_id)
+    tool = get_one_tool(tool_id)
 
     if not tool:
         raise Exception(f"Tool {tool_id} not found")
@@ -92,211 +293,571 @@ def find_test_cases(tool_id: str):
     return [tc.name for tc in tool.tests()]
 
 
-def update_status(result: Dict, option: UpdateStatusOption):
-    Logger.info(f"Updating test status via {option.method} {option.url}")
+def cli_logging(result: Dict):
+    name = result["test_case"]
+    Logger.info(f"Test Case: {name}")
+    Logger.info(f"Output: {result['output']}")
 
-    status = "test-failed"
-    if not len(result["failed"]) and not result["execution_error"]:
-        status = "test-succeeded"
+    if result["execution_error"]:
+        Logger.critical(result["execution_error"])
 
-    data = {"status": status, **result}
+    if len(result["succeeded"]) > 0:
+        Logger.info(f"{len(result['succeeded'])} expected output PASSED")
 
-    headers = {"Authorization": f"Bearer {option.token}"}
-    resp = requests.request(
-        method=option.method, url=option.url, json=data, headers=headers
-    )
+        Logger.info("Succeeded expected output:")
+        for s in result["succeeded"]:
+            Logger.info(s)
 
-    Logger.info("status updated")
-    Logger.info(f"Response code {resp.status_code}")
-    Logger.info(f"Response:\n{resp.text}")
+    if len(result["failed"]) > 0:
+        Logger.critical(f"{len(result['failed'])} expected output FAILED")
 
-    return resp.status_code, resp.text
+        Logger.critical("Failed expected output:")
+        for f in result["failed"]:
+            Logger.critical(f)
 
+    if result.get("not_comparable"):
+        Logger.info(
+            "Expected output NOT COMPARABLE with the fast fixtures (not checked):"
+        )
+        for o in result["not_comparable"]:
+            Logger.info(o)
 
-def send_slack_notification(result: Dict, option: NotificationOption):
-    Logger.info("sending notification to Slack")
+    if result.get("timings"):
+        timings = ", ".join(f"{k}: {v:.2f}s" for k, v in result["timings"].items())
+        Logger.info(f"Timings: {timings}")
 
     if len(result["failed"]) == 0 and not result["execution_error"]:
-        failed = False
-        status = "Test Succeeded"
-        icon = ":white_check_mark:"
+        Logger.info(f"Test SUCCEEDED: {name}")
     else:
-        failed = True
-        status = "Test Failed"
-        icon = ":x:"
-
-    test_description = ""
-    if option.test_id:
-        test_description = f" *{option.test_id}*"
-
-    summary_block = {
-        "type": "section",
-        "text": {
-            "type": "mrkdwn",
-            "text": f"{icon} {status}{test_description}: {option.tool_name} - {option.test_case}",
-        },
-    }
+        Logger.critical(f"Test FAILED: {name}")
 
-    blocks = [summary_block]
 
-    if failed and result["failed"]:
-        failed_expected_output = []
+def select_test_cases(tool_id: str, test_case: Optional[str] = None) -> List[str]:
+    """
+    The test cases of tool_id, or only test_case
+    """
+    try:
+        available_test_cases = find_test_cases(tool_id)
+        if test_case:
+            if test_case not in available_test_cases:
+                raise TestCasesNotFound(f"Test case with name `{test_case}` NOT found.")
+            return [test_case]
+        return available_test_cases
 
-        for f in result["failed"]:
-            failed_expected_output.append(f":black_small_square: {f}")
+    except Exception as e:
+        Logger.critical("Unexpected error occurred when searching for test cases")
+        Logger.critical(str(e))
+        exit()
 
-        failed_block = {
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "\n".join(failed_expected_output)},
-        }
 
-        blocks.append(failed_block)
+def execute(args):
+    output = None
+    if args.output:
+        output = ast.literal_eval(args.output)
 
-    if result["execution_error"]:
-        text = result["execution_error"].replace("\n", "<br />")
-        execution_error_block = {
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": f"{result['execution_error']}"},
-        }
+    if args.history:
+        return execute_history(args)
 
-        blocks.append(execution_error_block)
+    if args.replay:
+        return execute_replay(args)
 
-    request = {"blocks": blocks}
-    resp = requests.post(url=option.url, json=request)
+    if args.watch and (args.all_tools or args.changed_since):
+        Logger.critical(
+            "--watch reruns the test cases of one tool, it can't be used with "
+            "--all-tools or --changed-since"
+        )
+        exit()
 
-    if resp.status_code == requests.codes.ok:
-        Logger.info("Notification sent")
-    else:
-        Logger.warn("Failed to send slack notification")
-        Logger.warn(f"{resp.status_code}: {resp.text}")
+    if args.array_element:
+        return execute_array_element(args, output=output)
 
-    return resp.status_code, resp.text
+    if args.array:
+        return execute_array(args, output=output)
 
+    if args.engine_session:
+        return execute_in_engine_session(args, output=output)
 
-def cli_logging(result: Dict):
-    name = result["test_case"]
-    Logger.info(f"Test Case: {name}")
-    Logger.info(f"Output: {result['output']}")
+    if args.queue or args.worker:
+        return execute_queue(args, output=output)
 
-    if result["execution_error"]:
-        Logger.critical(result["execution_error"])
+    if args.all_tools or args.changed_since:
+        return execute_all_tools(args, output=output)
 
-    if len(result["succeeded"]) > 0:
-        Logger.info(f"{len(result['succeeded'])} expected output PASSED")
+    if not args.tool:
+        Logger.critical("Specify the tool to test, or --all-tools")
+        exit()
 
-        Logger.info("Succeeded expected output:")
-        for s in result["succeeded"]:
-            Logger.info(s)
+    if args.watch:
+        return execute_watch(args, output=output)
 
-    if len(result["failed"]) > 0:
-        Logger.critical(f"{len(result['failed'])} expected output FAILED")
+    test_cases = select_test_cases(args.tool, args.test_case)
+    run_tool_test_cases(args, test_cases, output=output)
 
-        Logger.critical("Failed expected output:")
-        for f in result["failed"]:
-            Logger.critical(f)
 
-    if len(result["failed"]) == 0 and not result["execution_error"]:
-        Logger.info(f"Test SUCCEEDED: {name}")
+def run_tool_test_cases(args, test_cases: List[str], output: Optional[Dict] = None):
+    if args.jobs and args.jobs > 1 and len(test_cases) > 1:
+        results = run_test_cases_concurrently(
+            tool_id=args.tool,
+            test_cases=test_cases,
+            jobs=args.jobs,
+            engine=args.engine,
+            output=output,
+            config=args.config,
+            use_cache=not args.no_cache,
+            use_input_store=not args.no_input_store,
+            fail_fast=args.fail_fast,
+            fast_fixtures=args.fast_fixtures,
+        )
     else:
-        Logger.critical(f"Test FAILED: {name}")
+        results = run_test_cases_serially(
+            tool_id=args.tool,
+            test_cases=test_cases,
+            engine=args.engine,
+            output=output,
+            config=args.config,
+            use_cache=not args.no_cache,
+            use_input_store=not args.no_input_store,
+            fail_fast=args.fail_fast,
+            fast_fixtures=args.fast_fixtures,
+        )
+
+    report_results(args, ((args.tool, tc, result) for tc, result in results))
+
 
+def execute_in_engine_session(args, output: Optional[Dict] = None):
+    """
+    Execute, with the test cases all submitted to one engine
+    """
+    engine = getattr(args.engine, "value", args.engine)
+    session_args = argparse.Namespace(**{**vars(args), "engine_session": False})
+    if output is not None:
+        Logger.info("Not starting an engine session for a dry run")
+        return execute(session_args)
+    if engine not in SESSION_ENGINES:
+        Logger.warn(
+            f"An engine session isn't supported for {engine} (only for "
+            f"{', '.join(SESSION_ENGINES)}), starting an engine for each test case"
+        )
+        return execute(session_args)
 
-def add_runtest_args(parser):
-    parser.add_argument("tool", help="Name of tool to test")
+    if args.queue and not args.worker:
+        # only the workers run test cases
+        return execute(session_args)
 
-    parser.add_argument(
-        "--test-case", help="Name of test case as listed in tool.tests()"
+    session = EngineSession(
+        output_dir=os.path.join(os.getcwd(), "tests_output", "engine_session"),
+        config=args.config,
     )
+    try:
+        session_args.config = session.start()
+    except Exception as e:
+        session.stop()
+        Logger.critical(f"Couldn't start an engine session: {repr(e)}")
+        exit()
+
+    try:
+        return execute(session_args)
+    finally:
+        session.stop()
+
+
+def execute_watch(args, output: Optional[Dict] = None):
+    # check the test case exists before we start watching
+    select_test_cases(args.tool, args.test_case)
+
+    def run(test_cases: List[str]):
+        if args.test_case:
+            test_cases = [tc for tc in test_cases if tc == args.test_case]
+        if test_cases:
+            Logger.info(f"Running {', '.join(test_cases)}")
+            run_tool_test_cases(args, test_cases, output=output)
+
+    ToolWatcher(args.tool, engine=args.engine).watch(run)
+
+
+def report_results(
+    args, results: Iterable[Tuple[str, str, Dict]]
+) -> List[Tuple[str, str, Dict]]:
+    """
+    Log, report (to the test manager / slack) and record (to the run history)
+    each (tool, test case, result) as it completes, and write the timings
+
+    :return: the (tool, test case, result) of every test case
+    """
+    completed = []
+    # the test cases still run (and are reported) if it can't be written
+    history = open_run_history()
+    with StatusReporter.from_args(args) as reporter:
+        for tool_id, test_case, result in results:
+            result["test_case"] = test_case
+            cli_logging(result)
+            reporter.report(result, tool_id=tool_id, test_case=test_case)
+            if history:
+                history.record_and_check(
+                    tool_id, test_case, result, tolerance=args.regression_tolerance
+                )
+            completed.append((tool_id, test_case, result))
+    if history:
+        history.close()
+
+    if args.timings_json:
+        write_timings_json(completed, args.timings_json)
+
+    return completed
+
+
+def run_test_cases_serially(
+    tool_id: str, test_cases: List[str], fail_fast: bool = False, **kwargs
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the test_cases of one tool, one after the other. With fail_fast, the
+    test cases after one that fails are skipped.
+    """
+    for i, tc_name in enumerate(test_cases):
+        result = run_test_case(
+            tool_id=tool_id, test_case=tc_name, fail_fast=fail_fast, **kwargs
+        )
+        yield tc_name, result
+
+        if fail_fast and (result["failed"] or result["execution_error"]):
+            for skipped in test_cases[i + 1 :]:
+                yield skipped, skipped_result(
+                    f"Skipped as {tool_id}/{tc_name} failed (--fail-fast)"
+                )
+            return
 
-    parser.add_argument("-e", "--engine", help="engine", default=EngineType.cromwell)
 
-    parser.add_argument("-c", "--config", help="Path to janis config")
+def run_test_cases_concurrently(
+    tool_id: str, test_cases: List[str], jobs: int, **kwargs
+):
+    tool = get_one_tool(tool_id)
+    cpus, memory = get_tool_resources(tool)
 
-    parser.add_argument(
-        "-o", "--output", help="Dry run test by providing a dictionary of output"
+    Logger.info(
+        f"Running {len(test_cases)} test cases of '{tool_id}' with up to {jobs} "
+        f"concurrent jobs (each needs {cpus} cpus, {memory}GB memory)"
     )
 
-    # For updating test-framework API endpoint
-    parser.add_argument(
-        "--test-manager-url", help="API endpoint to update run status in Test Manager"
+    return run_test_cases_in_parallel(
+        tool_id=tool.id(),
+        test_cases=test_cases,
+        jobs=jobs,
+        cpus=cpus,
+        memory=memory,
+        output_dir=os.path.join(os.getcwd(), "tests_output"),
+        **kwargs,
     )
 
-    parser.add_argument(
-        "--test-manager-token", help="Authentication token for Test Manager API"
+
+def find_all_test_jobs(
+    modules: Optional[List[str]] = None,
+    providers: Optional[List[str]] = None,
+    changed_since: Optional[str] = None,
+) -> List[TestJob]:
+    """
+    Find every (tool, test case) in the shed (the latest version of each tool),
+    optionally only the tools from one of modules / providers, or that the
+    changes since the git ref changed_since affect.
+    """
+    modules = {m.lower() for m in modules or []}
+    providers = {p.lower() for p in providers or []}
+
+    registry = ToolRegistry.from_snapshot()
+    affected = None
+    if changed_since:
+        try:
+            affected = find_affected_tools(changed_since, registry=registry)
+        except Exception as e:
+            Logger.critical(f"Couldn't find what changed since {changed_since}: {e}")
+            exit()
+
+    jobs = []
+    for tool_id, versions in registry.by_id().items():
+        entry = registry.get(tool_id)
+        if affected is not None and (
+            (entry.id.lower(), entry.version.lower()) not in affected
+        ):
+            continue
+        try:
+            tool = entry.tool()
+            if modules and (tool.tool_module() or "").lower() not in modules:
+                continue
+            if providers and (tool.tool_provider() or "").lower() not in providers:
+                continue
+            tests = tool.tests()
+            if not tests:
+                continue
+
+            cpus, memory = get_tool_resources(tool)
+            jobs.extend(
+                TestJob(tool.id(), tc.name, cpus=cpus, memory=memory) for tc in tests
+            )
+        except Exception as e:
+            Logger.warn(f"Couldn't find the test cases of '{tool_id}': {repr(e)}")
+        finally:
+            entry.release()
+
+    return jobs
+
+
+def execute_all_tools(args, output: Optional[Dict] = None):
+    jobs = find_all_test_jobs(
+        modules=args.module, providers=args.provider, changed_since=args.changed_since
     )
+    if not jobs and args.changed_since:
+        Logger.info(
+            f"No test cases are affected by the changes since {args.changed_since}"
+        )
+        return
+    if not jobs:
+        Logger.critical("No test cases were found in the shed")
+        exit()
 
-    parser.add_argument(
-        "--test-id",
-        help="Test identification to be attached to the notification message",
+    Logger.info(
+        f"Running {len(jobs)} test cases from {len({j.tool_id for j in jobs})} tools"
     )
 
-    parser.add_argument(
-        "--slack-notification-url", help="Slack webhook to send notifications to"
+    scheduler = ResourceScheduler(
+        output_dir=os.path.join(os.getcwd(), "tests_output"),
+        max_jobs=args.jobs,
+        history=DurationHistory(),
     )
 
+    results = scheduler.run(
+        jobs,
+        engine=args.engine,
+        output=output,
+        config=args.config,
+        use_cache=not args.no_cache,
+        use_input_store=not args.no_input_store,
+        fail_fast=args.fail_fast,
+        fast_fixtures=args.fast_fixtures,
+    )
+    completed = report_results(
+        args, ((job.tool_id, job.test_case, result) for job, result in results)
+    )
+    print_jobs_report(completed)
+
+
+def print_jobs_report(results: List[Tuple[str, str, Dict]]):
+    """
+    Print the report of the (tool, test case, result) of a run
+    """
+    failed = {
+        f"{tool_id}/{test_case}": result["execution_error"]
+        or f"{len(result['failed'])} expected output FAILED"
+        for tool_id, test_case, result in results
+        if result["failed"] or result["execution_error"]
+    }
+    succeeded = {
+        f"{tool_id}/{test_case}"
+        for tool_id, test_case, _ in results
+        if f"{tool_id}/{test_case}" not in failed
+    }
+    print_test_report(failed=failed, succeeded=succeeded, id_column_header="Test")
 
-def execute(args):
-    output = None
+
+def execute_queue(args, output: Optional[Dict] = None):
+    if not args.queue:
+        Logger.critical("Specify the shared queue directory to take jobs from, --queue")
+        exit()
+
+    queue = WorkQueue(args.queue)
+    scheduler = ResourceScheduler(
+        output_dir=os.path.join(os.getcwd(), "tests_output"),
+        max_jobs=args.jobs,
+        history=DurationHistory(),
+    )
+
+    if args.all_tools or args.changed_since or args.tool:
+        jobs = select_test_jobs(args)
+        added = queue.submit(scheduler.order(jobs))
+        Logger.info(
+            f"Added {added} test cases to the queue '{queue.path}' "
+            f"({len(jobs) - added} were already queued)"
+        )
+
+    if not args.worker:
+        Logger.info(
+            f"Start workers on each node with: janisdk run-test --worker --queue {args.queue}"
+        )
+        return
+
+    worker = QueueWorker(queue, scheduler)
+    # the test cases of a tool are spread across the nodes, so --fail-fast only
+    # aborts each run as soon as one of its jobs fails
+    results = worker.run(
+        engine=args.engine,
+        output=output,
+        config=args.config,
+        use_cache=not args.no_cache,
+        use_input_store=not args.no_input_store,
+        fail_fast=args.fail_fast,
+        fast_fixtures=args.fast_fixtures,
+    )
+    completed = report_results(
+        args, ((job.tool_id, job.test_case, result) for job, result in results)
+    )
+
+    Logger.info(
+        f"Worker {worker.worker_id} ran {len(completed)} test cases, "
+        f"the queue is finished"
+    )
+    # every worker that finishes last prints the same report, of every node's jobs
+    print_jobs_report(queue.results())
+
+
+def select_test_jobs(args) -> List[TestJob]:
+    """
+    The jobs of the tool (and test case), --all-tools or --changed-since
+    """
+    if args.all_tools or args.changed_since:
+        return find_all_test_jobs(
+            modules=args.module,
+            providers=args.provider,
+            changed_since=args.changed_since,
+        )
+
+    tool = get_one_tool(args.tool)
+    cpus, memory = get_tool_resources(tool)
+    return [
+        TestJob(tool.id(), tc, cpus=cpus, memory=memory)
+        for tc in select_test_cases(args.tool, args.test_case)
+    ]
+
+
+def array_element_command(args, array: JobArray) -> List[str]:
+    """
+    The command each element of the job array runs, quoted for the shell
+    """
+    command = ["python", __file__, "--array-element", array.path]
+    command.extend(["--engine", args.engine])
+    if args.config:
+        command.extend(["--config", os.path.abspath(args.config)])
     if args.output:
-        output = ast.literal_eval(args.output)
+        command.extend(["--output", args.output])
+    if args.no_cache:
+        command.append("--no-cache")
+    if args.no_input_store:
+        command.append("--no-input-store")
+    if args.fail_fast:
+        command.append("--fail-fast")
+    if args.fast_fixtures:
+        command.append("--fast-fixtures")
+    # the templates join the command into a shell command (eg: sbatch --wrap)
+    return [shlex.quote(c) for c in command]
+
+
+def execute_array(args, output: Optional[Dict] = None):
+    if not args.config:
+        Logger.critical(
+            "--array submits through the environment template of a config, "
+            "specify one with --config"
+        )
+        exit()
+    if not args.all_tools and not args.changed_since and not args.tool:
+        Logger.critical("Specify the tool to test, --all-tools or --changed-since")
+        exit()
 
-    try:
-        available_test_cases = find_test_cases(args.tool)
-        if args.test_case:
-            if args.test_case not in available_test_cases:
-                raise TestCasesNotFound(
-                    f"Test case with name `{args.test_case}` NOT found."
-                )
-            test_cases = [args.test_case]
-        else:
-            test_cases = available_test_cases
+    from janis_assistant.management.configuration import JanisConfiguration
+
+    jobs = select_test_jobs(args)
+    if not jobs:
+        Logger.critical("No test cases were found")
+        exit()
 
+    array = JobArray.create(os.path.join(os.getcwd(), "tests_output"), jobs)
+    config = JanisConfiguration.initial_configuration(path=args.config)
+    try:
+        exit_code = submit_job_array(
+            config.template.template, array_element_command(args, array), len(jobs)
+        )
     except Exception as e:
-        Logger.critical("Unexpected error occurred when searching for test cases")
-        Logger.critical(str(e))
+        Logger.critical(f"Couldn't submit the job array: {e}")
         exit()
+    if exit_code:
+        Logger.warn(f"The job array submission exited with code {exit_code}")
 
-    for tc_name in test_cases:
+    print_jobs_report(report_results(args, array.results()))
 
-        result = run_test_case(
-            tool_id=args.tool,
-            test_case=tc_name,
-            engine=args.engine,
-            output=output,
-            config=args.config,
+
+def execute_array_element(args, output: Optional[Dict] = None):
+    array = JobArray(args.array_element)
+    index = get_array_index()
+    if index is None:
+        Logger.critical(
+            f"Couldn't find the index of this array element, expected one of: "
+            f"{', '.join(ARRAY_INDEX_VARIABLES)}"
         )
-        result["test_case"] = tc_name
-        cli_logging(result)
+        exit()
 
-        try:
-            # send output to test framework API
-            if args.test_manager_url and args.test_manager_token:
-                option = UpdateStatusOption(
-                    url=args.test_manager_url, token=args.test_manager_token
-                )
-                update_status(result, option)
-        except Exception as e:
-            Logger.warn(f"Failed to update test status to {args.test_manager_url}")
+    job = array.jobs()[index]
+    result = run_test_case(
+        tool_id=job.tool_id,
+        test_case=job.test_case,
+        engine=args.engine,
+        output=output,
+        config=args.config,
+        output_dir=array.job_output_dir(job),
+        use_cache=not args.no_cache,
+        use_input_store=not args.no_input_store,
+        fail_fast=args.fail_fast,
+        fast_fixtures=args.fast_fixtures,
+    )
+    result["test_case"] = job.test_case
+    cli_logging(result)
+    array.write_result(index, result)
+
+
+def execute_history(args):
+    history = open_run_history()
+    if not history:
+        return
+    runs = history.runs(tool_id=args.tool, test_case=args.test_case)
+    if not runs:
+        Logger.info(f"No test runs have been recorded in '{history.path}'")
+    else:
+        print_history(runs, history, tolerance=args.regression_tolerance)
+    history.close()
+
+
+def execute_replay(args):
+    recordings = read_recorded_outputs(args.replay)
+    if args.tool:
+        recordings = [r for r in recordings if r.tool_id.lower() == args.tool.lower()]
+    if args.test_case:
+        recordings = [r for r in recordings if r.test_case == args.test_case]
+    if not recordings:
+        Logger.critical(f"No recorded outputs were found in '{args.replay}'")
+        exit()
 
-        try:
-            # Send notification to Slack
-            if args.slack_notification_url:
-                option = NotificationOption(
-                    url=args.slack_notification_url,
-                    tool_name=args.tool,
-                    test_case=tc_name,
-                    test_id=args.test_id,
-                )
-                send_slack_notification(result=result, option=option)
-        except Exception as e:
-            Logger.warn(
-                f"Failed to send notifications to Slack {args.slack_notification_url}"
-            )
+    Logger.info(
+        f"Replaying {len(recordings)} recorded outputs of "
+        f"{len({r.tool_id for r in recordings})} tools"
+    )
+    results = replay(recordings, engine=args.engine, jobs=args.jobs)
 
+    report_path = args.replay_report or os.path.join(
+        os.getcwd(), "tests_output", "replay_report.json"
+    )
+    write_replay_report(results, report_path)
 
-if __name__ == "__main__":
-    import argparse
+    failed = {
+        f"{r.tool_id}/{r.test_case} ({r.source})": result["execution_error"]
+        or f"{len(result['failed'])} expected output FAILED"
+        for r, result in results
+        if result["failed"] or result["execution_error"]
+    }
+    succeeded = {
+        f"{r.tool_id}/{r.test_case} ({r.source})"
+        for r, result in results
+        if not result["failed"] and not result["execution_error"]
+    }
+    print_test_report(failed=failed, succeeded=succeeded, id_column_header="Recording")
+    Logger.info(f"Wrote the replay report to '{report_path}'")
 
+
+if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     add_runtest_args(parser)
 
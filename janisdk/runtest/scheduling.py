@@ -0,0 +1,355 @@
+"""
+Run test cases concurrently, without oversubscribing the machine.
+
+Test cases are independent, so they're run in a process pool. Each (tool, test
+case) job reserves the cpus and memory its tool declares (the maximum over every
+step of a workflow), and a job only starts when there's enough free on the
+machine. Jobs are started longest-first, using the durations recorded by earlier
+runs (jobs we haven't seen before are assumed to be the longest), so a long job
+doesn't start last and hold up the whole run. Each job writes its own log.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from janis_core import Logger
+
+from janis.cache import get_cache_dir
+from janisdk.runtest.failfast import abort_run
+
+# When a tool doesn't declare its resources (or they're a Selector)
+DEFAULT_CPUS = 1
+DEFAULT_MEMORY_GB = 4
+
+
+def get_machine_resources() -> Tuple[int, Optional[float]]:
+    """
+    :return: (cpus, memory in GB) of this machine, memory is None if it's unknown
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+    cpus = cpus or os.cpu_count() or 1
+
+    memory = None
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    except (ValueError, OSError, AttributeError):
+        pass
+
+    return cpus, memory
+
+
+def _numeric_or(value, default):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return value
+
+
+def get_tool_resources(
+    tool, hints: Optional[Dict[str, Any]] = None
+) -> Tuple[int, float]:
+    """
+    The (cpus, memory in GB) one run of a tool needs. For a workflow, this is the
+    maximum of its steps (as steps that run in parallel aren't considered).
+    """
+    hints = hints or {}
+
+    step_nodes = getattr(tool, "step_nodes", None)
+    if step_nodes:
+        cpus, memory = DEFAULT_CPUS, DEFAULT_MEMORY_GB
+        for step in step_nodes.values():
+            c, m = get_tool_resources(step.tool, hints)
+            cpus, memory = max(cpus, c), max(memory, m)
+        return cpus, memory
+
+    cpus, memory = DEFAULT_CPUS, DEFAULT_MEMORY_GB
+    try:
+        cpus = _numeric_or(tool.cpus(hints), DEFAULT_CPUS)
+        memory = _numeric_or(tool.memory(hints), DEFAULT_MEMORY_GB)
+    except Exception as e:
+        Logger.debug(
+            f"Couldn't get the resources of '{tool.id()}', using defaults: {e}"
+        )
+
+    return max(1, int(cpus)), float(memory)
+
+
+class DurationHistory:
+    """
+    The last recorded wall time (in seconds) of each (tool, test case).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_cache_dir("runtest", "durations.json")
+        self.durations: Dict[str, float] = {}
+        try:
+            with open(self.path) as f:
+                self.durations = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(tool_id: str, test_case: str) -> str:
+        return f"{tool_id.lower()}/{test_case}"
+
+    def get(self, tool_id: str, test_case: str) -> Optional[float]:
+        return self.durations.get(self.key(tool_id, test_case))
+
+    def record(self, tool_id: str, test_case: str, duration: float):
+        self.durations[self.key(tool_id, test_case)] = duration
+
+    def write(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w+") as f:
+                json.dump(self.durations, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            Logger.warn(f"Couldn't record test durations to '{self.path}': {e}")
+
+
+class TestJob:
+    def __init__(
+        self,
+        tool_id: str,
+        test_case: str,
+        cpus: int = DEFAULT_CPUS,
+        memory: float = DEFAULT_MEMORY_GB,
+        expected_duration: Optional[float] = None,
+    ):
+        self.tool_id = tool_id
+        self.test_case = test_case
+        self.cpus = cpus
+        self.memory = memory
+        self.expected_duration = expected_duration
+
+    def __repr__(self):
+        return f"TestJob<{self.tool_id}/{self.test_case}>"
+
+
+def _run_test_case_with_log(log_path: str, kwargs: dict) -> Dict[str, Any]:
+    """
+    Runs in the pool worker: run one test case with its stdout + stderr (and
+    that of any subprocess, eg: the engine) redirected to log_path.
+    """
+    import sys
+    from janisdk.runtest.runner import run_test_case
+
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    with open(log_path, "w+") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            return run_test_case(**kwargs)
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                stream.flush()
+            for fd, target in zip(saved_fds, (1, 2)):
+                os.dup2(fd, target)
+                os.close(fd)
+
+
+def failed_result(error: str) -> Dict[str, Any]:
+    """
+    The result of a test case that couldn't be run
+    """
+    return {"failed": [], "succeeded": [], "output": None, "execution_error": error}
+
+
+def skipped_result(reason: str) -> Dict[str, Any]:
+    """
+    The result of a test case that wasn't run (eg: with --fail-fast)
+    """
+    return {**failed_result(reason), "skipped": True}
+
+
+class ResourceScheduler:
+    """
+    Runs TestJobs in a process pool, only starting a job when the cpus and memory
+    it needs are free. A job that needs more than the machine has runs on its own.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        max_jobs: Optional[int] = None,
+        cpus: Optional[int] = None,
+        memory: Optional[float] = None,
+        history: Optional[DurationHistory] = None,
+    ):
+        """
+        :param output_dir: each job runs in {output_dir}/{tool}/{test case}
+        :param max_jobs: at most this many jobs at once (default: cpus)
+        :param cpus: cpus to schedule on (default: this machine's)
+        :param memory: memory (GB) to schedule on (default: this machine's)
+        :param history: to order the jobs by, and record their durations to
+        """
+        machine_cpus, machine_memory = get_machine_resources()
+        self.output_dir = output_dir
+        self.cpus = cpus or machine_cpus
+        self.memory = memory or machine_memory
+        self.max_jobs = max_jobs or self.cpus
+        self.history = history
+
+    def _reservation(self, job: TestJob) -> Tuple[int, Optional[float]]:
+        # clamp, so a job bigger than the machine can still run (on its own)
+        memory = None if self.memory is None else min(job.memory, self.memory)
+        return min(job.cpus, self.cpus), memory
+
+    def order(self, jobs: List[TestJob]) -> List[TestJob]:
+        """
+        Longest first, jobs without a recorded duration go first
+        """
+        if self.history:
+            for job in jobs:
+                if job.expected_duration is None:
+                    job.expected_duration = self.history.get(job.tool_id, job.test_case)
+
+        return sorted(
+            jobs,
+            key=lambda j: float("-inf")
+            if j.expected_duration is None
+            else -j.expected_duration,
+        )
+
+    def job_output_dir(self, job: TestJob) -> str:
+        return os.path.join(self.output_dir, job.tool_id, job.test_case)
+
+    def job_log_path(self, job: TestJob) -> str:
+        # not in the job's output dir, as janis wants the output dir to be empty
+        return os.path.join(
+            self.output_dir, job.tool_id, "logs", f"{job.test_case}.log"
+        )
+
+    def run(
+        self, jobs: List[TestJob], fail_fast: bool = False, **kwargs
+    ) -> Iterator[Tuple[TestJob, Dict[str, Any]]]:
+        """
+        Run every job (with run_test_case(**kwargs)), yielding (job, result) in
+        the order they complete.
+
+        :param fail_fast: once a test case of a tool fails, skip its pending test
+            cases and abort its running ones (and abort each run as soon as one of
+            its jobs fails)
+        """
+        pending = self.order(jobs)
+        running = {}
+        # {job: the test case whose failure it was aborted for}
+        aborted = {}
+        free_cpus, free_memory = self.cpus, self.memory
+
+        workers = max(1, min(self.max_jobs, len(jobs)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while pending or running:
+                # start everything that fits, in priority order
+                for job in list(pending):
+                    if len(running) >= self.max_jobs:
+                        break
+                    cpus, memory = self._reservation(job)
+                    if cpus > free_cpus or (
+                        memory is not None and memory > free_memory
+                    ):
+                        continue
+
+                    pending.remove(job)
+                    free_cpus -= cpus
+                    if memory is not None:
+                        free_memory -= memory
+
+                    log_path = self.job_log_path(job)
+                    Logger.info(f"Starting {job} (log: {log_path})")
+                    future = executor.submit(
+                        _run_test_case_with_log,
+                        log_path,
+                        {
+                            "tool_id": job.tool_id,
+                            "test_case": job.test_case,
+                            "output_dir": self.job_output_dir(job),
+                            "fail_fast": fail_fast,
+                            **kwargs,
+                        },
+                    )
+                    running[future] = (job, time.time())
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, start = running.pop(future)
+                    cpus, memory = self._reservation(job)
+                    free_cpus += cpus
+                    if memory is not None:
+                        free_memory += memory
+
+                    ran = True
+                    try:
+                        result = future.result()
+                        # a cached result took no time to run
+                        ran = not result.get("cached")
+                    except Exception as e:
+                        result = failed_result(f"Test case worker failed: {repr(e)}")
+                        ran = False
+
+                    # only the test cases that ran to the end say how long they take
+                    if self.history and ran and job not in aborted:
+                        duration = time.time() - start
+                        self.history.record(job.tool_id, job.test_case, duration)
+                        self.history.write()
+
+                    if job in aborted:
+                        result[
+                            "execution_error"
+                        ] = f"Aborted as {aborted.pop(job)} failed (--fail-fast)"
+                        yield job, result
+                        continue
+
+                    yield job, result
+
+                    if fail_fast and (result["failed"] or result["execution_error"]):
+                        reason = f"{job.tool_id}/{job.test_case}"
+                        for other in [j for j in pending if j.tool_id == job.tool_id]:
+                            pending.remove(other)
+                            yield other, skipped_result(
+                                f"Skipped as {reason} failed (--fail-fast)"
+                            )
+                        for other, _ in list(running.values()):
+                            if other.tool_id == job.tool_id and other not in aborted:
+                                Logger.warn(
+                                    f"Aborting {other} as {reason} failed (--fail-fast)"
+                                )
+                                abort_run(self.job_output_dir(other))
+                                aborted[other] = reason
+
+
+def run_test_cases_in_parallel(
+    tool_id: str,
+    test_cases: List[str],
+    jobs: int,
+    cpus: int,
+    memory: float,
+    output_dir: str,
+    **kwargs,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the test_cases of one tool, at most 'jobs' at once.
+
+    :return: (test case name, result) in the same order as test_cases
+    """
+    scheduler = ResourceScheduler(
+        output_dir=output_dir, max_jobs=jobs, history=DurationHistory()
+    )
+    test_jobs = [TestJob(tool_id, tc, cpus=cpus, memory=memory) for tc in test_cases]
+
+    # results come back as they complete, but report them in a stable order
+    completed = {}
+    remaining = list(test_cases)
+    for job, result in scheduler.run(test_jobs, **kwargs):
+        completed[job.test_case] = result
+        while remaining and remaining[0] in completed:
+            tc_name = remaining.pop(0)
+            yield tc_name, completed.pop(tc_name)
@@ -0,0 +1,121 @@
+"""
+A warm engine that the test cases of a run-test (or a worker, for its lifetime)
+are all submitted to.
+
+Janis starts (and stops) an engine for every run, unless its config points it
+at an engine that's already running (cromwell.url). The EngineSession starts
+one Cromwell server before the first test case, and writes a janis config that's
+the given config, with cromwell.url pointing at the server. The test cases are
+run with that config, and the server is stopped at the end.
+"""
+
+import os
+from typing import Callable, Optional
+
+import ruamel.yaml
+from janis_core import Logger
+
+# the engines that can be run as a session
+SESSION_ENGINES = {"cromwell"}
+
+
+def _start_cromwell(output_dir: str, config: Optional[str] = None):
+    from janis_assistant.data.models.preparedjob import PreparedJob
+    from janis_assistant.engines.cromwell.main import Cromwell
+    from janis_assistant.management.configuration import JanisConfiguration
+
+    jc = JanisConfiguration.initial_configuration(config)
+    execution_dir = os.path.join(output_dir, "execution")
+
+    # Cromwell generates its config (eg: the backend for the template's
+    # scheduler and containers) from the prepared job
+    PreparedJob(
+        config_dir=jc.config_dir,
+        db_path=jc.db_path,
+        execution_dir=execution_dir,
+        engine="cromwell",
+        cromwell=jc.cromwell,
+        template=jc.template,
+        notifications=jc.notifications,
+        environment=jc.environment,
+        digest_cache_location=jc.digest_cache_location,
+        output_dir=output_dir,
+        call_caching_enabled=jc.call_caching_enabled,
+        container_type=jc.container.get_container_type(),
+    )
+    engine = Cromwell(
+        identifier="janisdk-session",
+        logfile=os.path.join(output_dir, "cromwell.log"),
+        confdir=output_dir,
+        execution_dir=execution_dir,
+    )
+    if not engine.start_engine():
+        raise Exception(
+            f"Cromwell didn't start, see its log: {os.path.join(output_dir, 'cromwell.log')}"
+        )
+    return engine
+
+
+class EngineSession:
+    def __init__(
+        self,
+        output_dir: str,
+        config: Optional[str] = None,
+        start_engine: Callable = _start_cromwell,
+    ):
+        """
+        :param output_dir: where the engine keeps its config, logs and executions
+        :param config: the janis config the test cases would be run with
+        :param start_engine: start_engine(output_dir, config) starts the engine,
+            and returns it (with its host and stop_engine())
+        """
+        self.output_dir = os.path.abspath(output_dir)
+        self.config = config
+        self.config_path = os.path.join(self.output_dir, "janis.yaml")
+        self._start_engine = start_engine
+        self.engine = None
+
+    def start(self) -> str:
+        """
+        Start the engine
+
+        :return: the path of the janis config that runs on it
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        Logger.info("Starting a Cromwell server for the test cases to share")
+        self.engine = self._start_engine(self.output_dir, self.config)
+
+        session_config = {}
+        if self.config:
+            with open(self.config) as f:
+                session_config = ruamel.yaml.safe_load(f) or {}
+        session_config["engine"] = "cromwell"
+        session_config["cromwell"] = {
+            **(session_config.get("cromwell") or {}),
+            "url": self.engine.host,
+        }
+        with open(self.config_path, "w+") as f:
+            ruamel.yaml.safe_dump(session_config, f, default_flow_style=False)
+
+        Logger.info(f"Submitting the test cases to Cromwell at {self.engine.host}")
+        return self.config_path
+
+    def stop(self):
+        if self.engine is None:
+            return
+        Logger.info(f"Stopping the Cromwell server at {self.engine.host}")
+        try:
+            self.engine.stop_engine()
+        except Exception as e:
+            Logger.warn(f"Couldn't stop the Cromwell server: {repr(e)}")
+        self.engine = None
+
+    def __enter__(self) -> str:
+        try:
+            return self.start()
+        except BaseException:
+            self.stop()
+            raise
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,324 @@
+"""
+Compare tabular (TSV / CSV) test outputs with an expected table, within numeric
+tolerances, eg: the metrics of a coverage or QC tool.
+
+    TTestExpectedOutput(
+        tag="metrics",
+        preprocessor=TTestPreprocessor.Value,
+        operator=TableTolerance(rtol=1e-3, atol={"mean_coverage": 0.05}),
+        expected_value="https://example.org/expected/metrics.tsv",
+    )
+
+The expected table can be a path or url (expected_value), or a file with the
+table (expected_file), which run-test's runner passes on as its contents. The
+tables are loaded column by column with NumPy, so a
+million-row file is compared in seconds. A numeric value passes
+if |actual - expected| <= atol + rtol * |expected| (NaNs are equal), any other
+value has to be equal. When values are outside the tolerance the check fails
+with the worst of them.
+"""
+
+import io
+import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+Tolerance = Union[float, Dict[Union[str, int], float]]
+
+# how many of the worst deviations to report
+DEFAULT_REPORT = 5
+
+
+class TableMismatch(Exception):
+    pass
+
+
+def _import_numpy():
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        raise ImportError(
+            "Comparing tabular outputs needs numpy, install it with: "
+            "pip install janis-pipelines[tabular]"
+        )
+
+
+def _read_source(source: str, contents: bool = False) -> str:
+    """
+    The text of a table's path or url, or source itself if it's the contents
+    """
+    from janisdk.runtest.inputstore import InputStore, _is_remote
+
+    if contents:
+        return source
+    if _is_remote(source):
+        with tempfile.TemporaryDirectory(prefix="janisdk-table-") as staging_dir:
+            with open(InputStore().stage(source, staging_dir)) as f:
+                return f.read()
+    with open(source) as f:
+        return f.read()
+
+
+class Table:
+    def __init__(self, names: List[str], columns: list, rows: int):
+        """
+        :param names: the column names (their index, as a str, without a header)
+        :param columns: a NumPy array for each column, float if it's numeric
+        """
+        self.names = names
+        self.columns = dict(zip(names, columns))
+        self.rows = rows
+
+
+def _split(line: str, delimiter: Optional[str]) -> List[str]:
+    return line.rstrip("\r\n").split(delimiter)
+
+
+def load_table(
+    source: str,
+    delimiter: Optional[str] = None,
+    header: bool = True,
+    comment: str = "#",
+    contents: bool = False,
+) -> Table:
+    """
+    Load a table (path or url, or its contents) column by column.
+
+    :param contents: whether source is the contents of the table
+    :param delimiter: the column separator, by default a tab or comma (whichever
+        the first line has), else whitespace
+    :param header: whether the table has a header, which is its first uncommented
+        line, or the comment line directly before it when that has as many
+        columns (eg: a VCF's #CHROM line)
+    """
+    np = _import_numpy()
+    text = _read_source(source, contents=contents)
+    lines = io.StringIO(text).readlines()
+
+    def is_data(line):
+        return line.strip() and not line.startswith(comment)
+
+    first = next((i for i, l in enumerate(lines) if is_data(l)), None)
+    if first is None:
+        return Table([], [], 0)
+    if delimiter is None:
+        delimiter = (
+            "\t" if "\t" in lines[first] else ("," if "," in lines[first] else None)
+        )
+
+    if header:
+        names, body_start = _find_header(lines, first, delimiter, comment)
+    else:
+        names = [str(i) for i in range(len(_split(lines[first], delimiter)))]
+        body_start = first
+    body = lines[body_start:]
+
+    sample = next((l for l in body if is_data(l)), None)
+    if sample is None:
+        # only a header, which np.loadtxt would warn about
+        return Table(names, [np.empty(0) for _ in names], 0)
+    sample = _split(sample, delimiter)
+
+    def is_numeric(value):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+
+    numeric = [
+        i for i in range(len(names)) if i < len(sample) and is_numeric(sample[i])
+    ]
+
+    def load(usecols, dtype):
+        return np.loadtxt(
+            io.StringIO("".join(body)),
+            delimiter=delimiter,
+            comments=comment,
+            usecols=usecols,
+            dtype=dtype,
+            ndmin=2,
+        )
+
+    columns: List = [None] * len(names)
+    try:
+        values = load(numeric, float) if numeric else None
+        for j, i in enumerate(numeric):
+            columns[i] = values[:, j]
+    except ValueError:
+        # eg: NA further down a numeric column, load them all as text
+        columns = [None] * len(names)
+
+    others = [i for i in range(len(names)) if columns[i] is None]
+    if others:
+        values = load(others, str)
+        for j, i in enumerate(others):
+            column = values[:, j]
+            try:
+                column = column.astype(float)
+            except ValueError:
+                pass
+            columns[i] = column
+
+    rows = len(columns[0]) if columns else 0
+    return Table(names, columns, rows)
+
+
+def _find_header(
+    lines: List[str], first: int, delimiter: Optional[str], comment: str
+) -> Tuple[List[str], int]:
+    """
+    The column names, and the index of the line the table's body starts at
+
+    :param first: the index of the first uncommented line
+    """
+    row = _split(lines[first], delimiter)
+    previous = lines[first - 1] if first > 0 else ""
+    # a "##" line is a comment (eg: a VCF's meta-information), never the header
+    if previous.startswith(comment) and not previous.startswith(comment * 2):
+        names = _split(previous[len(comment) :], delimiter)
+        if len(names) == len(row):
+            return names, first
+    return row, first + 1
+
+
+class TableTolerance:
+    """
+    An operator (for a TTestExpectedOutput) that compares a tabular output with
+    an expected table, with per column absolute and relative tolerances.
+    """
+
+    def __init__(
+        self,
+        atol: Tolerance = 0.0,
+        rtol: Tolerance = 0.0,
+        delimiter: Optional[str] = None,
+        header: bool = True,
+        comment: str = "#",
+        ignore_columns: List[str] = None,
+        report: int = DEFAULT_REPORT,
+    ):
+        """
+        :param atol: the absolute tolerance, or {column: its tolerance} (0 for
+            the other columns)
+        :param rtol: the relative tolerance, or {column: its tolerance}
+        :param ignore_columns: the names of the columns that aren't compared (eg:
+            a runtime), or their index (from 0) without a header
+        :param report: how many of the worst deviations to report
+        """
+        self.atol = atol
+        self.rtol = rtol
+        self.delimiter = delimiter
+        self.header = header
+        self.comment = comment
+        self.ignore_columns = {str(c) for c in ignore_columns or []}
+        self.report = report
+        # janis describes an expected output by its operator's name
+        self.__name__ = f"table_within(atol={atol}, rtol={rtol})"
+
+    def __repr__(self):
+        # what the result cache keys a test case's operator on, so it's only
+        # made of the parameters (not the id of the instance)
+        return (
+            f"TableTolerance(atol={self.atol!r}, rtol={self.rtol!r}, "
+            f"delimiter={self.delimiter!r}, header={self.header!r}, "
+            f"comment={self.comment!r}, "
+            f"ignore_columns={sorted(self.ignore_columns)!r}, report={self.report!r})"
+        )
+
+    def _tolerance(self, tolerance: Tolerance, column: str, index: int) -> float:
+        if isinstance(tolerance, dict):
+            return float(tolerance.get(column, tolerance.get(index, 0.0)))
+        return float(tolerance)
+
+    def compare(self, actual: Table, expected: Table) -> List[str]:
+        """
+        :return: the differences (the worst first), or [] if the tables match
+        """
+        np = _import_numpy()
+        names = [n for n in expected.names if n not in self.ignore_columns]
+        missing = [n for n in names if n not in actual.columns]
+        extra = [
+            n
+            for n in actual.names
+            if n not in expected.columns and n not in self.ignore_columns
+        ]
+        if missing or extra:
+            return [
+                f"the columns differ, missing: {missing or 'none'}, "
+                f"unexpected: {extra or 'none'}"
+            ]
+        if actual.rows != expected.rows:
+            return [f"{actual.rows} rows, expected {expected.rows}"]
+
+        # (how far outside the tolerance, description)
+        deviations: List[Tuple[float, str]] = []
+        mismatched = 0
+        for index, name in enumerate(expected.names):
+            if name in self.ignore_columns:
+                continue
+            a, e = actual.columns[name], expected.columns[name]
+            numeric = a.dtype.kind == "f" and e.dtype.kind == "f"
+            if numeric:
+                atol = self._tolerance(self.atol, name, index)
+                rtol = self._tolerance(self.rtol, name, index)
+                with np.errstate(invalid="ignore"):
+                    diff = np.abs(a - e)
+                    excess = diff - (atol + rtol * np.abs(e))
+                    bad = ~((excess <= 0) | (a == e) | (np.isnan(a) & np.isnan(e)))
+                excess = np.where(np.isnan(excess), np.inf, excess)
+            else:
+                bad = a.astype(str) != e.astype(str)
+                excess = np.full(len(bad), np.inf)
+
+            rows = np.flatnonzero(bad)
+            mismatched += len(rows)
+            if not len(rows):
+                continue
+            # only the worst of each column can be among the worst overall
+            worst = rows[np.argsort(-excess[rows], kind="stable")[: self.report]]
+            for row in worst:
+                if numeric:
+                    relative = diff[row] / abs(e[row]) if e[row] else np.inf
+                    description = (
+                        f"{name} (row {row + 1}): {a[row]:g}, expected {e[row]:g} "
+                        f"(off by {diff[row]:g}, {relative:.3g} relative)"
+                    )
+                else:
+                    description = (
+                        f"{name} (row {row + 1}): '{a[row]}', expected '{e[row]}'"
+                    )
+                deviations.append((excess[row], description))
+
+        if not mismatched:
+            return []
+        deviations.sort(key=lambda d: -d[0])
+        return [f"{mismatched} values are outside the tolerance"] + [
+            d for _, d in deviations[: self.report]
+        ]
+
+    def __call__(self, actual: str, expected: str) -> bool:
+        """
+        :param actual: the path of the output (TTestPreprocessor.Value)
+        :param expected: the path or url of the expected table, or the contents
+            of the expected_file
+        """
+        from janisdk.runtest.comparison import ExpectedFileContents
+
+        kwargs = {
+            "delimiter": self.delimiter,
+            "header": self.header,
+            "comment": self.comment,
+        }
+        differences = self.compare(
+            load_table(actual, **kwargs),
+            load_table(
+                expected,
+                contents=isinstance(expected, ExpectedFileContents),
+                **kwargs,
+            ),
+        )
+        if differences:
+            raise TableMismatch("; ".join(differences))
+        return True
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from janis_core import (
+    CommandToolBuilder,
+    ToolInput,
+    ToolOutput,
+    File,
+    Array,
+    Stdout,
+    String,
+)
+from janis_core.tool.test_classes import (
+    TTestCase,
+    TTestExpectedOutput,
+    TTestPreprocessor,
+)
+
+from janisdk.runtest.comparison import (
+    StreamingToolTestSuiteRunner,
+    compute_file_stats,
+)
+
+
+def expected_line_count(path):
+    with open(path) as f:
+        return sum(1 for _ in f)
+
+
+class TestComputeFileStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, contents: bytes) -> str:
+        path = os.path.join(self.tmpdir.name, "out.txt")
+        with open(path, "wb") as f:
+            f.write(contents)
+        return path
+
+    def test_matches_reading_the_whole_file(self):
+        contents = [
+            b"",
+            b"one line",
+            b"a\nb\n",
+            b"a\nb",
+            b"a\r\nb\r\nc",
+            b"a\rb\rc\r",
+            b"\n\n\r\n\r",
+        ]
+        for c in contents:
+            path = self.write(c)
+            # a tiny chunk size, so lines (and \r\n) are split across chunks
+            for chunk_size in (1, 2, 3, 1024):
+                stats = compute_file_stats(path, chunk_size=chunk_size)
+                self.assertEqual(
+                    expected_line_count(path), stats.line_count, (c, chunk_size)
+                )
+                self.assertEqual(hashlib.md5(c).hexdigest(), stats.md5)
+                self.assertEqual(len(c), stats.size)
+
+    def test_binary_file_cannot_be_read_as_text(self):
+        # a multibyte character split across chunks can still be read
+        stats = compute_file_stats(self.write("é\n".encode()), chunk_size=1)
+        self.assertIsNone(stats.decode_error)
+
+        stats = compute_file_stats(self.write(b"\x1f\x8b\x08\xff\n"), chunk_size=2)
+        self.assertIsInstance(stats.decode_error, UnicodeDecodeError)
+        with self.assertRaises(UnicodeDecodeError):
+            expected_line_count(self.write(b"\x1f\x8b\x08\xff\n"))
+
+    def test_only_computes_what_is_needed(self):
+        stats = compute_file_stats(self.write(b"a\nb\n"), needs=["md5"])
+        self.assertIsNone(stats.line_count)
+        self.assertIsNotNone(stats.md5)
+
+
+class TestStreamingToolTestSuiteRunner(unittest.TestCase):
+    def test_checks_use_one_read_per_file(self):
+        tool = CommandToolBuilder(
+            tool="mock_cat",
+            version="v1",
+            base_command="cat",
+            inputs=[ToolInput("inp", File, position=0)],
+            outputs=[
+                ToolOutput("out", Stdout),
+                ToolOutput("outs", Array(File), glob="*"),
+                ToolOutput("name", String, glob="*"),
+            ],
+            container="ubuntu:latest",
+        )
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "out.txt")
+            with open(path, "w+") as f:
+                f.write("a\nb\nc\n")
+
+            test_case = TTestCase(
+                name="basic",
+                input={},
+                output=[
+                    TTestExpectedOutput(
+                        "out",
+                        TTestPreprocessor.FileMd5,
+                        lambda a, b: a == b,
+                        expected_value=hashlib.md5(b"a\nb\nc\n").hexdigest(),
+                    ),
+                    TTestExpectedOutput(
+                        "out",
+                        TTestPreprocessor.LineCount,
+                        lambda a, b: a == b,
+                        expected_value=3,
+                    ),
+                    TTestExpectedOutput(
+                        "outs",
+                        TTestPreprocessor.LineCount,
+                        lambda a, b: a == b,
+                        array_index=1,
+                        expected_value=3,
+                    ),
+                    TTestExpectedOutput(
+                        "name",
+                        TTestPreprocessor.LineCount,
+                        lambda a, b: a == b,
+                        expected_value=1,
+                    ),
+                ],
+            )
+            output = {"out": path, "outs": f"{path}|{path}", "name": "one line"}
+
+            runner = StreamingToolTestSuiteRunner(tool)
+            self.assertEqual(
+                {path: {"md5", "line_count"}},
+                runner.get_file_stats_needs(test_case, output),
+            )
+
+            failed, succeeded, _ = runner.run_one_test_case(
+                test_case, engine="cromwell", output=output
+            )
+            self.assertEqual([], failed)
+            self.assertEqual(4, len(succeeded))
+
+    def test_failed_run_keeps_its_output(self):
+        tool = CommandToolBuilder(
+            tool="mock_cat",
+            version="v1",
+            base_command="cat",
+            inputs=[ToolInput("inp", File, position=0)],
+            outputs=[ToolOutput("out", Stdout)],
+            container="ubuntu:latest",
+        )
+        test_case = TTestCase(
+            name="basic",
+            input={},
+            output=[
+                TTestExpectedOutput(
+                    "out",
+                    TTestPreprocessor.LineCount,
+                    lambda a, b: a == b,
+                    expected_value=3,
+                )
+            ],
+        )
+
+        runner = StreamingToolTestSuiteRunner(tool)
+        with mock.patch.object(runner, "run", return_value=None) as run:
+            failed, succeeded, output = runner.run_one_test_case(
+                test_case, engine="cromwell"
+            )
+        run.assert_called_once()
+        self.assertIsNone(output)
+        self.assertEqual(1, len(failed))
+        self.assertEqual([], succeeded)
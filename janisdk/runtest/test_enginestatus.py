@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from janis_assistant.engines.cromwell.main import Cromwell
+
+from janisdk.runtest.enginestatus import RcFileWatcher, watch_engine_status
+
+
+class TestEngineStatus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.execution_dir = self.tmpdir.name
+
+    def write_rc_later(self, delay=0.2):
+        def write():
+            time.sleep(delay)
+            # a job's directory is created as the job starts
+            job_dir = os.path.join(
+                self.execution_dir, "wf", "1234", "call-cat", "execution"
+            )
+            os.makedirs(job_dir)
+            with open(os.path.join(job_dir, "stdout"), "w+") as f:
+                f.write("out")
+            with open(os.path.join(job_dir, "rc"), "w+") as f:
+                f.write("0")
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_rc_file_watcher(self):
+        watcher = RcFileWatcher(self.execution_dir)
+        self.addCleanup(watcher.close)
+        self.assertFalse(watcher.wait(0.1))
+
+        self.write_rc_later()
+        start = time.time()
+        self.assertTrue(watcher.wait(30))
+        self.assertLess(time.time() - start, 5)
+
+    def test_cromwell_polls_when_a_job_finishes(self):
+        engine = SimpleNamespace(
+            polling_interval=30,
+            execution_dir=self.execution_dir,
+            should_stop=False,
+            _timer_thread=None,
+        )
+        original = Cromwell.get_poll_interval
+        with watch_engine_status():
+            self.write_rc_later()
+            start = time.time()
+            # janis waits this long before its next poll
+            self.assertEqual(0, Cromwell.get_poll_interval(engine))
+            self.assertLess(time.time() - start, 5)
+
+            # and stops waiting as soon as the engine stops
+            engine.should_stop = True
+            self.assertEqual(0, Cromwell.get_poll_interval(engine))
+
+        self.assertIs(original, Cromwell.get_poll_interval)
+        self.assertEqual(30, Cromwell.get_poll_interval(engine))
+
+    def test_fails_soft(self):
+        # an engine without janis's internals (eg: another version of janis)
+        engine = SimpleNamespace(polling_interval=0.2, execution_dir=self.execution_dir)
+        original = Cromwell.get_poll_interval
+        with self.assertRaises(RuntimeError):
+            with watch_engine_status():
+                # it still waits for an rc file (for janis's interval)
+                self.assertEqual(0, Cromwell.get_poll_interval(engine))
+
+                # the watching breaks, so janis polls on its own interval
+                with mock.patch.object(
+                    RcFileWatcher, "wait", side_effect=RuntimeError("broken")
+                ):
+                    self.assertEqual(0.2, Cromwell.get_poll_interval(engine))
+                raise RuntimeError("the run failed")
+
+        self.assertIs(original, Cromwell.get_poll_interval)
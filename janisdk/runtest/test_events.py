@@ -0,0 +1,94 @@
+import os
+import select
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from janisdk.runtest import events
+from janisdk.runtest.events import PathWatcher
+
+
+class TestPathWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        # doesn't exist until the test creates it
+        self.watched = os.path.join(self.tmpdir.name, "janis", "database")
+
+    def write_later(self, delay=0.1):
+        def write():
+            time.sleep(delay)
+            os.makedirs(self.watched, exist_ok=True)
+            with open(os.path.join(self.watched, "task.db"), "a") as f:
+                f.write("x")
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_inotify_sees_a_change_at_once(self):
+        with PathWatcher([self.watched], max_interval=30) as watcher:
+            if not watcher.uses_inotify:
+                self.skipTest("inotify isn't available")
+            watcher.interval = 30
+            self.write_later()
+            start = time.time()
+            # creating the parent directories can wake it first (with no change
+            # to the path yet), it then watches the new directories
+            changed = False
+            while not changed and time.time() - start < 10:
+                changed = watcher.wait()
+            self.assertTrue(changed)
+            self.assertLess(time.time() - start, 10)
+
+    def test_polling_backs_off_until_something_changes(self):
+        with mock.patch.object(events, "_inotify_init", return_value=None):
+            watcher = PathWatcher([self.watched], min_interval=0.01, max_interval=0.04)
+        with watcher:
+            self.assertFalse(watcher.uses_inotify)
+            self.assertFalse(watcher.wait())
+            self.assertFalse(watcher.wait())
+            self.assertEqual(0.04, watcher.interval)
+
+            os.makedirs(self.watched)
+            self.assertTrue(watcher.wait())
+            self.assertEqual(0.01, watcher.interval)
+
+            with open(os.path.join(self.watched, "task.db"), "w+") as f:
+                f.write("x")
+            self.assertTrue(watcher.wait())
+
+    def test_wake(self):
+        with PathWatcher([self.watched], max_interval=30) as watcher:
+            watcher.interval = 30
+            threading.Timer(0.1, watcher.wake).start()
+            start = time.time()
+            self.assertFalse(watcher.wait())
+            self.assertLess(time.time() - start, 10)
+
+    def test_dropped_paths_are_no_longer_watched(self):
+        first, second = [os.path.join(self.tmpdir.name, d) for d in ("a", "b")]
+        for d in (first, second):
+            os.makedirs(d)
+        with PathWatcher([first, second]) as watcher:
+            if not watcher.uses_inotify:
+                self.skipTest("inotify isn't available")
+            self.assertEqual({first, second}, set(watcher._watched))
+
+            watcher.paths = [second]
+            self.assertEqual({second}, set(watcher._watched))
+            # (removing a watch queues an IN_IGNORED event for it)
+            events._drain(watcher._inotify)
+            with open(os.path.join(first, "task.db"), "w+") as f:
+                f.write("x")
+            readable, _, _ = select.select([watcher._inotify], [], [], 0.2)
+            self.assertEqual([], readable)
+
+            # and once a path is created, its parent isn't watched for it
+            watcher.paths = [self.watched]
+            self.assertEqual({self.tmpdir.name}, set(watcher._watched))
+            os.makedirs(self.watched)
+            self.assertTrue(watcher.wait())
+            self.assertEqual({self.watched}, set(watcher._watched))
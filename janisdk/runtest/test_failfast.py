@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from janisdk.runtest import runner
+from janisdk.runtest.failfast import FailedJobWatcher, get_failed_job
+
+
+def write_jobs(output_dir, jobs):
+    """
+    A janis task.db with the (name, status) of jobs
+    """
+    db_dir = os.path.join(output_dir, "janis", "database")
+    os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(db_dir, "task.db"))
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS jobs (name TEXT, status TEXT)")
+        connection.execute("DELETE FROM jobs")
+        connection.executemany("INSERT INTO jobs VALUES (?, ?)", jobs)
+    connection.close()
+
+
+class TestFailFast(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output_dir = self.tmpdir.name
+
+    def abort_semaphore(self):
+        return os.path.join(self.output_dir, "janis", "semaphore", "abort")
+
+    def test_get_failed_job(self):
+        self.assertIsNone(get_failed_job(self.output_dir))
+        write_jobs(self.output_dir, [("align", "running"), ("sort", "queued")])
+        self.assertIsNone(get_failed_job(self.output_dir))
+        write_jobs(self.output_dir, [("align", "failed"), ("sort", "queued")])
+        self.assertEqual("align", get_failed_job(self.output_dir))
+
+    def test_watcher_aborts_when_a_job_fails(self):
+        write_jobs(self.output_dir, [("align", "running")])
+        with FailedJobWatcher(self.output_dir, poll_interval=0.01) as watcher:
+            time.sleep(0.05)
+            self.assertFalse(os.path.exists(self.abort_semaphore()))
+
+            write_jobs(self.output_dir, [("align", "failed")])
+            for _ in range(100):
+                if watcher.failed_job:
+                    break
+                time.sleep(0.01)
+
+        self.assertEqual("align", watcher.failed_job)
+        self.assertTrue(os.path.exists(self.abort_semaphore()))
+
+    def test_serial_test_cases_after_a_failure_are_skipped(self):
+        def run_test_case(tool_id, test_case, **kwargs):
+            failed = ["out"] if test_case == "second" else []
+            return {"failed": failed, "succeeded": [], "execution_error": ""}
+
+        with mock.patch.object(runner, "run_test_case", side_effect=run_test_case):
+            results = list(
+                runner.run_test_cases_serially(
+                    "ToolA", ["first", "second", "third"], fail_fast=True
+                )
+            )
+
+        self.assertEqual(["first", "second", "third"], [tc for tc, _ in results])
+        self.assertFalse(results[0][1]["failed"])
+        self.assertTrue(results[2][1]["skipped"])
+        self.assertIn("ToolA/second failed", results[2][1]["execution_error"])
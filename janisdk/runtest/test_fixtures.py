@@ -0,0 +1,411 @@
+import gzip
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from janis_core import CommandToolBuilder, ToolInput, ToolOutput, File, Array, Stdout
+from janis_core.tool.test_classes import (
+    TTestCase,
+    TTestExpectedOutput,
+    TTestPreprocessor,
+)
+
+from janisdk.runtest import fixtures, runner
+from janisdk.runtest.comparison import StreamingToolTestSuiteRunner
+from janisdk.runtest.fixtures import FixtureStore
+
+
+class BamBai(File):
+    @staticmethod
+    def name():
+        return "BamBai"
+
+    @staticmethod
+    def secondary_files():
+        return [".bai"]
+
+
+SAM = "@HD\tVN:1.6\tSO:coordinate\n@SQ\tSN:chr1\tLN:1000\n" + "".join(
+    f"read{i}\t0\tchr1\t{i + 1}\t60\t4M\t*\t0\t0\tACGT\tFFFF\n" for i in range(5)
+)
+
+VCF = (
+    "##fileformat=VCFv4.2\n##contig=<ID=chr1,length=1000>\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+) + "".join(f"chr1\t{i + 1}\t.\tA\tC\t50\tPASS\t.\n" for i in range(5))
+
+has_samtools = shutil.which("samtools") is not None
+has_tabix = shutil.which("bgzip") is not None and shutil.which("tabix") is not None
+has_pysam = importlib.util.find_spec("pysam") is not None
+
+
+class TestFixtureStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.store = FixtureStore(path=self.path("store"), records=2)
+
+    def path(self, *components):
+        return os.path.join(self.tmpdir.name, *components)
+
+    def write_fastq(self, filename, reads=5):
+        path = self.path(filename)
+        with gzip.open(path, "wt") as f:
+            for i in range(reads):
+                f.write(f"@read{i}\nACGT\n+\nFFFF\n")
+        return path
+
+    def test_fastq_keeps_the_first_reads(self):
+        source = self.write_fastq("reads_R1.fastq.gz")
+        staged = self.store.stage(source, self.path("run"))
+
+        self.assertEqual(self.path("run", "reads_R1.fastq.gz"), staged)
+        with gzip.open(staged, "rt") as f:
+            self.assertEqual("@read0\nACGT\n+\nFFFF\n@read1\nACGT\n+\nFFFF\n", f.read())
+
+    def test_vcf_keeps_the_header(self):
+        source = self.path("calls.vcf")
+        with open(source, "w+") as f:
+            f.write("##fileformat=VCFv4.2\n#CHROM\tPOS\n")
+            f.writelines(f"chr1\t{i}\n" for i in range(5))
+
+        with open(self.store.stage(source, self.path("run"))) as f:
+            self.assertEqual(
+                "##fileformat=VCFv4.2\n#CHROM\tPOS\nchr1\t0\nchr1\t1\n", f.read()
+            )
+
+    def test_fixture_is_only_generated_once(self):
+        source = self.write_fastq("reads.fq.gz")
+        downsample = mock.Mock(wraps=fixtures.downsample_fastq)
+        with mock.patch.dict(fixtures.DOWNSAMPLERS, {"fastq": downsample}):
+            first = self.store.stage(source, self.path("1"))
+            second = FixtureStore(path=self.path("store"), records=2).stage(
+                source, self.path("2")
+            )
+            # a different size is a different fixture
+            FixtureStore(path=self.path("store"), records=3).stage(
+                source, self.path("3")
+            )
+
+        self.assertEqual(2, downsample.call_count)
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+
+    def test_region_is_only_part_of_bam_fixtures(self):
+        fastq, bam = self.write_fastq("reads.fq.gz"), self.path("reads.bam")
+        shutil.copyfile(fastq, bam)
+        regional = FixtureStore(path=self.path("store"), records=2, region="chr2")
+
+        self.assertEqual(
+            self.store.fixture_key(fastq, "fastq", []),
+            regional.fixture_key(fastq, "fastq", []),
+        )
+        self.assertNotEqual(
+            self.store.fixture_key(bam, "bam", []),
+            regional.fixture_key(bam, "bam", []),
+        )
+
+    def test_stage_inputs(self):
+        tool = CommandToolBuilder(
+            tool="mock_align",
+            version="v1",
+            base_command="cat",
+            inputs=[
+                ToolInput("reads", Array(Array(File)), position=0),
+                ToolInput("bam", BamBai, position=1),
+                ToolInput("indexed_fastq", BamBai, position=2),
+                ToolInput("ref", File, position=3),
+            ],
+            outputs=[ToolOutput("out", Stdout)],
+            container="ubuntu:latest",
+        )
+        reads = [[self.write_fastq("s_R1.fq.gz"), self.write_fastq("s_R2.fq.gz")]]
+        bam = self.path("sample.bam")
+        with open(bam, "wb") as f:
+            f.write(b"BAM")
+        inputs = {
+            "reads": reads,
+            "bam": bam,
+            # a .bai can't be rebuilt for a FASTQ
+            "indexed_fastq": reads[0][0],
+            "ref": "https://example.org/ref.fa",
+        }
+
+        with mock.patch.object(fixtures, "_has_executable", return_value=False):
+            with mock.patch.object(fixtures, "_import_pysam", return_value=None):
+                staged = self.store.stage_inputs(tool, inputs, self.path("run"))
+
+        self.assertEqual(
+            [
+                [
+                    self.path("run", "reads", "0", "0", "s_R1.fq.gz"),
+                    self.path("run", "reads", "0", "1", "s_R2.fq.gz"),
+                ]
+            ],
+            staged["reads"],
+        )
+        # without samtools or pysam
+        self.assertEqual(bam, staged["bam"])
+        self.assertEqual(reads[0][0], staged["indexed_fastq"])
+        self.assertEqual("https://example.org/ref.fa", staged["ref"])
+
+
+class TestIndexedFixtures(unittest.TestCase):
+    """
+    The fixtures that are rebuilt (and reindexed) with samtools, bgzip / tabix
+    or pysam
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.store = FixtureStore(path=self.path("store"), records=2)
+
+    def path(self, *components):
+        return os.path.join(self.tmpdir.name, *components)
+
+    def without_executables(self):
+        patcher = mock.patch.object(fixtures, "_has_executable", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, filename, contents):
+        path = self.path(filename)
+        with open(path, "w+") as f:
+            f.write(contents)
+        return path
+
+    # BAM
+
+    def write_bam(self, contents=SAM):
+        sam = self.write("reads.sam", contents)
+        bam = self.path("reads.bam")
+        if has_samtools:
+            subprocess.run(["samtools", "view", "-b", "-o", bam, sam], check=True)
+            subprocess.run(["samtools", "index", bam], check=True)
+        else:
+            import pysam
+
+            with pysam.AlignmentFile(sam, "r") as inp, pysam.AlignmentFile(
+                bam, "wb", template=inp
+            ) as out:
+                for read in inp:
+                    out.write(read)
+            pysam.index(bam)
+        return bam
+
+    def assert_bam_fixture(self, staged):
+        self.assertEqual(self.path("run", "reads.bam"), staged)
+        # the index is rebuilt for both secondary file formats
+        for index in [f"{staged}.bai", self.path("run", "reads.bai")]:
+            self.assertTrue(os.path.exists(index), index)
+        with open(f"{staged}.bai", "rb") as a, open(
+            self.path("run", "reads.bai"), "rb"
+        ) as b:
+            self.assertEqual(a.read(), b.read())
+
+        if has_samtools:
+            reads = subprocess.run(
+                ["samtools", "view", staged, "chr1"],
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout.splitlines()
+            names = [r.split("\t")[0] for r in reads]
+        else:
+            import pysam
+
+            with pysam.AlignmentFile(staged, "rb") as f:
+                names = [r.query_name for r in f.fetch("chr1")]
+        self.assertEqual(["read0", "read1"], names)
+
+    @unittest.skipUnless(has_samtools, "needs samtools")
+    def test_bam_with_samtools(self):
+        staged = self.store.stage(self.write_bam(), self.path("run"), [".bai", "^.bai"])
+        self.assert_bam_fixture(staged)
+
+    @unittest.skipUnless(has_pysam, "needs pysam")
+    def test_bam_with_pysam(self):
+        bam = self.write_bam()
+        self.without_executables()
+        staged = self.store.stage(bam, self.path("run"), [".bai", "^.bai"])
+        self.assert_bam_fixture(staged)
+
+    def assert_bam_region_fixture(self, store):
+        contents = SAM.replace(
+            "LN:1000\n", "LN:1000\n@SQ\tSN:chr2\tLN:1000\n"
+        ) + "".join(
+            f"chr2read{i}\t0\tchr2\t{i + 1}\t60\t4M\t*\t0\t0\tACGT\tFFFF\n"
+            for i in range(5)
+        )
+        bam = self.write_bam(contents)
+        staged = store.stage(bam, self.path("run"), [".bai"])
+
+        if has_samtools:
+            reads = subprocess.run(
+                ["samtools", "view", staged],
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout.splitlines()
+            names = [r.split("\t")[0] for r in reads]
+        else:
+            import pysam
+
+            with pysam.AlignmentFile(staged, "rb") as f:
+                names = [r.query_name for r in f.fetch(until_eof=True)]
+        self.assertEqual(["chr2read0", "chr2read1"], names)
+
+    @unittest.skipUnless(has_samtools, "needs samtools")
+    def test_bam_region_with_samtools(self):
+        store = FixtureStore(path=self.path("store"), records=2, region="chr2")
+        self.assert_bam_region_fixture(store)
+
+    @unittest.skipUnless(has_pysam, "needs pysam")
+    def test_bam_region_with_pysam(self):
+        self.without_executables()
+        store = FixtureStore(path=self.path("store"), records=2, region="chr2")
+        self.assert_bam_region_fixture(store)
+
+    # bgzipped VCF
+
+    def write_vcf_gz(self):
+        plain = self.write("calls.vcf", VCF)
+        if has_tabix:
+            subprocess.run(["bgzip", "-f", plain], check=True)
+        else:
+            import pysam
+
+            pysam.tabix_compress(plain, f"{plain}.gz", force=True)
+        return f"{plain}.gz"
+
+    def assert_vcf_gz_fixture(self, staged):
+        self.assertEqual(self.path("run", "calls.vcf.gz"), staged)
+        self.assertTrue(os.path.exists(f"{staged}.tbi"))
+        with gzip.open(staged, "rt") as f:
+            records = [l for l in f if not l.startswith("#")]
+        self.assertEqual(2, len(records))
+
+        if has_tabix:
+            indexed = subprocess.run(
+                ["tabix", staged, "chr1"],
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout.splitlines()
+        else:
+            import pysam
+
+            with pysam.TabixFile(staged, index=f"{staged}.tbi") as f:
+                indexed = list(f.fetch("chr1"))
+        self.assertEqual(2, len(indexed))
+
+    @unittest.skipUnless(has_tabix, "needs bgzip and tabix")
+    def test_vcf_gz_with_tabix(self):
+        staged = self.store.stage(self.write_vcf_gz(), self.path("run"), [".tbi"])
+        self.assert_vcf_gz_fixture(staged)
+
+    @unittest.skipUnless(has_pysam, "needs pysam")
+    def test_vcf_gz_with_pysam(self):
+        source = self.write_vcf_gz()
+        self.without_executables()
+        staged = self.store.stage(source, self.path("run"), [".tbi"])
+        self.assert_vcf_gz_fixture(staged)
+
+
+class TestRunWithFixtures(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.reads = os.path.join(self.tmpdir.name, "reads.fastq")
+        with open(self.reads, "w+") as f:
+            f.writelines(f"@read{i}\nACGT\n+\nFFFF\n" for i in range(5))
+
+    def run_test_case(self, **kwargs):
+        """
+        :return: the result, and the inputs the (mock) engine was run with
+        """
+        tool = CommandToolBuilder(
+            tool="mock_copy",
+            version="v1",
+            base_command="cp",
+            inputs=[ToolInput("reads", File, position=0)],
+            outputs=[ToolOutput("out", File, selector="out.fastq")],
+            container="ubuntu:latest",
+        )
+        tool.tests = lambda: [
+            TTestCase(
+                name="basic",
+                input={"reads": self.reads},
+                output=[
+                    TTestExpectedOutput(
+                        tag="out",
+                        preprocessor=TTestPreprocessor.FileExists,
+                        operator=lambda a, e: a == e,
+                        expected_value=True,
+                    ),
+                    TTestExpectedOutput(
+                        tag="out",
+                        preprocessor=TTestPreprocessor.LineCount,
+                        operator=lambda a, e: a == e,
+                        expected_value=20,
+                    ),
+                ],
+            )
+        ]
+        run_inputs = []
+
+        def run(runner_self, input, engine):
+            # the engine copies the (staged) reads
+            run_inputs.append(input)
+            out = os.path.join(self.tmpdir.name, "out.fastq")
+            with open(input["reads"]) as src, open(out, "w+") as dest:
+                dest.write(src.read())
+            return {"out": out}
+
+        with mock.patch.dict(
+            os.environ,
+            {
+                "JANIS_CACHEDIR": os.path.join(self.tmpdir.name, "cache"),
+                fixtures.ENV_RECORDS: "2",
+            },
+        ), mock.patch.object(
+            runner, "get_one_tool", return_value=tool
+        ), mock.patch.object(
+            runner,
+            "get_container_digests",
+            return_value={"ubuntu:latest": "ubuntu@sha256:abc"},
+        ) as self.get_container_digests, mock.patch.object(
+            StreamingToolTestSuiteRunner, "run", run
+        ):
+            result = runner.run_test_case(
+                "mock_copy", "basic", engine="cwltool", use_cache=False, **kwargs
+            )
+        return result, run_inputs
+
+    def test_run_test_case(self):
+        result, run_inputs = self.run_test_case(fast_fixtures=True)
+
+        # run on the first 2 reads, so the line count of the full reads is skipped
+        self.assertNotEqual(self.reads, run_inputs[0]["reads"])
+        with open(run_inputs[0]["reads"]) as f:
+            self.assertEqual(8, len(f.readlines()))
+        self.assertEqual("", result["execution_error"])
+        self.assertEqual([], result["failed"])
+        self.assertEqual(1, len(result["succeeded"]))
+        self.assertEqual(1, len(result["not_comparable"]))
+        self.assertIn("line-count", result["not_comparable"][0])
+        # not cached, or recorded to the run history
+        self.get_container_digests.assert_not_called()
+
+    def test_containers_are_recorded_without_the_cache(self):
+        result, _ = self.run_test_case(use_input_store=False)
+        self.assertEqual([], result["failed"])
+        self.assertEqual({"ubuntu:latest": "ubuntu@sha256:abc"}, result["containers"])
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import stat
+import tempfile
+import unittest
+
+from janisdk.runtest.history import RunHistory, open_run_history
+
+
+def mock_result(wall_time, memory=1000, failed=None, **kwargs):
+    return {
+        "failed": failed or [],
+        "succeeded": [],
+        "execution_error": "",
+        "tool_version": "v1",
+        "engine": "cromwell",
+        "containers": {"ubuntu:latest": "ubuntu@sha256:abc"},
+        "timings": {"engine": wall_time - 1, "total": wall_time},
+        "peak_memory_mb": memory,
+        **kwargs,
+    }
+
+
+class TestRunHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.history = RunHistory(os.path.join(self.tmpdir.name, "history.sqlite"))
+        self.addCleanup(self.history.close)
+
+    def test_records_runs(self):
+        self.history.record("tool", "basic", mock_result(60))
+        self.history.record("tool", "basic", mock_result(60, cached=True))
+        self.history.record("tool", "basic", mock_result(60, dry_run=True))
+        self.history.record("other", "basic", mock_result(30, failed=["out"]))
+
+        runs = self.history.runs()
+        self.assertEqual(["other", "tool"], [r.tool for r in runs])
+        self.assertFalse(runs[0].succeeded)
+        self.assertEqual(60, runs[1].wall_time)
+        self.assertEqual({"ubuntu:latest": "ubuntu@sha256:abc"}, runs[1].containers)
+        self.assertEqual(["tool"], [r.tool for r in self.history.runs(tool_id="TOOL")])
+
+    def test_flags_regressions_from_the_baseline(self):
+        for wall_time in (100, 110, 90, 105):
+            self.assertEqual(
+                [],
+                self.history.record_and_check("tool", "basic", mock_result(wall_time)),
+            )
+
+        regressions = self.history.record_and_check(
+            "tool", "basic", mock_result(200, memory=3000)
+        )
+        self.assertEqual(
+            ["wall_time", "peak_memory_mb"], [r.metric for r in regressions]
+        )
+        self.assertAlmostEqual(200 / 102.5 - 1, regressions[0].change)
+
+    def test_tolerance_and_noise_floor(self):
+        for _ in range(3):
+            self.history.record("tool", "basic", mock_result(100))
+            self.history.record("tool", "short", mock_result(2))
+
+        self.assertEqual(
+            [], self.history.record_and_check("tool", "basic", mock_result(120))
+        )
+        self.assertEqual(
+            [],
+            self.history.record_and_check(
+                "tool", "basic", mock_result(150), tolerance=0.6
+            ),
+        )
+        # doubled, but only by a few seconds
+        self.assertEqual(
+            [], self.history.record_and_check("tool", "short", mock_result(4))
+        )
+
+
+class TestUnwritableRunHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    @unittest.skipIf(os.geteuid() == 0, "root can write to a read-only directory")
+    def test_read_only_cache_dir(self):
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        os.makedirs(cache_dir)
+        os.chmod(cache_dir, stat.S_IRUSR | stat.S_IXUSR)
+        self.addCleanup(os.chmod, cache_dir, stat.S_IRWXU)
+
+        path = os.path.join(cache_dir, "runtest", "history.sqlite")
+        self.assertIsNone(open_run_history(path))
+
+    def test_cache_dir_that_is_a_file(self):
+        not_a_dir = os.path.join(self.tmpdir.name, "cache")
+        with open(not_a_dir, "w+"):
+            pass
+        path = os.path.join(not_a_dir, "runtest", "history.sqlite")
+        self.assertIsNone(open_run_history(path))
+
+    def test_read_only_database(self):
+        path = os.path.join(self.tmpdir.name, "history.sqlite")
+        history = open_run_history(path)
+        history.close()
+        history.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.addCleanup(history.close)
+
+        self.assertEqual([], history.record_and_check("tool", "basic", mock_result(60)))
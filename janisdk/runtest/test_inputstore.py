@@ -0,0 +1,137 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from janis_core import CommandToolBuilder, ToolInput, ToolOutput, File, Array, Stdout
+
+from janisdk.runtest.inputstore import InputStore
+
+
+class MockRemote:
+    """
+    Remote files (url -> contents), that counts the downloads
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.downloads = []
+        self.lock = threading.Lock()
+
+    def download(self, source, dest):
+        with self.lock:
+            self.downloads.append(source)
+        # slow enough that concurrent workers overlap
+        time.sleep(0.05)
+        with open(dest, "wb") as f:
+            f.write(self.files[source])
+
+    def last_modified(self, source):
+        return "yesterday"
+
+    def exists(self, source):
+        return source in self.files
+
+
+class IndexedFile(File):
+    @staticmethod
+    def name():
+        return "IndexedFile"
+
+    @staticmethod
+    def secondary_files():
+        return [".idx"]
+
+
+class TestInputStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.remote = MockRemote(
+            {
+                "https://example.org/ref.fa": b"ACGT" * 100,
+                "https://example.org/ref.fa.idx": b"index",
+                "https://example.org/reads.fq": b"@read\nACGT\n+\nFFFF\n",
+            }
+        )
+
+    def store(self, **kwargs):
+        return InputStore(
+            path=os.path.join(self.tmpdir.name, "store"),
+            download=self.remote.download,
+            last_modified=self.remote.last_modified,
+            exists=self.remote.exists,
+            **kwargs,
+        )
+
+    def dest(self, *components):
+        return os.path.join(self.tmpdir.name, "runs", *components)
+
+    def test_only_downloads_once(self):
+        first = self.store().stage("https://example.org/ref.fa", self.dest("1"))
+        second = self.store().stage("https://example.org/ref.fa", self.dest("2"))
+
+        self.assertEqual(["https://example.org/ref.fa"], self.remote.downloads)
+        for p in (first, second):
+            with open(p, "rb") as f:
+                self.assertEqual(b"ACGT" * 100, f.read())
+        # hardlinked from the store
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+
+    def test_concurrent_workers_share_a_download(self):
+        errors = []
+
+        def worker(i):
+            try:
+                self.store().stage("https://example.org/ref.fa", self.dest(str(i)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(1, len(self.remote.downloads))
+
+    def test_stage_inputs_with_secondary_files(self):
+        tool = CommandToolBuilder(
+            tool="mock_cat",
+            version="v1",
+            base_command="cat",
+            inputs=[
+                ToolInput("ref", IndexedFile, position=0),
+                ToolInput("reads", Array(File), position=1),
+                ToolInput("local", File, position=2),
+            ],
+            outputs=[ToolOutput("out", Stdout)],
+            container="ubuntu:latest",
+        )
+        inputs = {
+            "ref": "https://example.org/ref.fa",
+            "reads": ["https://example.org/reads.fq"],
+            "local": "/data/local.txt",
+        }
+
+        staged = self.store().stage_inputs(tool, inputs, self.dest("run"))
+
+        self.assertEqual(self.dest("run", "ref", "ref.fa"), staged["ref"])
+        self.assertTrue(os.path.exists(self.dest("run", "ref", "ref.fa.idx")))
+        self.assertEqual([self.dest("run", "reads", "0", "reads.fq")], staged["reads"])
+        self.assertEqual("/data/local.txt", staged["local"])
+
+    def test_evicts_least_recently_staged(self):
+        # ref.fa is 400 bytes, reads.fq is 20 bytes
+        store = self.store(max_size_gb=410 / 1024**3)
+        store.stage("https://example.org/ref.fa", self.dest("1"))
+        os.utime(store.fetch("https://example.org/ref.fa"), (0, 0))
+        store.stage("https://example.org/reads.fq", self.dest("2"))
+        store.evict()
+
+        store.stage("https://example.org/ref.fa", self.dest("3"))
+        self.assertEqual(2, self.remote.downloads.count("https://example.org/ref.fa"))
+        # the staged file is unaffected by the eviction
+        self.assertTrue(os.path.exists(self.dest("1", "ref.fa")))
@@ -0,0 +1,104 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+from janisdk.runtest.jobarray import JobArray, prepare_array_command, submit_job_array
+from janisdk.runtest.scheduling import TestJob
+
+# A stand-in for sbatch --array=0-N --wait ... --wrap CMD, that runs each
+# element of the array, one after the other
+FAKE_SBATCH = """#!{python}
+import os, subprocess, sys
+
+args = sys.argv[1:]
+array = next(a for a in args if a.startswith("--array="))
+start, end = map(int, array[len("--array="):].split("-"))
+command = args[args.index("--wrap") + 1]
+for i in range(start, end + 1):
+    subprocess.run(command, shell=True, env={{**os.environ, "SLURM_ARRAY_TASK_ID": str(i)}})
+"""
+
+# Writes a result for each element, except the last (as if it was killed)
+FAKE_ELEMENT = """
+import sys
+from janisdk.runtest.jobarray import JobArray, get_array_index
+
+array = JobArray(sys.argv[1])
+index = get_array_index()
+jobs = array.jobs()
+if index < len(jobs) - 1:
+    job = jobs[index]
+    array.write_result(
+        index, {"failed": [], "succeeded": [job.test_case], "execution_error": None}
+    )
+"""
+
+
+class MockSlurmTemplate:
+    def __init__(self, sbatch):
+        self.sbatch = sbatch
+
+    def prepare_run_test_command(self, test_command):
+        return [self.sbatch, "--time", "10", "--wrap", " ".join(test_command)]
+
+
+class MockLocalTemplate:
+    def prepare_run_test_command(self, test_command):
+        return test_command
+
+
+class TestJobArray(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_script(self, name, contents):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w+") as f:
+            f.write(contents)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def test_prepare_array_command(self):
+        self.assertEqual(
+            ["/usr/bin/sbatch", "--array=0-9", "--wait", "--wrap", "cmd"],
+            prepare_array_command(["/usr/bin/sbatch", "--wrap", "cmd"], 10),
+        )
+        self.assertIsNone(prepare_array_command(["python", "runner.py"], 10))
+
+    def test_submit_and_collect_results(self):
+        sbatch = self.write_script("sbatch", FAKE_SBATCH.format(python=sys.executable))
+        element = self.write_script("element.py", FAKE_ELEMENT)
+
+        jobs = [
+            TestJob("ToolA", "basic"),
+            TestJob("ToolA", "full"),
+            TestJob("ToolB", "basic"),
+        ]
+        array = JobArray.create(self.tmpdir.name, jobs)
+        exit_code = submit_job_array(
+            MockSlurmTemplate(sbatch), [sys.executable, element, array.path], len(jobs)
+        )
+        self.assertEqual(0, exit_code)
+
+        results = array.results()
+        self.assertEqual(
+            [("ToolA", "basic"), ("ToolA", "full"), ("ToolB", "basic")],
+            [(t, tc) for t, tc, _ in results],
+        )
+        self.assertEqual(["full"], results[1][2]["succeeded"])
+        self.assertIsNone(results[1][2]["execution_error"])
+        self.assertIn("didn't write a result", results[2][2]["execution_error"])
+
+    def test_arrays_created_at_once_are_separate(self):
+        first = JobArray.create(self.tmpdir.name, [TestJob("ToolA", "basic")])
+        second = JobArray.create(self.tmpdir.name, [TestJob("ToolB", "basic")])
+        self.assertNotEqual(first.path, second.path)
+        self.assertEqual("ToolA", first.jobs()[0].tool_id)
+        self.assertEqual("ToolB", second.jobs()[0].tool_id)
+
+    def test_template_without_a_scheduler(self):
+        with self.assertRaises(Exception):
+            submit_job_array(MockLocalTemplate(), ["python", "runner.py"], 2)
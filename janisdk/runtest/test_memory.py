@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from janis_assistant.management.configuration import JanisConfiguration
+
+from janisdk.runtest import memory
+from janisdk.runtest.memory import MemorySampler, uses_external_engine
+
+ALLOCATE = "import time; x = bytearray(200 * 1024 ** 2); time.sleep(30)"
+
+
+@unittest.skipUnless(MemorySampler.is_supported(), "needs /proc")
+class TestMemorySampler(unittest.TestCase):
+    def start(self, args, executable=None):
+        process = subprocess.Popen(args, executable=executable)
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        return process
+
+    @staticmethod
+    def sample_until(sampler, mb):
+        # until the child has started (and allocated)
+        for _ in range(100):
+            if sampler.sample() > mb * 1024**2:
+                return
+            time.sleep(0.05)
+
+    def test_samples_the_process_tree(self):
+        sampler = MemorySampler()
+        self.assertLess(sampler.sample(), 100 * 1024**2)
+
+        self.start([sys.executable, "-c", ALLOCATE])
+        self.sample_until(sampler, 200)
+        self.assertGreater(sampler.peak_mb(), 200)
+
+    def test_samples_docker_containers(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cidfile = os.path.join(tmpdir.name, "job.cid")
+        with open(cidfile, "w+") as f:
+            f.write("abc123")
+        os.makedirs(os.path.join(tmpdir.name, "abc123"))
+        with open(os.path.join(tmpdir.name, "abc123", "memory.current"), "w+") as f:
+            f.write(str(1024**3))
+
+        # a process that looks like: docker run --cidfile job.cid ...
+        self.start(
+            [
+                "docker",
+                "-c",
+                "import time; time.sleep(30)",
+                "run",
+                "--cidfile",
+                cidfile,
+            ],
+            executable=sys.executable,
+        )
+        template = os.path.join(tmpdir.name, "{cid}", "memory.current")
+        with mock.patch.object(memory, "CONTAINER_MEMORY_FILES", [template]):
+            sampler = MemorySampler()
+            self.sample_until(sampler, 1024)
+        self.assertGreater(sampler.peak_mb(), 1024)
+
+    def test_start_and_stop(self):
+        with MemorySampler(interval=0.01) as sampler:
+            pass
+        self.assertIsNotNone(sampler.peak_mb())
+
+
+class TestUsesExternalEngine(unittest.TestCase):
+    def test_cromwell_url(self):
+        config = JanisConfiguration(cromwell={"url": "localhost:8000"})
+        self.assertTrue(uses_external_engine("cromwell", config))
+        self.assertFalse(uses_external_engine("cwltool", config))
+        self.assertFalse(uses_external_engine("cromwell", JanisConfiguration()))
+        self.assertFalse(uses_external_engine("cromwell", None))
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from janisdk.runtest.replay import (
+    RecordedOutput,
+    read_recorded_outputs,
+    replay,
+    write_replay_report,
+)
+
+
+def recording(tool="tool", test_case="basic", output=None):
+    return {"tool": tool, "test_case": test_case, "output": output or {"out": "a"}}
+
+
+def mock_replay_tool(tool_id, recordings, engine):
+    """
+    Runs in the (forked) pool worker, the worker of "crashes" dies
+    """
+    if tool_id == "crashes":
+        os._exit(1)
+    return [
+        (source, {"failed": [], "succeeded": ["out"], "execution_error": ""})
+        for _, _, source in recordings
+    ]
+
+
+class TestReplay(unittest.TestCase):
+    def test_crashed_worker_fails_its_recordings(self):
+        recordings = [
+            RecordedOutput(tool, test_case, {"out": "a"}, f"{tool}/{test_case}")
+            for tool, test_case in [
+                ("crashes", "first"),
+                ("replays", "basic"),
+                ("crashes", "second"),
+            ]
+        ]
+        with mock.patch("janisdk.runtest.replay._replay_tool", mock_replay_tool):
+            results = replay(recordings, engine="cwltool", jobs=1)
+
+        # every recording has a result, in order
+        self.assertEqual(recordings, [r for r, _ in results])
+        errors = [result["execution_error"] for _, result in results]
+        self.assertIn("Couldn't replay the recordings of 'crashes'", errors[0])
+        self.assertEqual(errors[0], errors[2])
+        self.assertEqual("second", results[2][1]["test_case"])
+
+
+class TestReadRecordedOutputs(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, *components):
+        p = os.path.join(self.tmpdir.name, *components)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        return p
+
+    def test_jsonl_skips_invalid_lines(self):
+        p = self.path("recordings.jsonl")
+        with open(p, "w+") as f:
+            f.write(json.dumps(recording(test_case="first")) + "\n")
+            f.write("\n{not json\n")
+            f.write(json.dumps({"tool": "tool"}) + "\n")
+            # valid JSON, but not a recording
+            f.write("[1, 2]\nnull\n")
+            f.write(json.dumps(recording(test_case="second")) + "\n")
+
+        recordings = read_recorded_outputs(p)
+        self.assertEqual(["first", "second"], [r.test_case for r in recordings])
+        self.assertEqual(f"{p}:7", recordings[1].source)
+
+    def test_directory(self):
+        with open(self.path("a", "one.json"), "w+") as f:
+            json.dump(recording(tool="one"), f)
+        with open(self.path("b", "many.jsonl"), "w+") as f:
+            f.write(json.dumps(recording(tool="two")) + "\n")
+            f.write(json.dumps(recording(tool="three")) + "\n")
+        with open(self.path("b", "notes.txt"), "w+") as f:
+            f.write("not a recording")
+
+        recordings = read_recorded_outputs(self.tmpdir.name)
+        self.assertEqual(["one", "two", "three"], [r.tool_id for r in recordings])
+
+
+class TestWriteReplayReport(unittest.TestCase):
+    def test_report(self):
+        results = [
+            (
+                RecordedOutput("tool", "basic", {}, "a.jsonl:1"),
+                {"failed": [], "succeeded": ["out"], "execution_error": ""},
+            ),
+            (
+                RecordedOutput("tool", "other", {}, "a.jsonl:2"),
+                {"failed": ["out"], "succeeded": [], "execution_error": ""},
+            ),
+        ]
+        with tempfile.TemporaryDirectory() as d:
+            report_path = os.path.join(d, "out", "report.json")
+            write_replay_report(results, report_path)
+            with open(report_path) as f:
+                report = json.load(f)
+
+        self.assertEqual(
+            (2, 1, 1), (report["total"], report["succeeded"], report["failed"])
+        )
+        self.assertEqual("a.jsonl:2", report["results"][1]["source"])
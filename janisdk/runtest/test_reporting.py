@@ -0,0 +1,107 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from janisdk.runtest.reporting import StatusReporter
+
+
+class MockEndpoint:
+    """
+    A local HTTP server that records the requests it receives, and responds to
+    the first `fail_first` requests with a 503.
+    """
+
+    def __init__(self, fail_first=0):
+        self.requests = []
+        self.fail_first = fail_first
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                endpoint.requests.append((self.command, self.path, json.loads(body)))
+                status = 503 if len(endpoint.requests) <= endpoint.fail_first else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            do_POST = _handle
+            do_PATCH = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def mock_result(failed=None, execution_error=""):
+    return {
+        "failed": failed or [],
+        "succeeded": [],
+        "output": {},
+        "execution_error": execution_error,
+    }
+
+
+class TestStatusReporter(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = MockEndpoint()
+        self.addCleanup(self.endpoint.close)
+
+    def reporter(self, **kwargs):
+        return StatusReporter(
+            test_manager_url=f"{self.endpoint.url}/tests/1",
+            test_manager_token="token",
+            slack_notification_url=f"{self.endpoint.url}/slack",
+            backoff_factor=0,
+            **kwargs,
+        )
+
+    def test_reports_each_test_case(self):
+        with self.reporter() as reporter:
+            reporter.report(mock_result(), "tool", "basic")
+            reporter.report(mock_result(failed=["out"]), "tool", "other")
+
+        paths = [(method, path) for method, path, _ in self.endpoint.requests]
+        self.assertEqual(2, paths.count(("PATCH", "/tests/1")))
+        self.assertEqual(2, paths.count(("POST", "/slack")))
+
+    def test_batch_sends_one_summary(self):
+        with self.reporter(batch=True) as reporter:
+            reporter.report(mock_result(), "tool", "basic")
+            reporter.report(mock_result(execution_error="boom"), "tool", "other")
+            self.assertEqual([], self.endpoint.requests)
+
+        self.assertEqual(2, len(self.endpoint.requests))
+        update = next(r for r in self.endpoint.requests if r[1] == "/tests/1")[2]
+        self.assertEqual("test-failed", update["status"])
+        self.assertEqual(
+            ["test-succeeded", "test-failed"], [r["status"] for r in update["results"]]
+        )
+
+        slack = next(r for r in self.endpoint.requests if r[1] == "/slack")[2]
+        self.assertIn("1/2 test cases succeeded", slack["blocks"][0]["text"]["text"])
+
+    def test_retries_server_errors(self):
+        self.endpoint.fail_first = 2
+        with StatusReporter(
+            slack_notification_url=f"{self.endpoint.url}/slack", backoff_factor=0
+        ) as reporter:
+            reporter.report(mock_result(), "tool", "basic")
+
+        self.assertEqual(3, len(self.endpoint.requests))
+
+    def test_disabled_without_endpoints(self):
+        reporter = StatusReporter()
+        reporter.report(mock_result(), "tool", "basic")
+        reporter.close()
+        self.assertEqual([], self.endpoint.requests)
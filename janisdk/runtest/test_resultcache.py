@@ -0,0 +1,199 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from janis_core import CommandToolBuilder, ToolInput, ToolOutput, File, Stdout
+from janis_core.tool.test_classes import TTestCase, TTestExpectedOutput
+
+from janisdk.runtest.resultcache import (
+    ResultCache,
+    compute_test_case_key,
+    get_container_digests,
+)
+from janisdk.runtest.tabular import TableTolerance
+
+
+def mock_tool(container="ubuntu:latest", base_command="cat"):
+    return CommandToolBuilder(
+        tool="mock_cat",
+        version="v1",
+        base_command=base_command,
+        inputs=[ToolInput("inp", File, position=0)],
+        outputs=[ToolOutput("out", Stdout)],
+        container=container,
+    )
+
+
+def mock_test_case(input_path, expected_value=0, operator=None):
+    return TTestCase(
+        name="basic",
+        input={"inp": input_path},
+        output=[
+            TTestExpectedOutput(
+                tag="out",
+                preprocessor=lambda x: x,
+                operator=operator or (lambda a, b: a > b),
+                expected_value=expected_value,
+            )
+        ],
+    )
+
+
+class TestComputeTestCaseKey(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, "in.txt")
+        with open(self.input_path, "w+") as f:
+            f.write("hello")
+
+        # don't look up the digests from the registry
+        patcher = mock.patch(
+            "janisdk.runtest.resultcache.get_container_digests",
+            side_effect=lambda tool, config=None: dict(
+                (c, c) for c in tool.containers().values()
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def key(self, tool=None, test_case=None, engine="cromwell"):
+        return compute_test_case_key(
+            tool or mock_tool(),
+            test_case or mock_test_case(self.input_path),
+            engine,
+        )
+
+    def test_key_is_stable(self):
+        self.assertEqual(self.key(), self.key())
+
+    def test_key_changes_with_the_tool(self):
+        self.assertNotEqual(self.key(), self.key(tool=mock_tool(base_command="tac")))
+
+    def test_key_changes_with_the_container(self):
+        self.assertNotEqual(
+            self.key(), self.key(tool=mock_tool(container="ubuntu:20.04"))
+        )
+
+    def test_key_changes_with_the_engine(self):
+        self.assertNotEqual(self.key(), self.key(engine="cwltool"))
+
+    def test_key_of_an_operator_instance(self):
+        def key(operator):
+            return self.key(
+                test_case=mock_test_case(self.input_path, operator=operator)
+            )
+
+        # another instance (eg: in another process) with the same parameters
+        self.assertEqual(key(TableTolerance(atol=0.1)), key(TableTolerance(atol=0.1)))
+        self.assertNotEqual(
+            key(TableTolerance(atol=0.1)), key(TableTolerance(atol=0.2))
+        )
+
+    def test_key_changes_with_the_operator_code(self):
+        def key(operator_source):
+            namespace = {}
+            # exec'd, so the key falls back to the bytecode
+            exec(f"def operator(a, b):\n    return {operator_source}", namespace)
+            return self.key(
+                test_case=mock_test_case(
+                    self.input_path, operator=namespace["operator"]
+                )
+            )
+
+        self.assertEqual(key("a > b"), key("a > b"))
+        self.assertNotEqual(key("a > b"), key("a >= b"))
+        self.assertNotEqual(key("abs(a - b) < 0.1"), key("abs(a - b) < 0.2"))
+
+    def test_key_changes_with_the_expected_output(self):
+        self.assertNotEqual(
+            self.key(),
+            self.key(test_case=mock_test_case(self.input_path, expected_value=1)),
+        )
+
+    def test_key_changes_with_the_input_contents(self):
+        before = self.key()
+        with open(self.input_path, "w+") as f:
+            f.write("hello, world")
+        self.assertNotEqual(before, self.key())
+
+
+class TestContainerDigests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.config = mock.Mock(digest_cache_location=self.tmpdir.name)
+
+        from janis_assistant.data import container
+
+        self.addCleanup(container.in_memory_cache.clear)
+        # the registry has a new digest for the tag
+        patcher = mock.patch.object(
+            container,
+            "get_digest_from_container",
+            side_effect=lambda c, cache_location: container.try_lookup_in_cache(
+                c, cache_location
+            )
+            or "ubuntu@sha256:new",
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_path = container.get_cache_path_from_container(
+            cache_location=self.tmpdir.name, container="ubuntu:latest"
+        )
+        with open(self.cache_path, "w+") as f:
+            f.write("ubuntu@sha256:old")
+
+    def digest(self):
+        return get_container_digests(mock_tool(), self.config, max_age_hours=1)[
+            "ubuntu:latest"
+        ]
+
+    def test_cached_digest(self):
+        self.assertEqual("ubuntu@sha256:old", self.digest())
+
+    def test_expired_digest_is_looked_up_again(self):
+        self.assertEqual("ubuntu@sha256:old", self.digest())
+        os.utime(self.cache_path, (0, time.time() - 2 * 3600))
+        self.assertEqual("ubuntu@sha256:new", self.digest())
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        cache = ResultCache(path=self.tmpdir.name)
+        result = {
+            "failed": [],
+            "succeeded": ["out"],
+            "output": {},
+            "execution_error": "",
+        }
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", result)
+        self.assertEqual(result, cache.get("key"))
+
+    def test_expired_entry_is_ignored(self):
+        cache = ResultCache(path=self.tmpdir.name, max_age_days=1)
+        cache.put("key", {"failed": []})
+        with mock.patch("time.time", return_value=time.time() + 2 * 86400):
+            self.assertIsNone(cache.get("key"))
+
+    def test_evicts_least_recently_used(self):
+        # each entry is ~0.5MB, so only one fits
+        cache = ResultCache(path=self.tmpdir.name, max_size_mb=0.75)
+        big = {"output": "x" * 512 * 1024}
+        cache.put("first", big)
+        os.utime(cache.entry_path("first"), (0, time.time() - 10))
+        cache.put("second", big)
+
+        self.assertIsNone(cache.get("first"))
+        self.assertIsNotNone(cache.get("second"))
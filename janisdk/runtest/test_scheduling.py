@@ -0,0 +1,237 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from janis_core import (
+    CommandToolBuilder,
+    Stdout,
+    String,
+    ToolInput,
+    ToolOutput,
+    WorkflowBuilder,
+)
+
+from janisdk.runtest import scheduling
+from janisdk.runtest.scheduling import (
+    DurationHistory,
+    ResourceScheduler,
+    TestJob,
+    _run_test_case_with_log,
+    get_tool_resources,
+    run_test_cases_in_parallel,
+)
+
+
+def mock_run_test_case(tool_id, test_case, events_path=None, sleep=0.5, **kwargs):
+    """
+    Runs in the (forked) pool worker: records when the test case ran
+    """
+    if test_case == "slow":
+        sleep *= 3
+    with open(events_path, "a") as f:
+        f.write(f"{test_case} {time.time()}\n")
+    time.sleep(sleep)
+    with open(events_path, "a") as f:
+        f.write(f"{test_case} {time.time()}\n")
+    # as the engine (a subprocess) would
+    os.write(1, f"ran {test_case}\n".encode())
+    return {
+        "failed": [],
+        "succeeded": [test_case],
+        "execution_error": "",
+        "cached": test_case == "cached",
+    }
+
+
+def mock_tool(name, cpus=None, memory=None):
+    return CommandToolBuilder(
+        tool=name,
+        base_command="echo",
+        inputs=[ToolInput("inp", String, position=0)],
+        outputs=[ToolOutput("out", Stdout)],
+        container="ubuntu:latest",
+        version="v1",
+        cpus=cpus,
+        memory=memory,
+    )
+
+
+class TestGetToolResources(unittest.TestCase):
+    def test_tool_resources(self):
+        self.assertEqual((4, 8.0), get_tool_resources(mock_tool("Big", 4, 8)))
+        self.assertEqual(
+            (scheduling.DEFAULT_CPUS, float(scheduling.DEFAULT_MEMORY_GB)),
+            get_tool_resources(mock_tool("Undeclared")),
+        )
+
+    def test_workflow_resources_are_the_max_of_its_steps(self):
+        w = WorkflowBuilder("Resources", version="v1")
+        w.input("inp", String)
+        w.step("cpu_heavy", mock_tool("CpuHeavy", cpus=6, memory=2)(inp=w.inp))
+        w.step("memory_heavy", mock_tool("MemoryHeavy", cpus=2, memory=12)(inp=w.inp))
+        self.assertEqual((6, 12.0), get_tool_resources(w))
+
+
+class TestOrder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.history_path = os.path.join(self.tmpdir.name, "runtest", "durations.json")
+
+    def test_duration_history_round_trip(self):
+        history = DurationHistory(self.history_path)
+        self.assertIsNone(history.get("ToolA", "basic"))
+        history.record("ToolA", "basic", 12.5)
+        history.write()
+
+        # tool ids aren't case sensitive
+        self.assertEqual(12.5, DurationHistory(self.history_path).get("toola", "basic"))
+
+    def test_unreadable_history_is_empty(self):
+        os.makedirs(os.path.dirname(self.history_path))
+        with open(self.history_path, "w+") as f:
+            f.write("{not json")
+        self.assertEqual({}, DurationHistory(self.history_path).durations)
+
+    def test_longest_first_and_unknown_durations_first(self):
+        history = DurationHistory(self.history_path)
+        history.record("ToolA", "short", 5)
+        history.record("ToolA", "long", 60)
+        history.record("ToolB", "medium", 30)
+        scheduler = ResourceScheduler(self.tmpdir.name, history=history)
+
+        jobs = [
+            TestJob("ToolA", "short"),
+            TestJob("ToolB", "medium"),
+            TestJob("ToolA", "new"),
+            TestJob("ToolA", "long"),
+            # a duration that was already set isn't replaced
+            TestJob("ToolB", "given", expected_duration=45),
+        ]
+        self.assertEqual(
+            ["new", "long", "given", "medium", "short"],
+            [j.test_case for j in scheduler.order(jobs)],
+        )
+
+
+class TestResourceScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output_dir = os.path.join(self.tmpdir.name, "out")
+        self.events_path = os.path.join(self.tmpdir.name, "events")
+
+        patcher = mock.patch("janisdk.runtest.runner.run_test_case", mock_run_test_case)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_jobs(self, scheduler, jobs, **kwargs):
+        results = list(scheduler.run(jobs, events_path=self.events_path, **kwargs))
+        # {test case: (start, end)}
+        times = {}
+        with open(self.events_path) as f:
+            for line in f:
+                test_case, t = line.split()
+                times.setdefault(test_case, []).append(float(t))
+        return [job.test_case for job, _ in results], times
+
+    def test_jobs_run_together_when_they_fit(self):
+        scheduler = ResourceScheduler(self.output_dir, max_jobs=2, cpus=2, memory=8)
+        completed, times = self.run_jobs(
+            scheduler, [TestJob("ToolA", "first"), TestJob("ToolA", "second")]
+        )
+        self.assertEqual({"first", "second"}, set(completed))
+        self.assertLess(times["second"][0], times["first"][1])
+
+    def test_job_that_does_not_fit_waits_for_resources(self):
+        scheduler = ResourceScheduler(self.output_dir, max_jobs=2, cpus=4, memory=8)
+        completed, times = self.run_jobs(
+            scheduler,
+            [
+                TestJob("ToolA", "first", cpus=3, expected_duration=2),
+                TestJob("ToolA", "second", cpus=2, expected_duration=1),
+            ],
+        )
+        self.assertEqual(["first", "second"], completed)
+        self.assertGreaterEqual(times["second"][0], times["first"][1])
+
+        # or for memory
+        os.remove(self.events_path)
+        completed, times = self.run_jobs(
+            scheduler,
+            [
+                TestJob("ToolA", "first", memory=6, expected_duration=2),
+                TestJob("ToolA", "second", memory=4, expected_duration=1),
+            ],
+        )
+        self.assertGreaterEqual(times["second"][0], times["first"][1])
+
+    def test_oversized_job_is_clamped(self):
+        scheduler = ResourceScheduler(self.output_dir, max_jobs=2, cpus=2, memory=4)
+        self.assertEqual((2, 4), scheduler._reservation(TestJob("T", "t", 16, 64)))
+
+        completed, times = self.run_jobs(
+            scheduler,
+            [
+                TestJob("ToolA", "huge", cpus=16, memory=64, expected_duration=2),
+                TestJob("ToolA", "small", cpus=1, memory=1, expected_duration=1),
+            ],
+        )
+        # it runs, on its own
+        self.assertEqual(["huge", "small"], completed)
+        self.assertGreaterEqual(times["small"][0], times["huge"][1])
+
+    def test_only_durations_of_runs_are_recorded(self):
+        history = DurationHistory(os.path.join(self.tmpdir.name, "durations.json"))
+        scheduler = ResourceScheduler(
+            self.output_dir, max_jobs=2, cpus=2, memory=8, history=history
+        )
+        self.run_jobs(
+            scheduler, [TestJob("ToolA", "ran"), TestJob("ToolA", "cached")], sleep=0
+        )
+        self.assertIsNotNone(history.get("ToolA", "ran"))
+        self.assertIsNone(history.get("ToolA", "cached"))
+
+    def test_job_log(self):
+        scheduler = ResourceScheduler(self.output_dir, max_jobs=1, cpus=1, memory=4)
+        job = TestJob("ToolA", "logged")
+        self.run_jobs(scheduler, [job], sleep=0)
+        with open(scheduler.job_log_path(job)) as f:
+            self.assertEqual("ran logged\n", f.read())
+
+    def test_run_test_case_with_log(self):
+        log_path = os.path.join(self.tmpdir.name, "logs", "direct.log")
+        result = _run_test_case_with_log(
+            log_path,
+            {
+                "tool_id": "ToolA",
+                "test_case": "direct",
+                "events_path": self.events_path,
+                "sleep": 0,
+            },
+        )
+        self.assertEqual(["direct"], result["succeeded"])
+        with open(log_path) as f:
+            self.assertEqual("ran direct\n", f.read())
+
+    def test_parallel_results_are_in_test_case_order(self):
+        history = scheduling.DurationHistory(
+            os.path.join(self.tmpdir.name, "durations.json")
+        )
+        history.record("ToolA", "slow", 10)
+        history.record("ToolA", "fast", 1)
+        with mock.patch.object(scheduling, "DurationHistory", return_value=history):
+            results = list(
+                run_test_cases_in_parallel(
+                    "ToolA",
+                    ["fast", "slow"],
+                    jobs=2,
+                    cpus=1,
+                    memory=1,
+                    output_dir=self.output_dir,
+                    events_path=self.events_path,
+                )
+            )
+        self.assertEqual(["fast", "slow"], [tc for tc, _ in results])
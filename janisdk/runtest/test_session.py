@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import ruamel.yaml
+
+from janisdk.runtest.session import EngineSession
+
+
+class FakeEngine:
+    host = "127.0.0.1:8123"
+
+    def __init__(self):
+        self.stopped = False
+
+    def stop_engine(self):
+        self.stopped = True
+
+
+class TestEngineSession(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.engine = FakeEngine()
+
+    def session(self, config=None, start_engine=None):
+        return EngineSession(
+            output_dir=os.path.join(self.tmpdir.name, "session"),
+            config=config,
+            start_engine=start_engine or (lambda output_dir, config: self.engine),
+        )
+
+    def test_config_points_at_the_engine(self):
+        config = os.path.join(self.tmpdir.name, "janis.yaml")
+        with open(config, "w+") as f:
+            f.write("engine: cwltool\ncromwell:\n  memory_mb: 8000\n")
+
+        with self.session(config=config) as config_path:
+            with open(config_path) as f:
+                session_config = ruamel.yaml.safe_load(f)
+            self.assertFalse(self.engine.stopped)
+
+        self.assertTrue(self.engine.stopped)
+        self.assertEqual("cromwell", session_config["engine"])
+        self.assertEqual(
+            {"memory_mb": 8000, "url": "127.0.0.1:8123"}, session_config["cromwell"]
+        )
+
+    def test_engine_is_stopped_when_the_run_fails(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with self.session():
+                raise KeyboardInterrupt()
+        self.assertTrue(self.engine.stopped)
+
+    def test_engine_that_didnt_start(self):
+        start_engine = mock.Mock(side_effect=Exception("no java"))
+        with self.assertRaises(Exception):
+            with self.session(start_engine=start_engine):
+                pass
+        self.assertFalse(self.engine.stopped)
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+from janis_core import CommandToolBuilder, ToolInput, ToolOutput, File, String
+from janis_core.tool.test_classes import (
+    TTestCase,
+    TTestExpectedOutput,
+    TTestPreprocessor,
+)
+from janisdk.runtest.comparison import (
+    ExpectedFileContents,
+    StreamingToolTestSuiteRunner,
+)
+from janisdk.runtest.tabular import TableMismatch, TableTolerance, load_table
+
+EXPECTED = """\
+## coverage metrics
+contig\tdepth\tmean\tfraction
+chr1\t10\t30.5\t0.99
+chr2\t20\t31.0\tnan
+"""
+
+
+class TestTableTolerance(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, contents, filename="metrics.tsv"):
+        path = os.path.join(self.tmpdir.name, filename)
+        with open(path, "w+") as f:
+            f.write(contents)
+        return path
+
+    def test_load_table(self):
+        table = load_table(self.write(EXPECTED))
+        self.assertEqual(["contig", "depth", "mean", "fraction"], table.names)
+        self.assertEqual(2, table.rows)
+        self.assertEqual(["chr1", "chr2"], list(table.columns["contig"]))
+        self.assertEqual([30.5, 31.0], list(table.columns["mean"]))
+
+        csv = load_table("a,b\n1,x\n2,y\n", contents=True)
+        self.assertEqual([1.0, 2.0], list(csv.columns["a"]))
+
+    def test_commented_header(self):
+        vcf = load_table(
+            "##fileformat=VCFv4.2\n#CHROM\tPOS\tQUAL\nchr1\t10\t50\nchr1\t20\t60\n",
+            contents=True,
+        )
+        self.assertEqual(["CHROM", "POS", "QUAL"], vcf.names)
+        self.assertEqual(2, vcf.rows)
+        self.assertEqual([10.0, 20.0], list(vcf.columns["POS"]))
+
+        # a comment with a different number of columns isn't the header
+        table = load_table(
+            "# depth per contig\ncontig\tdepth\nchr1\t10\n", contents=True
+        )
+        self.assertEqual(["contig", "depth"], table.names)
+        self.assertEqual(1, table.rows)
+
+    def test_within_tolerance(self):
+        actual = self.write(EXPECTED.replace("30.5", "30.52"), "actual.tsv")
+        expected = self.write(EXPECTED)
+
+        self.assertTrue(TableTolerance(atol={"mean": 0.05})(actual, expected))
+        self.assertTrue(TableTolerance(rtol=1e-3)(actual, expected))
+        with self.assertRaises(TableMismatch) as e:
+            TableTolerance(rtol=1e-4)(actual, expected)
+        self.assertIn("mean (row 1): 30.52, expected 30.5", str(e.exception))
+
+    def test_reports_the_worst_deviations(self):
+        actual = self.write(
+            EXPECTED.replace("30.5", "30.6")
+            .replace("31.0", "35")
+            .replace("chr2", "chrX"),
+            "actual.tsv",
+        )
+        with self.assertRaises(TableMismatch) as e:
+            TableTolerance(atol=0.2, report=2)(actual, ExpectedFileContents(EXPECTED))
+        message = str(e.exception)
+        self.assertTrue(message.startswith("2 values are outside the tolerance"))
+        self.assertIn("mean (row 2): 35, expected 31", message)
+        self.assertIn("contig (row 2): 'chrX', expected 'chr2'", message)
+
+    def test_different_shapes(self):
+        expected = self.write(EXPECTED)
+        with self.assertRaises(TableMismatch) as e:
+            TableTolerance()(
+                self.write(EXPECTED.replace("fraction", "frac"), "renamed.tsv"),
+                expected,
+            )
+        self.assertIn("missing: ['fraction']", str(e.exception))
+        self.assertTrue(TableTolerance(ignore_columns=["chr2"])(expected, expected))
+
+        with self.assertRaises(TableMismatch) as e:
+            TableTolerance()(
+                self.write(EXPECTED + "chr3\t1\t1\t1\n", "3.tsv"), expected
+            )
+        self.assertIn("3 rows, expected 2", str(e.exception))
+
+    def test_expected_file_contents_of_one_line(self):
+        actual = self.write("contig\tdepth\n", "actual.tsv")
+        with warnings.catch_warnings():
+            # the empty body isn't given to np.loadtxt (which warns about it)
+            warnings.simplefilter("error")
+            self.assertTrue(
+                TableTolerance()(actual, ExpectedFileContents("contig\tdepth"))
+            )
+            with self.assertRaises(TableMismatch):
+                TableTolerance()(actual, ExpectedFileContents("contig\tmean"))
+
+    def test_from_a_test_case(self):
+        tool = CommandToolBuilder(
+            tool="mock_metrics",
+            version="v1",
+            base_command="cat",
+            inputs=[ToolInput("inp", String, position=0)],
+            outputs=[ToolOutput("metrics", File, selector="metrics.tsv")],
+            container="ubuntu:latest",
+        )
+        test_case = TTestCase(
+            name="metrics",
+            input={"inp": "x"},
+            output=[
+                TTestExpectedOutput(
+                    tag="metrics",
+                    preprocessor=TTestPreprocessor.Value,
+                    operator=TableTolerance(atol=0.1),
+                    expected_file=self.write(EXPECTED),
+                )
+            ],
+        )
+        actual = self.write(EXPECTED.replace("30.5", "30.55"), "actual.tsv")
+
+        failed, succeeded, _ = StreamingToolTestSuiteRunner(tool).run_one_test_case(
+            test_case, engine="cwltool", output={"metrics": actual}
+        )
+        self.assertEqual([], failed)
+        self.assertEqual(1, len(succeeded))
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from janisdk.runtest.comparison import StreamingToolTestSuiteRunner
+
+from janisdk.runtest.timings import (
+    PhaseTimer,
+    TimedToolTestSuiteRunner,
+    get_run_phases,
+)
+
+
+def write_job_times(output_dir, jobs):
+    """
+    A janis task.db with the (parent, start, finish) of jobs, JSON encoded as
+    janis stores them
+    """
+    db_dir = os.path.join(output_dir, "janis", "database")
+    os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(db_dir, "task.db"))
+    with connection:
+        connection.execute("CREATE TABLE jobs (parent TEXT, start TEXT, finish TEXT)")
+        connection.executemany(
+            "INSERT INTO jobs VALUES (?, ?, ?)",
+            [tuple(json.dumps(v) for v in job) for job in jobs],
+        )
+    connection.close()
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_phases_accumulate(self):
+        timer = PhaseTimer()
+        for _ in range(2):
+            with timer.phase("sleep"):
+                time.sleep(0.01)
+
+        timings = timer.to_dict()
+        self.assertGreaterEqual(timings["sleep"], 0.02)
+        self.assertGreaterEqual(timings["total"], timings["sleep"])
+
+
+class TestTimedToolTestSuiteRunner(unittest.TestCase):
+    def test_engine_is_not_counted_as_compare(self):
+        def slow_run(self, input, engine):
+            time.sleep(0.05)
+            return {}
+
+        def run_one_test_case(self, t, engine, output=None):
+            self.run(input={}, engine=engine)
+            return [], [], {}
+
+        with mock.patch.object(
+            StreamingToolTestSuiteRunner, "run", slow_run
+        ), mock.patch.object(
+            StreamingToolTestSuiteRunner, "run_one_test_case", run_one_test_case
+        ):
+            runner = TimedToolTestSuiteRunner(tool=mock.MagicMock())
+            runner.run_one_test_case(t=None, engine="cromwell")
+
+        timings = runner.timer.to_dict()
+        # (the run's own translation is taken out of engine_startup)
+        self.assertGreaterEqual(
+            timings["translation"] + timings["engine_startup"], 0.05
+        )
+        self.assertLess(timings["compare"], 0.05)
+
+    def test_run_is_split_into_phases(self):
+        def run(self, input, engine):
+            time.sleep(0.05)
+            write_job_times(
+                self.output_dir,
+                [
+                    (None, "2026-10-17 10:00:00+00:00", "2026-10-17 10:01:00+00:00"),
+                    ("wf", "2026-10-17 10:00:05+00:00", "2026-10-17 10:00:35+00:00"),
+                    ("wf", "2026-10-17 10:00:10+00:00", "2026-10-17 10:00:50+00:00"),
+                ],
+            )
+            return {}
+
+        tool = mock.MagicMock()
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(
+            StreamingToolTestSuiteRunner, "run", run
+        ):
+            runner = TimedToolTestSuiteRunner(tool=tool)
+            runner.output_dir = tmpdir
+            runner.run(input={}, engine="cromwell")
+
+        tool.translate.assert_called_once_with("wdl", to_console=False, to_disk=False)
+        timings = runner.timer.to_dict()
+        self.assertEqual(5, timings["queueing"])
+        self.assertEqual(45, timings["execution"])
+        self.assertIn("translation", timings)
+        # the rest of the run
+        self.assertGreaterEqual(timings["engine_startup"], 0)
+
+
+class TestGetRunPhases(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_no_database(self):
+        self.assertEqual({}, get_run_phases(self.tmpdir.name))
+
+    def test_jobs_that_have_not_started(self):
+        write_job_times(
+            self.tmpdir.name,
+            [(None, "2026-10-17 10:00:00+00:00", None), ("wf", None, None)],
+        )
+        self.assertEqual({}, get_run_phases(self.tmpdir.name))
+
+    def test_database_from_an_earlier_run(self):
+        write_job_times(
+            self.tmpdir.name,
+            [
+                (None, "2026-10-17 10:00:00+00:00", None),
+                ("wf", "2026-10-17 10:00:05+00:00", "2026-10-17 10:00:35+00:00"),
+            ],
+        )
+        self.assertEqual(
+            {"queueing": 5, "execution": 30}, get_run_phases(self.tmpdir.name)
+        )
+        self.assertEqual({}, get_run_phases(self.tmpdir.name, since=time.time() + 1))
@@ -0,0 +1,156 @@
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+from janisdk.runtest import watch
+
+DATA_TYPES = """
+from janis_core import File
+
+
+class WatchedFile(File):
+    @staticmethod
+    def name():
+        return "WatchedFile"
+"""
+
+TOOLS = """
+from janis_core import CommandTool, ToolInput, ToolOutput, Stdout
+from janis_core.tool.test_classes import TTestCase, TTestExpectedOutput, TTestPreprocessor
+
+from watchedtools.data_types import WatchedFile
+
+
+class WatchedCat(CommandTool):
+    def tool(self):
+        return "WatchedCat"
+
+    def base_command(self):
+        return "cat"
+
+    def inputs(self):
+        return [ToolInput("inp", WatchedFile, position=0)]
+
+    def outputs(self):
+        return [ToolOutput("out", Stdout)]
+
+    def container(self):
+        return "ubuntu:latest"
+
+    def version(self):
+        return "v1"
+
+    def tests(self):
+        return [
+            TTestCase(
+                name=name,
+                input={"inp": "/data/in.txt"},
+                output=[
+                    TTestExpectedOutput(
+                        tag="out",
+                        preprocessor=TTestPreprocessor.LineCount,
+                        operator=int.__eq__,
+                        expected_value=lines,
+                    )
+                ],
+            )
+            for name, lines in [("first", FIRST_LINES), ("second", 2)]
+        ]
+
+
+FIRST_LINES = 1
+"""
+
+
+class TestToolWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.package = os.path.join(self.tmpdir.name, "watchedtools")
+        os.makedirs(self.package)
+        self.write("__init__.py", "")
+        self.write("data_types.py", DATA_TYPES)
+        self.write("tools.py", TOOLS)
+
+        sys.path.insert(0, self.tmpdir.name)
+        self.addCleanup(sys.path.remove, self.tmpdir.name)
+        self.addCleanup(self.forget_package)
+
+        def get_one_tool(tool_id):
+            import watchedtools.tools
+
+            return sys.modules["watchedtools.tools"].WatchedCat()
+
+        snapshot = mock.Mock()
+        snapshot.find_tool_record.return_value = None
+        for target, value in [
+            ("get_one_tool", get_one_tool),
+            ("get_shed_snapshot", lambda: snapshot),
+        ]:
+            patcher = mock.patch.object(watch, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def forget_package():
+        for m in [m for m in sys.modules if m.split(".")[0] == "watchedtools"]:
+            del sys.modules[m]
+
+    def write(self, filename, contents):
+        path = os.path.join(self.package, filename)
+        with open(path, "w+") as f:
+            f.write(textwrap.dedent(contents))
+        # make sure the change is seen, whatever the mtime resolution
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_watches_the_tool_and_its_data_types(self):
+        watcher = watch.ToolWatcher("WatchedCat", engine="cromwell")
+        self.assertEqual(
+            {"watchedtools.tools", "watchedtools.data_types"}, watcher.modules
+        )
+        self.assertEqual(set(), watcher.changed_modules())
+
+    def test_only_changed_test_cases_are_rerun(self):
+        watcher = watch.ToolWatcher("WatchedCat", engine="cromwell")
+        watcher.keys = watcher.get_test_case_keys(watcher.tool)
+
+        self.write("tools.py", TOOLS.replace("FIRST_LINES = 1", "FIRST_LINES = 3"))
+        changed = watcher.changed_modules()
+        self.assertEqual({"watchedtools.tools"}, changed)
+        self.assertEqual(["first"], watcher.reload(changed))
+        self.assertEqual(set(), watcher.changed_modules())
+
+    def test_changed_data_types_reload_the_tools_that_use_them(self):
+        watcher = watch.ToolWatcher("WatchedCat", engine="cromwell")
+        watcher.keys = watcher.get_test_case_keys(watcher.tool)
+
+        self.write("data_types.py", DATA_TYPES + "\n# a comment\n")
+        changed = watcher.changed_modules()
+        self.assertEqual(
+            ["watchedtools.data_types", "watchedtools.tools"],
+            watch.get_reload_order(changed, watcher.modules),
+        )
+        # nothing that changes the translation
+        self.assertEqual([], watcher.reload(changed))
+        self.assertIs(
+            sys.modules["watchedtools.data_types"].WatchedFile,
+            sys.modules["watchedtools.tools"].WatchedFile,
+        )
+
+
+class TestWatchArgs(unittest.TestCase):
+    def test_watch_is_for_one_tool(self):
+        from janisdk.main import build_parser
+        from janisdk.runtest import runner
+
+        for extra in (["--all-tools"], ["--changed-since", "main"]):
+            args = build_parser().parse_args(["run-test", "--watch", *extra])
+            with mock.patch.object(
+                runner, "execute_all_tools"
+            ) as execute_all_tools, self.assertRaises(SystemExit):
+                runner.execute(args)
+            execute_all_tools.assert_not_called()
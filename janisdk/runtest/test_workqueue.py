@@ -0,0 +1,166 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from janisdk.runtest.scheduling import DurationHistory, ResourceScheduler, TestJob
+from janisdk.runtest.workqueue import MAX_ATTEMPTS, QueueWorker, WorkQueue
+
+
+def mock_run_test_case(tool_id, test_case, **kwargs):
+    # runs in the (forked) pool worker
+    time.sleep(3 if test_case == "slow" else 0)
+    return {
+        "failed": [],
+        "succeeded": [test_case],
+        "execution_error": "",
+        "cached": test_case == "cached",
+    }
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.queue = WorkQueue(os.path.join(self.tmpdir.name, "queue"))
+
+    def submit(self, n):
+        return self.queue.submit([TestJob("ToolA", f"case {i}") for i in range(n)])
+
+    def make_dead(self, worker_id):
+        # as if its last heartbeat was long ago
+        os.utime(self.queue.heartbeat_path(worker_id), (0, 0))
+
+    def test_jobs_are_claimed_in_order(self):
+        self.assertEqual(3, self.submit(3))
+        # already queued
+        self.assertEqual(0, self.submit(3))
+
+        self.queue.register("w1")
+        claimed = [self.queue.claim("w1").job.test_case for _ in range(3)]
+        self.assertEqual(["case 0", "case 1", "case 2"], claimed)
+        self.assertIsNone(self.queue.claim("w1"))
+
+    def test_each_job_is_claimed_once(self):
+        self.submit(50)
+        claimed = {}
+
+        def worker(worker_id):
+            self.queue.register(worker_id)
+            claimed[worker_id] = []
+            while True:
+                queued = self.queue.claim(worker_id)
+                if queued is None:
+                    break
+                claimed[worker_id].append(queued.job.test_case)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        all_claimed = [tc for tcs in claimed.values() for tc in tcs]
+        self.assertEqual(50, len(all_claimed))
+        self.assertEqual(50, len(set(all_claimed)))
+
+    def test_complete(self):
+        self.submit(1)
+        self.queue.register("w1")
+        queued = self.queue.claim("w1")
+        self.assertFalse(self.queue.is_finished())
+
+        result = {"failed": [], "succeeded": ["out"], "execution_error": None}
+        self.queue.complete(queued, result, worker_id="w1")
+
+        self.assertTrue(self.queue.is_finished())
+        self.assertEqual([("ToolA", "case 0", result)], self.queue.results())
+
+    def test_reclaims_jobs_of_dead_workers(self):
+        self.submit(2)
+        self.queue.register("dead")
+        self.queue.claim("dead")
+        now = self.queue.register("alive")
+
+        # still alive
+        self.queue.reclaim("alive", now)
+        self.assertEqual(1, self.queue.counts()["running"])
+
+        self.make_dead("dead")
+        self.queue.reclaim("alive", now)
+        self.assertEqual(
+            {"pending": 2, "running": 0, "done": 0, "abandoned": 0}, self.queue.counts()
+        )
+        self.assertFalse(os.path.exists(self.queue.heartbeat_path("dead")))
+
+        # the reclaimed job keeps its place in the queue
+        queued = self.queue.claim("alive")
+        self.assertEqual("case 0", queued.job.test_case)
+        self.assertEqual(1, queued.attempt)
+
+    def test_abandons_jobs_that_keep_killing_workers(self):
+        self.submit(1)
+        now = self.queue.register("alive")
+        for i in range(MAX_ATTEMPTS):
+            self.queue.register(f"dead{i}")
+            self.assertIsNotNone(self.queue.claim(f"dead{i}"))
+            self.make_dead(f"dead{i}")
+            self.queue.reclaim("alive", now)
+
+        self.assertTrue(self.queue.is_finished())
+        [(tool_id, test_case, result)] = self.queue.results()
+        self.assertEqual("case 0", test_case)
+        self.assertIn("Abandoned", result["execution_error"])
+
+
+class TestQueueWorker(unittest.TestCase):
+    def test_busy_worker_starts_queued_jobs(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        queue = WorkQueue(os.path.join(tmpdir.name, "queue"))
+        queue.submit([TestJob("ToolA", "slow", cpus=1, memory=1)])
+        worker = QueueWorker(
+            queue,
+            ResourceScheduler(
+                os.path.join(tmpdir.name, "out"), max_jobs=2, cpus=2, memory=2
+            ),
+            poll_interval=30,
+        )
+
+        def submit_later():
+            time.sleep(0.5)
+            queue.submit([TestJob("ToolA", "fast", cpus=1, memory=1)])
+
+        thread = threading.Thread(target=submit_later)
+        with mock.patch("janisdk.runtest.runner.run_test_case", mock_run_test_case):
+            thread.start()
+            completed = [job.test_case for job, _ in worker.run()]
+        thread.join()
+
+        # picked up while the slow one was running, not once it finished
+        self.assertEqual(["fast", "slow"], completed)
+
+    def test_only_durations_of_runs_are_recorded(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        queue = WorkQueue(os.path.join(tmpdir.name, "queue"))
+        queue.submit([TestJob("ToolA", t, cpus=1, memory=1) for t in ("ran", "cached")])
+        history = DurationHistory(os.path.join(tmpdir.name, "durations.json"))
+        worker = QueueWorker(
+            queue,
+            ResourceScheduler(
+                os.path.join(tmpdir.name, "out"),
+                max_jobs=2,
+                cpus=2,
+                memory=2,
+                history=history,
+            ),
+        )
+
+        with mock.patch("janisdk.runtest.runner.run_test_case", mock_run_test_case):
+            self.assertEqual(2, len(list(worker.run())))
+
+        self.assertIsNotNone(history.get("ToolA", "ran"))
+        self.assertIsNone(history.get("ToolA", "cached"))
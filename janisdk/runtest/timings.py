@@ -0,0 +1,186 @@
+"""
+Time the phases of running a test case, so we can tell where a slow test
+spends its time. The phases are:
+
+    - resolve_tool: finding and building the tool (get_one_tool)
+    - load_tests: building the tool's test cases (tool.tests())
+    - cache_lookup: hashing the test case, and looking up its cached result
+    - stage_inputs: staging the remote inputs from the input store (this
+      includes downloading them into the store the first time)
+    - translation: translating the tool to the engine's language (janis
+      translates it again in the run, which is taken out of engine_startup)
+    - queueing: from the run starting to its first job starting
+    - execution: from the run's first job starting to its last job finishing
+    - engine_startup: the rest of janis_assistant's run_with_outputs, this is
+      starting the engine (or submitting to it) and collecting the outputs
+
+janis_assistant doesn't report the phases of a run, so queueing and execution
+come from the start and finish of the jobs in the run's database.
+    - download_expected: downloading remote expected output files
+    - compare: comparing the outputs with the expected outputs
+    - cache_store: storing the result in the cache
+
+Each is in seconds, with the total in "total".
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from janis_core import Logger
+from janis_assistant.utils.dateutils import DateUtil
+
+from janisdk.runtest.comparison import StreamingToolTestSuiteRunner
+
+RUN_PHASES = ("translation", "queueing", "execution", "engine_startup")
+
+# the language janis_assistant translates to for an engine (otherwise CWL)
+ENGINE_TRANSLATIONS = {"cromwell": "wdl", "nextflow": "nextflow"}
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.start = time.time()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start)
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0) + seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            **{k: round(v, 3) for k, v in self.timings.items()},
+            "total": round(time.time() - self.start, 3),
+        }
+
+
+def _decode(value):
+    # a job's fields are stored JSON encoded (though not always)
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def get_run_phases(output_dir: str, since: float = None) -> Dict[str, float]:
+    """
+    The queueing and execution (in seconds) of the janis run in output_dir, from
+    the start and finish of the jobs in its database: the run's own job (which
+    has no parent) starts when the run does. A phase that can't be worked out
+    (eg: the run didn't get to start a job) is left out.
+
+    :param since: ignore a database that wasn't written since then (it's from
+        an earlier run)
+    """
+    path = os.path.join(output_dir, "janis", "database", "task.db")
+    if not os.path.exists(path):
+        return {}
+    if since is not None and os.path.getmtime(path) < since:
+        return {}
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=1)
+        try:
+            rows = connection.execute(
+                "SELECT parent, start, finish FROM jobs"
+            ).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        Logger.debug(f"Couldn't read the job times from '{path}': {e}")
+        return {}
+
+    run_starts, starts, finishes = [], [], []
+    for parent, start, finish in rows:
+        start = DateUtil.parse_iso(_decode(start))
+        finish = DateUtil.parse_iso(_decode(finish))
+        if _decode(parent) is None:
+            run_starts.extend([start] if start else [])
+        else:
+            starts.extend([start] if start else [])
+            finishes.extend([finish] if finish else [])
+
+    phases = {}
+    if starts and run_starts:
+        phases["queueing"] = max(0.0, (min(starts) - min(run_starts)).total_seconds())
+    if starts and finishes:
+        phases["execution"] = max(0.0, (max(finishes) - min(starts)).total_seconds())
+    return phases
+
+
+class TimedToolTestSuiteRunner(StreamingToolTestSuiteRunner):
+    """
+    A (streaming) ToolTestSuiteRunner that times translating the tool, the
+    phases of the engine's run, downloading the expected files and (the rest of
+    run_one_test_case) comparing the outputs.
+    """
+
+    def __init__(self, tool, config=None, timer: PhaseTimer = None):
+        super().__init__(tool, config=config)
+        self.timer = timer or PhaseTimer()
+
+    def translate(self, engine):
+        translation = ENGINE_TRANSLATIONS.get(getattr(engine, "value", engine), "cwl")
+        try:
+            self.tool.translate(translation, to_console=False, to_disk=False)
+        except Exception as e:
+            # the run translates the tool too, and reports why it can't
+            Logger.debug(f"Couldn't translate {self.tool.id()}: {repr(e)}")
+
+    def run(self, input, engine):
+        start = time.time()
+        self.translate(engine)
+        translation = time.time() - start
+        self.timer.add("translation", translation)
+
+        start = time.time()
+        try:
+            return super().run(input=input, engine=engine)
+        finally:
+            elapsed = time.time() - start
+            phases = get_run_phases(self.output_dir, since=start)
+            for name, seconds in phases.items():
+                self.timer.add(name, seconds)
+            # janis translated the tool again, before it started the engine
+            startup = elapsed - sum(phases.values()) - translation
+            self.timer.add("engine_startup", max(0.0, startup))
+
+    def _download_remote_files(self, test_logic):
+        with self.timer.phase("download_expected"):
+            return super()._download_remote_files(test_logic)
+
+    def run_one_test_case(self, t, engine, output=None):
+        before = dict(self.timer.timings)
+        start = time.time()
+        try:
+            return super().run_one_test_case(t=t, engine=engine, output=output)
+        finally:
+            # everything that isn't running the engine or downloading is comparing
+            others = sum(
+                self.timer.timings.get(k, 0) - before.get(k, 0)
+                for k in RUN_PHASES + ("download_expected",)
+            )
+            self.timer.add("compare", time.time() - start - others)
+
+
+def write_timings_json(results: List[Tuple[str, str, Dict]], path: str):
+    """
+    Write {"tool/test case": timings} for the (tool, test case, result) of a run
+    """
+    timings = {
+        f"{tool_id}/{test_case}": result.get("timings")
+        for tool_id, test_case, result in results
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w+") as f:
+        json.dump(timings, f, indent=2)
@@ -0,0 +1,226 @@
+"""
+run-test --watch: rerun the test cases of a tool as its source changes.
+
+The watcher polls the files of the modules the tool is built from: the modules
+that define it (and its base classes), the modules of its sub-tools (for a
+workflow, recursively) and of its input and output data types. When one
+changes, the changed modules are
+reloaded (with the modules that imported from them, so they don't hold on to
+the old classes), the tool is built again, and only the test cases whose
+definition (the translated tool, and the test case's inputs and expected
+outputs) changed are rerun.
+"""
+
+import importlib
+import os
+import sys
+import sysconfig
+import time
+from inspect import ismodule
+from typing import Callable, Dict, List, Optional, Set
+
+from janis_core import Array, Logger
+
+from janisdk.runtest.resultcache import compute_test_case_key
+from janisdk.shed.hydrationcache import get_one_tool, get_shed_snapshot
+
+POLL_INTERVAL = 1
+
+# the framework isn't watched, only the tools built on it
+IGNORED_PACKAGES = {"janis_core", "janis_assistant", "builtins"}
+STDLIB_PATH = os.path.join(sysconfig.get_paths()["stdlib"], "")
+SITE_PACKAGES_PATHS = tuple(
+    os.path.join(sysconfig.get_paths()[p], "") for p in ("purelib", "platlib")
+)
+
+
+def _is_watchable(modname: Optional[str]) -> bool:
+    if not modname or modname.split(".")[0] in IGNORED_PACKAGES:
+        return False
+    path = getattr(sys.modules.get(modname), "__file__", None)
+    if not path:
+        return False
+    # nor the standard library (eg: abc, from a tool's base classes)
+    return not path.startswith(STDLIB_PATH) or path.startswith(SITE_PACKAGES_PATHS)
+
+
+def get_source_modules(tool) -> Set[str]:
+    """
+    The names of the modules tool is built from
+    """
+    # with the base classes, eg: a versioned tool's base tool
+    modules = {cls.__module__ for cls in type(tool).__mro__}
+
+    # a CommandToolBuilder's class is in janis_core, the shed knows its module
+    record = get_shed_snapshot().find_tool_record(tool.id(), tool.version())
+    if record:
+        modules.add(record["module"])
+
+    types = [i.intype for i in tool.tool_inputs()] + [
+        o.outtype for o in tool.tool_outputs()
+    ]
+    for datatype in types:
+        if isinstance(datatype, Array):
+            datatype = datatype.fundamental_type()
+        modules.add(type(datatype).__module__)
+
+    for step in (getattr(tool, "step_nodes", None) or {}).values():
+        modules.update(get_source_modules(step.tool))
+
+    return {m for m in modules if _is_watchable(m)}
+
+
+def _depends_on(module, modname: str) -> bool:
+    """
+    Whether module imported modname, or something from it
+    """
+    for value in list(vars(module).values()):
+        if ismodule(value):
+            if value.__name__ == modname:
+                return True
+        elif getattr(value, "__module__", None) == modname:
+            return True
+    return False
+
+
+def get_reload_order(changed: Set[str], watched: Set[str]) -> List[str]:
+    """
+    The changed modules, and the watched modules that (transitively) import
+    from them, with each after the modules it imports from
+    """
+    to_reload = set(changed)
+    while True:
+        dependents = {
+            m
+            for m in watched - to_reload
+            if any(_depends_on(sys.modules[m], c) for c in to_reload)
+        }
+        if not dependents:
+            break
+        to_reload |= dependents
+
+    dependencies = {
+        m: {d for d in to_reload if d != m and _depends_on(sys.modules[m], d)}
+        for m in to_reload
+    }
+    order = []
+    while dependencies:
+        ready = sorted(m for m, d in dependencies.items() if not d - set(order))
+        # an import cycle, reload the rest in any order
+        ready = ready or sorted(dependencies)
+        for m in ready:
+            order.append(m)
+            dependencies.pop(m)
+
+    return order
+
+
+class ToolWatcher:
+    def __init__(self, tool_id: str, engine: str, poll_interval: float = POLL_INTERVAL):
+        self.tool_id = tool_id
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.tool = get_one_tool(tool_id)
+        if not self.tool:
+            raise Exception(f"Tool {tool_id} not found")
+        self.modules: Set[str] = set()
+        self.fingerprints: Dict[str, list] = {}
+        self.keys: Dict[str, str] = {}
+        self._update(self.tool)
+
+    @staticmethod
+    def _fingerprint(modname: str) -> Optional[list]:
+        try:
+            st = os.stat(sys.modules[modname].__file__)
+            return [st.st_mtime_ns, st.st_size]
+        except (KeyError, OSError):
+            return None
+
+    def _update(self, tool):
+        self.tool = tool
+        self.modules = get_source_modules(tool)
+        self.fingerprints = {m: self._fingerprint(m) for m in self.modules}
+        Logger.debug(f"Watching: {', '.join(sorted(self.modules))}")
+
+    def get_test_case_keys(self, tool) -> Dict[str, str]:
+        """
+        {test case: the key of its definition}, or None if it couldn't be worked
+        out (then the test case is always rerun)
+        """
+        keys = {}
+        for tc in tool.tests() or []:
+            try:
+                keys[tc.name] = compute_test_case_key(
+                    tool, tc, self.engine, containers={}
+                )
+            except Exception as e:
+                Logger.warn(f"Couldn't work out if '{tc.name}' changed: {repr(e)}")
+                keys[tc.name] = None
+        return keys
+
+    def changed_modules(self) -> Set[str]:
+        return {m for m in self.modules if self._fingerprint(m) != self.fingerprints[m]}
+
+    def reload(self, changed: Set[str]) -> List[str]:
+        """
+        Reload the changed modules (and those that import from them), and build
+        the tool again
+
+        :return: the test cases whose definition changed
+        """
+        order = get_reload_order(changed, self.modules)
+        Logger.info(f"Reloading {', '.join(order)}")
+        # don't pick up these changes again, even if they don't import
+        self.fingerprints.update({m: self._fingerprint(m) for m in changed})
+
+        for modname in order:
+            importlib.reload(sys.modules[modname])
+        get_shed_snapshot().forget_modules(order)
+
+        tool = get_one_tool(self.tool_id)
+        if not tool:
+            raise Exception(f"Tool {self.tool_id} not found after reloading")
+        self._update(tool)
+
+        keys = self.get_test_case_keys(tool)
+        changed_test_cases = [
+            tc for tc, key in keys.items() if key is None or self.keys.get(tc) != key
+        ]
+        self.keys = keys
+        return changed_test_cases
+
+    def watch(self, run: Callable[[List[str]], None]):
+        """
+        Run every test case, then run(test cases) each time their definitions
+        change, until interrupted
+        """
+        self.keys = self.get_test_case_keys(self.tool)
+        run(list(self.keys))
+
+        Logger.info(
+            f"Watching {len(self.modules)} modules of {self.tool_id} for changes "
+            f"(Ctrl+C to stop)"
+        )
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                changed = self.changed_modules()
+                if not changed:
+                    continue
+
+                try:
+                    test_cases = self.reload(changed)
+                except Exception as e:
+                    # eg: a syntax error while the module is being edited
+                    Logger.critical(f"Couldn't reload {self.tool_id}: {repr(e)}")
+                    continue
+
+                if not test_cases:
+                    Logger.info(
+                        "No test case's definition changed, not running any tests"
+                    )
+                    continue
+                run(test_cases)
+                Logger.info(f"Watching {self.tool_id} for changes")
+        except KeyboardInterrupt:
+            Logger.info("Stopped watching")
@@ -0,0 +1,471 @@
+"""
+A work queue of (tool, test case) jobs on a shared filesystem, so the test
+matrix can be run by `run-test --worker` processes on many nodes, without a
+broker. The queue is a directory laid out as:
+
+    pending/<priority>-<attempt>-<job>.json     jobs waiting for a worker
+    running/<worker>/<...>.json                 jobs a worker has claimed
+    workers/<worker>                            heartbeat, touched while it's alive
+    results/<job>.json                          the result of each finished job
+    abandoned/<...>.json                        jobs whose workers kept dying
+    tmp/                                        results being written
+
+A worker claims a job by renaming it from pending/ into its running/ dir: a
+rename is atomic (on NFS too), so only one worker gets each job. Workers claim
+one job at a time (in priority order, longest first) as they have room for it,
+so a fast worker takes more of the jobs, and all of them stay busy until the
+queue is empty. A worker whose heartbeat is older than dead_after is dead, and
+the jobs it had claimed are renamed back into pending/ by the next worker that
+notices, or abandoned after MAX_ATTEMPTS.
+"""
+
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from janis_core import Logger
+
+from janisdk.runtest.events import MIN_INTERVAL, PathWatcher
+from janisdk.runtest.scheduling import (
+    ResourceScheduler,
+    TestJob,
+    _run_test_case_with_log,
+    failed_result,
+)
+
+HEARTBEAT_INTERVAL = 30
+DEAD_AFTER = 5 * 60
+POLL_INTERVAL = 10
+# how many times a job is run before it's abandoned, when its workers keep dying
+MAX_ATTEMPTS = 3
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.]", "_", value)
+
+
+class QueuedJob:
+    def __init__(self, path: str, priority: int, attempt: int, job: TestJob):
+        self.path = path
+        self.priority = priority
+        self.attempt = attempt
+        self.job = job
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def __repr__(self):
+        return f"QueuedJob<{self.job.tool_id}/{self.job.test_case}>"
+
+
+class WorkQueue:
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        for d in ("pending", "running", "workers", "results", "abandoned", "tmp"):
+            os.makedirs(self._dir(d), exist_ok=True)
+
+    def _dir(self, *components) -> str:
+        return os.path.join(self.path, *components)
+
+    @staticmethod
+    def job_key(tool_id: str, test_case: str) -> str:
+        return f"{_slug(tool_id)}--{_slug(test_case)}"
+
+    @staticmethod
+    def _job_filename(priority: int, attempt: int, key: str) -> str:
+        return f"{priority:06d}-{attempt}-{key}.json"
+
+    @staticmethod
+    def _parse_filename(filename: str) -> Tuple[int, int, str]:
+        priority, attempt, key = filename[: -len(".json")].split("-", 2)
+        return int(priority), int(attempt), key
+
+    @staticmethod
+    def _list(directory: str) -> List[str]:
+        try:
+            return sorted(f for f in os.listdir(directory) if f.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def _write_json(self, path: str, value):
+        tmp_path = self._dir("tmp", f"{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w+") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def _running_files(self) -> List[Tuple[str, str]]:
+        """
+        (worker, filename) of every claimed job
+        """
+        running = []
+        for worker in sorted(os.listdir(self._dir("running"))):
+            running.extend(
+                (worker, f) for f in self._list(self._dir("running", worker))
+            )
+        return running
+
+    # submitting
+
+    def submit(self, jobs: List[TestJob]) -> int:
+        """
+        Add jobs to the end of the queue, in order (the first is claimed first).
+        Jobs that are already pending or running are skipped.
+
+        :return: the number of jobs that were added
+        """
+        queued = self._list(self._dir("pending")) + [
+            f for _, f in self._running_files()
+        ]
+        queued_keys = {self._parse_filename(f)[2] for f in queued}
+        priority = max((self._parse_filename(f)[0] for f in queued), default=-1) + 1
+
+        added = 0
+        for job in jobs:
+            key = self.job_key(job.tool_id, job.test_case)
+            if key in queued_keys:
+                continue
+            queued_keys.add(key)
+            # a job that's submitted again is run again
+            try:
+                os.remove(self._dir("results", f"{key}.json"))
+            except FileNotFoundError:
+                pass
+            self._write_json(
+                self._dir("pending", self._job_filename(priority, 0, key)),
+                {
+                    "tool_id": job.tool_id,
+                    "test_case": job.test_case,
+                    "cpus": job.cpus,
+                    "memory": job.memory,
+                    "expected_duration": job.expected_duration,
+                },
+            )
+            priority += 1
+            added += 1
+
+        return added
+
+    # workers
+
+    def heartbeat_path(self, worker_id: str) -> str:
+        return self._dir("workers", worker_id)
+
+    def register(self, worker_id: str) -> float:
+        """
+        (Re)register a worker, in case it was thought dead and its jobs reclaimed
+
+        :return: the time on the shared filesystem, see heartbeat
+        """
+        # the heartbeat first, so the running dir is never without one
+        now = self.heartbeat(worker_id)
+        os.makedirs(self._dir("running", worker_id), exist_ok=True)
+        return now
+
+    def heartbeat(self, worker_id: str) -> float:
+        """
+        Touch the worker's heartbeat
+
+        :return: the time on the shared filesystem, so heartbeats from workers on
+            other nodes (with other clocks) can be compared with it
+        """
+        path = self.heartbeat_path(worker_id)
+        with open(path, "a"):
+            pass
+        os.utime(path)
+        return os.stat(path).st_mtime
+
+    def unregister(self, worker_id: str):
+        for path in (self._dir("running", worker_id), self.heartbeat_path(worker_id)):
+            try:
+                if os.path.isdir(path):
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+            except OSError as e:
+                Logger.debug(f"Couldn't remove '{path}': {e}")
+
+    def claim(self, worker_id: str) -> Optional[QueuedJob]:
+        """
+        Claim the next pending job, or None if there are none left
+        """
+        for filename in self._list(self._dir("pending")):
+            source = self._dir("pending", filename)
+            dest = self._dir("running", worker_id, filename)
+            try:
+                os.rename(source, dest)
+            except FileNotFoundError:
+                # another worker claimed it first, unless this is NFS retrying
+                # a rename that did succeed
+                if not os.path.exists(dest):
+                    continue
+            return self._read_job(dest)
+
+        return None
+
+    def _read_job(self, path: str) -> QueuedJob:
+        priority, attempt, _ = self._parse_filename(os.path.basename(path))
+        with open(path) as f:
+            job = TestJob(**json.load(f))
+        return QueuedJob(path, priority=priority, attempt=attempt, job=job)
+
+    def release(self, queued: QueuedJob):
+        """
+        Put a claimed job back, for another worker (or later)
+        """
+        os.rename(queued.path, self._dir("pending", queued.name))
+
+    def complete(self, queued: QueuedJob, result: Dict[str, Any], worker_id: str):
+        job = queued.job
+        self._write_json(
+            self._dir("results", f"{self.job_key(job.tool_id, job.test_case)}.json"),
+            {
+                "tool_id": job.tool_id,
+                "test_case": job.test_case,
+                "worker": worker_id,
+                "attempt": queued.attempt,
+                "result": result,
+            },
+        )
+        try:
+            os.remove(queued.path)
+        except FileNotFoundError:
+            # we were thought dead, and the job was reclaimed
+            Logger.debug(f"{queued} was reclaimed from {worker_id} before it finished")
+
+    def reclaim(self, worker_id: str, now: float, dead_after: float = DEAD_AFTER):
+        """
+        Put the jobs of workers whose heartbeat is older than dead_after back
+        into the queue.
+
+        :param now: the time on the shared filesystem (from heartbeat)
+        """
+        for worker in os.listdir(self._dir("running")):
+            if worker == worker_id:
+                continue
+            try:
+                last_seen = os.stat(self.heartbeat_path(worker)).st_mtime
+            except FileNotFoundError:
+                try:
+                    last_seen = os.stat(self._dir("running", worker)).st_mtime
+                except FileNotFoundError:
+                    continue
+            if now - last_seen <= dead_after:
+                continue
+
+            for filename in self._list(self._dir("running", worker)):
+                priority, attempt, key = self._parse_filename(filename)
+                source = self._dir("running", worker, filename)
+                if attempt + 1 >= MAX_ATTEMPTS:
+                    dest = self._dir("abandoned", filename)
+                    message = (
+                        f"Abandoning {key}, as {attempt + 1} workers died running it"
+                    )
+                else:
+                    dest = self._dir(
+                        "pending", self._job_filename(priority, attempt + 1, key)
+                    )
+                    message = f"Reclaimed {key} from the dead worker {worker}"
+                try:
+                    os.rename(source, dest)
+                    Logger.warn(message)
+                except FileNotFoundError:
+                    # another worker reclaimed it first
+                    continue
+
+            self.unregister(worker)
+
+    # progress
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._list(self._dir("pending"))),
+            "running": len(self._running_files()),
+            "done": len(self._list(self._dir("results"))),
+            "abandoned": len(self._list(self._dir("abandoned"))),
+        }
+
+    def is_finished(self) -> bool:
+        return not self._list(self._dir("pending")) and not self._running_files()
+
+    def results(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        (tool, test case, result) of every finished (or abandoned) job
+        """
+        results = []
+        for filename in self._list(self._dir("results")):
+            try:
+                with open(self._dir("results", filename)) as f:
+                    r = json.load(f)
+                results.append((r["tool_id"], r["test_case"], r["result"]))
+            except (OSError, ValueError, KeyError) as e:
+                Logger.warn(f"Couldn't read the result '{filename}': {e}")
+
+        for filename in self._list(self._dir("abandoned")):
+            job = self._read_job(self._dir("abandoned", filename)).job
+            results.append(
+                (
+                    job.tool_id,
+                    job.test_case,
+                    failed_result(
+                        f"Abandoned after {MAX_ATTEMPTS} workers died running it"
+                    ),
+                )
+            )
+
+        return results
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class QueueWorker:
+    """
+    Claims and runs the jobs of a WorkQueue (with the scheduler's pool, and
+    cpu / memory reservations) until the queue is finished.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        scheduler: ResourceScheduler,
+        worker_id: Optional[str] = None,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        dead_after: float = DEAD_AFTER,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.scheduler = scheduler
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_interval = heartbeat_interval
+        self.dead_after = dead_after
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def _beat(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except OSError as e:
+                Logger.warn(f"Couldn't update the heartbeat of {self.worker_id}: {e}")
+
+    def run(self, **kwargs) -> Iterator[Tuple[TestJob, Dict[str, Any]]]:
+        """
+        Run claimed jobs (with run_test_case(**kwargs)), yielding (job, result) in
+        the order they complete.
+        """
+        heartbeat = threading.Thread(target=self._beat, daemon=True)
+        heartbeat.start()
+        Logger.info(f"Worker {self.worker_id} is taking jobs from {self.queue.path}")
+
+        scheduler = self.scheduler
+        running = {}
+        free_cpus, free_memory = scheduler.cpus, scheduler.memory
+        # a job was released for not fitting, don't claim another until one
+        # finishes (releasing it wakes the worker)
+        full = False
+        try:
+            # wakes an idle worker when a job is queued (or requeued), or the
+            # last result is in
+            queue_changes = PathWatcher(
+                [self.queue._dir("pending"), self.queue._dir("results")],
+                min_interval=min(MIN_INTERVAL, self.poll_interval),
+                max_interval=self.poll_interval,
+            )
+            with ProcessPoolExecutor(
+                max_workers=scheduler.max_jobs
+            ) as executor, queue_changes:
+                while True:
+                    now = self.queue.register(self.worker_id)
+                    self.queue.reclaim(self.worker_id, now, dead_after=self.dead_after)
+
+                    while not full and len(running) < scheduler.max_jobs:
+                        queued = self.queue.claim(self.worker_id)
+                        if queued is None:
+                            break
+                        cpus, memory = scheduler._reservation(queued.job)
+                        if running and (
+                            cpus > free_cpus
+                            or (memory is not None and memory > free_memory)
+                        ):
+                            # doesn't fit until something finishes, leave it for
+                            # a worker with room
+                            self.queue.release(queued)
+                            full = True
+                            break
+
+                        free_cpus -= cpus
+                        if memory is not None:
+                            free_memory -= memory
+
+                        job = queued.job
+                        log_path = scheduler.job_log_path(job)
+                        Logger.info(f"Starting {job} (log: {log_path})")
+                        future = executor.submit(
+                            _run_test_case_with_log,
+                            log_path,
+                            {
+                                "tool_id": job.tool_id,
+                                "test_case": job.test_case,
+                                "output_dir": scheduler.job_output_dir(job),
+                                **kwargs,
+                            },
+                        )
+                        # wake the worker when it finishes
+                        future.add_done_callback(lambda _: queue_changes.wake())
+                        running[future] = (queued, time.time())
+
+                    if not running:
+                        if self.queue.is_finished():
+                            break
+                        # the other workers are still running the last jobs,
+                        # wait in case one of them dies
+                        queue_changes.wait()
+                        continue
+
+                    # until a job finishes, or (with room for more) is queued
+                    done = [f for f in running if f.done()]
+                    if not done:
+                        queue_changes.wait()
+                        done = [f for f in running if f.done()]
+                    if done:
+                        full = False
+                    for future in done:
+                        queued, start = running.pop(future)
+                        cpus, memory = scheduler._reservation(queued.job)
+                        free_cpus += cpus
+                        if memory is not None:
+                            free_memory += memory
+
+                        ran = True
+                        try:
+                            result = future.result()
+                            # a cached result took no time to run
+                            ran = not result.get("cached")
+                        except Exception as e:
+                            result = failed_result(
+                                f"Test case worker failed: {repr(e)}"
+                            )
+                            ran = False
+
+                        if scheduler.history and ran:
+                            job = queued.job
+                            duration = time.time() - start
+                            scheduler.history.record(
+                                job.tool_id, job.test_case, duration
+                            )
+                            scheduler.history.write()
+
+                        self.queue.complete(queued, result, worker_id=self.worker_id)
+                        yield queued.job, result
+        finally:
+            self._stopped.set()
+            heartbeat.join()
+            self.queue.unregister(self.worker_id)
@@ -0,0 +1,112 @@
+"""
+A warm janisdk server, so short janisdk calls (container, fromcwl, fromwdl,
+run-test dispatch) don't each pay for importing janis_core and hydrating the shed.
+
+`janisdk serve` imports everything and hydrates the shed once, then listens on a
+Unix domain socket. When a server is running, `janisdk <cmd>` forwards its argv
+(as a JSON request) and its stdin / stdout / stderr (as file descriptors) to the
+server, which forks a child (with everything already imported) to run the
+command and sends back the exit code.
+
+Only the stdlib is imported here, so the client stays cheap.
+"""
+
+import array
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import List, Optional
+
+# Don't forward to a running server (eg: to debug the command)
+ENV_NO_SERVER = "JANISDK_NO_SERVER"
+# Override the path of the socket
+ENV_SOCKET = "JANISDK_SOCKET"
+
+STOP_COMMAND = "__stop__"
+
+
+def get_socket_path() -> str:
+    # The path of a unix socket is limited to ~100 characters, so this isn't in
+    # the janis cache dir (which could be on a long NFS path)
+    return os.getenv(ENV_SOCKET) or os.path.join(
+        tempfile.gettempdir(), f"janisdk-{os.getuid()}.sock"
+    )
+
+
+def add_serve_args(parser):
+    parser.description = (
+        "Start a long-lived janisdk server that keeps janis (and the hydrated shed) "
+        "in memory. While it's running, janisdk commands are forwarded to it."
+    )
+
+    parser.add_argument(
+        "--socket", help=f"Path to the unix socket, (default: {get_socket_path()})"
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="Stop the server that's running"
+    )
+
+    return parser
+
+
+def do_serve(args):
+    socket_path = args.socket or get_socket_path()
+
+    if args.stop:
+        rc = send_request(socket_path, [STOP_COMMAND])
+        if rc is None:
+            print(f"No janisdk server is running on '{socket_path}'", file=sys.stderr)
+            return 1
+        return rc
+
+    from janisdk.server.server import JanisdkServer
+
+    JanisdkServer(socket_path).serve()
+
+
+def send_request(socket_path: str, argv: List[str]) -> Optional[int]:
+    """
+    Forward argv (and this process' stdin / stdout / stderr) to the server.
+
+    :return: the exit code of the command, or None if no server is running
+    """
+    if not os.path.exists(socket_path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        # stale socket from a server that didn't shutdown cleanly
+        sock.close()
+        return None
+
+    request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+
+    for stream in (sys.stdout, sys.stderr):
+        stream.flush()
+
+    with sock:
+        fds = array.array("i", [0, 1, 2])
+        sock.sendmsg(
+            [json.dumps(request).encode() + b"\n"],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)],
+        )
+        response = sock.makefile("rb").readline()
+
+    if not response:
+        return 1
+    return json.loads(response.decode()).get("exit", 1)
+
+
+def forward_to_server(argv: List[str]) -> Optional[int]:
+    """
+    Run argv on the janisdk server if there's one running.
+
+    :return: the exit code, or None if the command should be run locally
+    """
+    if os.getenv(ENV_NO_SERVER):
+        return None
+    return send_request(get_socket_path(), argv)
@@ -0,0 +1,247 @@
+import array
+import importlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+
+from janis_core import Logger
+
+from janisdk.runtest.events import PathWatcher
+from janisdk.server import STOP_COMMAND
+
+# refresh the shed at least this often (seconds), in case a change wasn't seen
+# (eg: made from another node of a shared filesystem)
+REFRESH_INTERVAL = 60
+
+
+class _ForkingUnixStreamServer(
+    socketserver.ForkingMixIn, socketserver.UnixStreamServer
+):
+    def __init__(self, socket_path, handler, before_fork=None):
+        super().__init__(socket_path, handler)
+        self.before_fork = before_fork
+
+    def process_request(self, request, client_address):
+        if self.before_fork:
+            self.before_fork()
+        super().process_request(request, client_address)
+
+
+class SnapshotRefresher:
+    """
+    Refreshes the shed snapshot before a request when a module of the shed has
+    changed (or REFRESH_INTERVAL has passed), rather than checking every module
+    of the shed for every request.
+    """
+
+    def __init__(self, snapshot, refresh_interval: float = REFRESH_INTERVAL):
+        self.snapshot = snapshot
+        self.refresh_interval = refresh_interval
+        self._last_refresh = time.time()
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._watcher = PathWatcher(snapshot.directories())
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stopped.is_set():
+            try:
+                if self._watcher.wait():
+                    self._changed.set()
+            except (OSError, ValueError):
+                # closed while waiting
+                return
+
+    def maybe_refresh(self):
+        if (
+            not self._changed.is_set()
+            and time.time() - self._last_refresh < self.refresh_interval
+        ):
+            return
+        # a change while refreshing is picked up by the next request
+        self._changed.clear()
+        self._last_refresh = time.time()
+        self.snapshot.refresh()
+        # eg: a new package
+        self._watcher.paths = self.snapshot.directories()
+
+    def close(self):
+        self._stopped.set()
+        self._watcher.wake()
+        self._thread.join()
+        self._watcher.close()
+
+
+class JanisdkServer:
+    """
+    Keeps janis (janis_core, janis_assistant, the extensions) imported and the
+    shed hydrated, and forks a child for each request so commands are isolated
+    from each other but start warm.
+    """
+
+    # the modules the subcommands need
+    PRELOAD_MODULES = [
+        "janis_core.translations",
+        "janis_assistant.management.configuration",
+        "janisdk.runtest.runner",
+        "janisdk.container.parse_help",
+    ]
+
+    # max size of the JSON request (argv, cwd, env)
+    MAX_REQUEST_SIZE = 1024 * 1024
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.snapshot = None
+
+    def warm_up(self):
+        from janis.extensions import ExtensionLoader
+        from janis_core.toolbox.entrypoints import TOOLS, DATATYPES
+        from janisdk.shed.hydrationcache import get_shed_snapshot
+
+        for module in self.PRELOAD_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                Logger.warn(f"Couldn't preload '{module}' for the janisdk server: {e}")
+
+        for group in [DATATYPES, TOOLS]:
+            loader = ExtensionLoader(group, "extension")
+            for entrypoint in loader.entrypoints():
+                loader.load(entrypoint)
+
+        self.snapshot = get_shed_snapshot()
+
+    def serve(self):
+        Logger.info("Starting janisdk server, importing janis and hydrating the shed")
+        self.warm_up()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        # refresh the snapshot in the parent, so only the modules that have
+        # changed since are re-imported, and the children share the result
+        refresher = SnapshotRefresher(self.snapshot)
+
+        # Anyone who can connect can run commands as us, so only we can connect
+        previous_umask = os.umask(0o177)
+        try:
+            server = _ForkingUnixStreamServer(
+                self.socket_path,
+                self._make_handler(),
+                before_fork=refresher.maybe_refresh,
+            )
+        except Exception:
+            refresher.close()
+            raise
+        finally:
+            os.umask(previous_umask)
+
+        def stop(signum, frame):
+            raise KeyboardInterrupt()
+
+        signal.signal(signal.SIGTERM, stop)
+
+        Logger.info(f"janisdk server listening on '{self.socket_path}'")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            Logger.info("Stopping janisdk server")
+        finally:
+            server.server_close()
+            refresher.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _make_handler(self):
+        janisdk_server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                janisdk_server.handle_request(self.request)
+
+        return Handler
+
+    @staticmethod
+    def _check_peer(sock: socket.socket) -> bool:
+        if not hasattr(socket, "SO_PEERCRED"):
+            # the socket is only accessible by us anyway (umask)
+            return True
+        creds = sock.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def handle_request(self, sock: socket.socket):
+        """
+        Runs in the forked child: receive the request (and the client's stdin,
+        stdout, stderr), run the command, and send back the exit code.
+        """
+        if not self._check_peer(sock):
+            Logger.warn("Refusing janisdk request from a different user")
+            return
+
+        fds = array.array("i")
+        data, ancdata, _, _ = sock.recvmsg(
+            self.MAX_REQUEST_SIZE, socket.CMSG_LEN(3 * fds.itemsize)
+        )
+        for level, kind, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(
+                    cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)]
+                )
+
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(self.MAX_REQUEST_SIZE)
+            if not chunk:
+                break
+            data += chunk
+
+        request = json.loads(data.decode())
+        argv = request.get("argv", [])
+
+        if argv == [STOP_COMMAND]:
+            os.kill(os.getppid(), signal.SIGTERM)
+            return sock.sendall(json.dumps({"exit": 0}).encode() + b"\n")
+
+        rc = self.run_command(argv, request, list(fds))
+        sock.sendall(json.dumps({"exit": rc}).encode() + b"\n")
+
+    def run_command(self, argv, request: dict, fds: list) -> int:
+        from janisdk.main import run_command
+
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        for target, fd in zip((0, 1, 2), fds):
+            os.dup2(fd, target)
+            os.close(fd)
+
+        os.environ.clear()
+        os.environ.update(request.get("env", {}))
+        os.chdir(request.get("cwd", os.getcwd()))
+        sys.argv = ["janisdk", *argv]
+
+        rc = 0
+        try:
+            result = run_command(argv)
+            if isinstance(result, int):
+                rc = result
+        except SystemExit as e:
+            rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            rc = 1
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                stream.flush()
+
+        return rc
@@ -0,0 +1,155 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from janisdk import server as client
+from janisdk.server.server import (
+    JanisdkServer,
+    SnapshotRefresher,
+    _ForkingUnixStreamServer,
+)
+
+
+def mock_run_command(argv):
+    """
+    Runs in the server's forked child, with the client's stdin / stdout / stderr
+    """
+    os.write(1, f"{' '.join(argv)} in {os.getcwd()}\n".encode())
+    os.write(2, f"{os.environ.get('JANISDK_TEST_VALUE')}\n".encode())
+    return int(argv[-1])
+
+
+class MockSnapshot:
+    def __init__(self, directory):
+        self.directory = directory
+        self.refreshes = 0
+
+    def directories(self):
+        return [self.directory]
+
+    def refresh(self):
+        self.refreshes += 1
+        return self
+
+
+class TestJanisdkServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.socket_path = os.path.join(self.tmpdir.name, "janisdk.sock")
+
+    def start_server(self, before_fork=None):
+        server = _ForkingUnixStreamServer(
+            self.socket_path,
+            JanisdkServer(self.socket_path)._make_handler(),
+            before_fork=before_fork,
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+
+    def send_request(self, argv):
+        """
+        :return: exit code, and what the command wrote to stdout and stderr
+        """
+        outputs = [os.path.join(self.tmpdir.name, n) for n in ("stdout", "stderr")]
+        saved_fds = [os.dup(1), os.dup(2)]
+        try:
+            for path, fd in zip(outputs, (1, 2)):
+                with open(path, "w+") as f:
+                    os.dup2(f.fileno(), fd)
+            rc = client.send_request(self.socket_path, argv)
+        finally:
+            for saved, fd in zip(saved_fds, (1, 2)):
+                os.dup2(saved, fd)
+                os.close(saved)
+
+        contents = []
+        for path in outputs:
+            with open(path) as f:
+                contents.append(f.read())
+        return (rc, *contents)
+
+    def test_round_trip(self):
+        before_fork = mock.Mock()
+        self.start_server(before_fork=before_fork)
+
+        with mock.patch("janisdk.main.run_command", mock_run_command), mock.patch.dict(
+            os.environ, {"JANISDK_TEST_VALUE": "forwarded"}
+        ):
+            # the command runs in the client's cwd and environment, and writes
+            # to the client's stdout / stderr (the file descriptors were passed)
+            rc, stdout, stderr = self.send_request(["container", "3"])
+
+        self.assertEqual(3, rc)
+        self.assertEqual(f"container 3 in {os.getcwd()}\n", stdout)
+        self.assertEqual("forwarded\n", stderr)
+        before_fork.assert_called_once()
+
+    def test_no_server(self):
+        self.assertIsNone(client.send_request(self.socket_path, ["version"]))
+
+        # a stale socket, from a server that didn't shut down cleanly
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        self.assertIsNone(client.send_request(self.socket_path, ["version"]))
+
+    def test_forward_to_server(self):
+        with mock.patch.object(client, "send_request", return_value=0) as send:
+            with mock.patch.dict(os.environ, {client.ENV_SOCKET: self.socket_path}):
+                self.assertEqual(0, client.forward_to_server(["version"]))
+            send.assert_called_once_with(self.socket_path, ["version"])
+
+            # or run locally
+            with mock.patch.dict(os.environ, {client.ENV_NO_SERVER: "1"}):
+                self.assertIsNone(client.forward_to_server(["version"]))
+            send.assert_called_once()
+
+    def test_check_peer(self):
+        a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        with a, b:
+            self.assertTrue(JanisdkServer._check_peer(a))
+
+
+class TestSnapshotRefresher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.snapshot = MockSnapshot(self.tmpdir.name)
+
+    def test_refreshes_when_a_module_changes(self):
+        refresher = SnapshotRefresher(self.snapshot, refresh_interval=60)
+        self.addCleanup(refresher.close)
+
+        refresher.maybe_refresh()
+        self.assertEqual(0, self.snapshot.refreshes)
+
+        with open(os.path.join(self.tmpdir.name, "tools.py"), "w+") as f:
+            f.write("x = 1\n")
+        for _ in range(100):
+            if refresher._changed.is_set():
+                break
+            time.sleep(0.05)
+
+        refresher.maybe_refresh()
+        refresher.maybe_refresh()
+        self.assertEqual(1, self.snapshot.refreshes)
+
+    def test_refreshes_after_the_interval(self):
+        refresher = SnapshotRefresher(self.snapshot, refresh_interval=0.1)
+        self.addCleanup(refresher.close)
+        time.sleep(0.2)
+        refresher.maybe_refresh()
+        refresher.maybe_refresh()
+        self.assertEqual(1, self.snapshot.refreshes)
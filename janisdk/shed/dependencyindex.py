@@ -0,0 +1,255 @@
+"""
+A reverse dependency index of the shed, to find the tools a change affects.
+
+For every tool (each version) in the shed, the index records:
+
+    - the modules it's built from: the modules of its class and base classes
+      (and of the steps of a workflow that aren't tools of the shed)
+    - the data types of its inputs and outputs, and the modules of their
+      classes and base classes
+    - the tools of the shed it uses, for a workflow
+    - the local files its test cases point at (inputs and expected outputs)
+
+and the shed modules each module imports from (eg: a helper or constants; the
+data types and tools it imports are tracked per tool above, and a package
+doesn't depend on what it re-exports). So a change to a module affects the
+tools built from it and from every module that (transitively) imports it, and
+a change to a tool affects every workflow that (transitively) uses it.
+"""
+
+import ast
+import os
+import sys
+from inspect import isclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from janis_core import Array, Logger
+
+from janisdk.shed.registry import ToolRegistry
+
+# (lowercase id, lowercase version)
+ToolKey = Tuple[str, str]
+
+
+def tool_key(tool) -> ToolKey:
+    return tool.id().lower(), (tool.version() or "").lower()
+
+
+def _local_paths(value) -> Iterable[str]:
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _local_paths(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _local_paths(v)
+    elif isinstance(value, str) and os.path.isabs(value) and os.path.exists(value):
+        yield os.path.realpath(value)
+
+
+def _is_indexed(value) -> bool:
+    """
+    Whether the index already tracks which tools use value (a data type, or a
+    tool), so importing it doesn't make a module depend on it
+    """
+    from janis_core import DataType, Tool
+
+    return isclass(value) and issubclass(value, (DataType, Tool))
+
+
+def _get_imported_modules(tree: ast.Module, modname: str) -> Set[str]:
+    package = modname.rpartition(".")[0]
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".")
+                parent = ".".join(parts[: len(parts) - node.level + 1])
+                base = f"{parent}.{base}" if base else parent
+            for alias in node.names:
+                submodule = f"{base}.{alias.name}"
+                if submodule in sys.modules:
+                    imported.add(submodule)
+                elif not _is_indexed(getattr(sys.modules.get(base), alias.name, None)):
+                    imported.add(base)
+    return imported
+
+
+class DependencyIndex:
+    def __init__(self, roots: List[str]):
+        """
+        :param roots: the packages of the shed (eg: janis_bioinformatics), only
+            their modules are indexed
+        """
+        self.roots = {r.split(".")[0] for r in roots}
+        self.tool_modules: Dict[ToolKey, Set[str]] = {}
+        self.tool_datatypes: Dict[ToolKey, Set[str]] = {}
+        self.datatype_modules: Dict[str, str] = {}
+        self.sub_tools: Dict[ToolKey, Set[ToolKey]] = {}
+        self.test_files: Dict[ToolKey, Set[str]] = {}
+        # module -> the shed modules it imports from
+        self.imports: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def build(
+        registry: Optional[ToolRegistry] = None, roots: Optional[List[str]] = None
+    ) -> "DependencyIndex":
+        """
+        Index every tool (version) of the registry, by default the shed's
+
+        :param roots: the packages of the registry's tools, by default the ones
+            the shed is hydrated from
+        """
+        from janisdk.shed.hydrationcache import get_shed_snapshot
+
+        registry = registry or ToolRegistry.from_snapshot()
+        index = DependencyIndex(roots or get_shed_snapshot().modules)
+        registered = {(e.id.lower(), e.version.lower()) for e in registry}
+        for entry in registry:
+            try:
+                index.add_tool(entry.tool(), module=entry.module, registered=registered)
+            except Exception as e:
+                Logger.warn(
+                    f"Couldn't index the dependencies of '{entry.versioned_id()}': "
+                    f"{repr(e)}"
+                )
+            finally:
+                entry.release()
+
+        index.add_imports()
+        return index
+
+    def in_shed(self, modname: Optional[str]) -> bool:
+        return bool(modname) and modname.split(".")[0] in self.roots
+
+    def _add_built_from(self, key: ToolKey, tool, registered: Optional[Set[ToolKey]]):
+        """
+        Add the modules and data types of tool (and of the steps of a workflow
+        that aren't registered tools) to key
+        """
+        modules = self.tool_modules.setdefault(key, set())
+        datatypes = self.tool_datatypes.setdefault(key, set())
+        modules.update(c.__module__ for c in type(tool).__mro__)
+
+        types = [i.intype for i in tool.tool_inputs()] + [
+            o.outtype for o in tool.tool_outputs()
+        ]
+        for datatype in types:
+            if isinstance(datatype, Array):
+                datatype = datatype.fundamental_type()
+            name = datatype.name()
+            datatypes.add(name)
+            self.datatype_modules[name] = type(datatype).__module__
+            # a change to a base data type (eg: FileTabix) affects its subclasses
+            modules.update(c.__module__ for c in type(datatype).__mro__)
+
+        for step in (getattr(tool, "step_nodes", None) or {}).values():
+            step_key = tool_key(step.tool)
+            if registered is None or step_key in registered:
+                self.sub_tools.setdefault(key, set()).add(step_key)
+            else:
+                # eg: a CommandToolBuilder defined in the workflow's module
+                self._add_built_from(key, step.tool, registered)
+
+    def add_tool(
+        self,
+        tool,
+        module: Optional[str] = None,
+        registered: Optional[Set[ToolKey]] = None,
+    ):
+        """
+        :param module: the module the shed found tool in (a CommandToolBuilder's
+            class is in janis_core)
+        :param registered: the keys of the tools in the shed, by default every
+            sub-tool is taken to be one
+        """
+        key = tool_key(tool)
+        self._add_built_from(key, tool, registered)
+        if module:
+            self.tool_modules[key].add(module)
+        self.tool_modules[key] = {m for m in self.tool_modules[key] if self.in_shed(m)}
+
+        files = set()
+        for tc in tool.tests() or []:
+            files.update(_local_paths(tc.input))
+            for expected in tc.output:
+                files.update(
+                    _local_paths([expected.expected_file, expected.file_diff_source])
+                )
+        if files:
+            self.test_files[key] = files
+
+    def add_imports(self):
+        """
+        Record what each (imported) module of the shed imports from the shed
+        """
+        for modname, module in list(sys.modules.items()):
+            if not self.in_shed(modname) or module is None:
+                continue
+            if hasattr(module, "__path__"):
+                # a package's __init__ re-exports its modules, it doesn't use
+                # them (else a change to one would affect the whole shed)
+                continue
+            path = getattr(module, "__file__", None)
+            if not path or not path.endswith(".py"):
+                continue
+            try:
+                with open(path) as f:
+                    tree = ast.parse(f.read(), filename=path)
+            except (OSError, SyntaxError) as e:
+                Logger.debug(f"Couldn't read the imports of '{modname}': {e}")
+                continue
+            self.imports[modname] = {
+                m
+                for m in _get_imported_modules(tree, modname)
+                if m != modname and self.in_shed(m)
+            }
+
+    # reverse lookups
+
+    def used_by(self) -> Dict[ToolKey, Set[ToolKey]]:
+        """
+        {tool: the workflows that use it directly}
+        """
+        used_by: Dict[ToolKey, Set[ToolKey]] = {}
+        for workflow, tools in self.sub_tools.items():
+            for t in tools:
+                used_by.setdefault(t, set()).add(workflow)
+        return used_by
+
+    def imported_by(self) -> Dict[str, Set[str]]:
+        imported_by: Dict[str, Set[str]] = {}
+        for modname, imported in self.imports.items():
+            for m in imported:
+                imported_by.setdefault(m, set()).add(modname)
+        return imported_by
+
+    def tools_using_datatype(self, name: str) -> Set[ToolKey]:
+        return {k for k, types in self.tool_datatypes.items() if name in types}
+
+    @staticmethod
+    def _closure(start: Set, edges: Dict) -> Set:
+        reached, stack = set(start), list(start)
+        while stack:
+            for n in edges.get(stack.pop(), ()):
+                if n not in reached:
+                    reached.add(n)
+                    stack.append(n)
+        return reached
+
+    def affected_tools(
+        self, changed_modules: Set[str], changed_files: Set[str] = None
+    ) -> Set[ToolKey]:
+        """
+        The tools (and the workflows that use them) that changed_modules, or the
+        test files in changed_files (real paths), affect
+        """
+        modules = self._closure(set(changed_modules), self.imported_by())
+        changed_files = changed_files or set()
+        direct = {k for k, mods in self.tool_modules.items() if mods & modules}
+        direct.update(
+            k for k, files in self.test_files.items() if files & changed_files
+        )
+        return self._closure(direct, self.used_by())
@@ -0,0 +1,466 @@
+"""
+A cache of what `JanisShed.hydrate` discovers.
+
+Hydrating the shed imports every module of every tool extension (janis_unix,
+janis_bioinformatics, ...), and instantiates every tool to get its id and
+version. That's repeated by every process (docs generation, each run-test), so
+the ShedSnapshot records each discovered tool (id, version, module, class name,
+friendly name, tool type) and data type to disk, fingerprinted by the module's file (mtime + size).
+
+A later `hydrate()` only re-imports the modules that have changed since the
+snapshot was taken (or that failed to import), and tools are only imported (and instantiated) when they're
+first requested through `get_tool` / `get_all_tools`.
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+from inspect import isabstract, isclass, ismodule
+from typing import Dict, List, Optional, Union
+
+from janis_core import Logger
+
+from janis.cache import get_cache_dir
+
+
+class ShedSnapshot:
+
+    VERSION = 2
+
+    def __init__(self, modules: Optional[list] = None, path: Optional[str] = None):
+        """
+        :param modules: modules (or module names) to hydrate from, defaults to the
+            modules registered under the janis TOOLS and DATATYPES entrypoints
+        :param path: where the snapshot is kept, defaults to the janis cache dir
+        """
+        self.modules = [
+            m if isinstance(m, str) else m.__name__
+            for m in (modules or self._get_entrypoint_modules())
+        ]
+        if path is None:
+            suffix = hashlib.md5(
+                "|".join(
+                    f"{m}:{self.locate_module(m)}" for m in sorted(self.modules)
+                ).encode()
+            ).hexdigest()
+            path = get_cache_dir("shed", f"snapshot-{suffix}.json")
+        self.path = path
+
+        # module name -> {"fingerprint": [...], "tools": [...], "datatypes": [...]}
+        self._records: Dict[str, dict] = {}
+        self._has_hydrated = False
+
+        # loaded on first use, keyed by (tool id, version) / datatype name
+        self._tools = {}
+        self._datatypes = {}
+
+    # hydration
+
+    def hydrate(self, force=False) -> "ShedSnapshot":
+        """
+        :param force: Ignore the snapshot, and re-import every module
+        """
+        if self._has_hydrated and not force:
+            return self
+
+        previous = {} if force else (self._records or self._read())
+        records, changed = {}, 0
+        # Only modules imported before we started hydrating can be out of date,
+        # anything imported since (eg: as a dependency) is already current.
+        imported_before = set(sys.modules)
+        roots = [m.split(".")[0] for m in self.modules]
+
+        for modname, filepath in self._walk_modules():
+            fingerprint = self._fingerprint(filepath)
+            prev = previous.get(modname)
+            # a module that failed to import is always retried, as what broke it
+            # might not be in the module itself (eg: a missing dependency)
+            if (
+                prev is not None
+                and prev.get("fingerprint") == fingerprint
+                and not prev.get("error")
+            ):
+                records[modname] = prev
+                continue
+
+            changed += 1
+            self._forget_module(modname)
+            records[modname] = {
+                "fingerprint": fingerprint,
+                **self._discover_module(
+                    modname, roots, reload=modname in imported_before
+                ),
+            }
+
+        Logger.log(
+            f"Hydrated shed snapshot from {len(records)} modules ({changed} changed)"
+        )
+
+        self._records = records
+        self._has_hydrated = True
+        if changed or len(records) != len(previous):
+            self._write()
+
+        return self
+
+    def refresh(self) -> "ShedSnapshot":
+        """
+        Re-hydrate, only re-importing the modules that have changed since.
+        """
+        self._has_hydrated = False
+        return self.hydrate()
+
+    def forget_modules(self, modnames: List[str]):
+        """
+        Forget the loaded tools and data types of modules that were reloaded
+        (eg: by run-test --watch), so they're loaded again from the new module
+        """
+        for modname in modnames:
+            self._forget_module(modname)
+
+    def _forget_module(self, modname: str):
+        self._tools = {k: t for k, t in self._tools.items() if t.__module__ != modname}
+        self._datatypes = {
+            k: d for k, d in self._datatypes.items() if d.__module__ != modname
+        }
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path) as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if d.get("version") != self.VERSION:
+            return {}
+        return d.get("modules", {})
+
+    def _write(self):
+        d = {"version": self.VERSION, "modules": self._records}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w+") as f:
+                json.dump(d, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            Logger.warn(f"Couldn't write shed snapshot to '{self.path}': {e}")
+
+    @staticmethod
+    def _get_entrypoint_modules() -> List[str]:
+        import importlib_metadata
+        from janis_core.toolbox.entrypoints import TOOLS, DATATYPES
+
+        eps = importlib_metadata.entry_points()
+        return [ep.value for group in (DATATYPES, TOOLS) for ep in eps.get(group, [])]
+
+    @staticmethod
+    def locate_module(modname: str) -> Optional[str]:
+        """
+        Find the file / package directory of a module WITHOUT importing it (or
+        its parents, as janis_bioinformatics/__init__ imports every tool).
+        """
+        components = modname.split(".")
+        spec = importlib.util.find_spec(components[0])
+        if spec is None or spec.origin is None:
+            return None
+
+        path = os.path.dirname(spec.origin)
+        if not spec.submodule_search_locations:
+            return spec.origin if len(components) == 1 else None
+
+        path = os.path.join(path, *components[1:])
+        if os.path.isdir(path):
+            return path
+        if os.path.isfile(path + ".py"):
+            return path + ".py"
+        return None
+
+    def _walk_modules(self):
+        seen = set()
+        for root_name in self.modules:
+            root_path = self.locate_module(root_name)
+            if root_path is None:
+                Logger.warn(f"Couldn't find module '{root_name}' to hydrate from")
+                continue
+
+            if os.path.isfile(root_path):
+                if root_name not in seen:
+                    seen.add(root_name)
+                    yield root_name, root_path
+                continue
+
+            for dirpath, dirnames, filenames in os.walk(root_path):
+                if "__init__.py" not in filenames:
+                    dirnames[:] = []
+                    continue
+                dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+
+                relative = os.path.relpath(dirpath, root_path)
+                package = root_name
+                if relative != ".":
+                    package += "." + relative.replace(os.sep, ".")
+
+                for filename in sorted(filenames):
+                    if not filename.endswith(".py"):
+                        continue
+                    modname = package
+                    if filename != "__init__.py":
+                        modname += "." + filename[:-3]
+                    if modname in seen:
+                        continue
+                    seen.add(modname)
+                    yield modname, os.path.join(dirpath, filename)
+
+    def directories(self) -> List[str]:
+        """
+        The directories of the modules hydrated from, where a change would need
+        a refresh
+        """
+        return sorted({os.path.dirname(path) for _, path in self._walk_modules()})
+
+    @staticmethod
+    def _fingerprint(filepath: str) -> list:
+        st = os.stat(filepath)
+        return [st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def _discover_module(modname: str, roots: List[str], reload=False) -> dict:
+        from janis_core import (
+            Tool,
+            ToolType,
+            DataType,
+            CommandTool,
+            CodeTool,
+            PythonTool,
+            Workflow,
+            WorkflowBuilder,
+            CommandToolBuilder,
+        )
+
+        ignored_classes = {
+            Tool,
+            Workflow,
+            CommandTool,
+            CodeTool,
+            PythonTool,
+            WorkflowBuilder,
+            CommandToolBuilder,
+        }
+        recognised_types = {ToolType.Workflow, ToolType.CommandTool, ToolType.CodeTool}
+
+        tools, datatypes = [], []
+        try:
+            if reload and modname in sys.modules:
+                # it's changed since it was imported (eg: by a long-lived process)
+                module = importlib.reload(sys.modules[modname])
+            else:
+                module = importlib.import_module(modname)
+        except Exception as e:
+            Logger.warn(f"Couldn't import '{modname}' when hydrating shed: {repr(e)}")
+            return {"tools": tools, "datatypes": datatypes, "error": repr(e)}
+
+        for name, obj in list(module.__dict__.items()):
+            # same as the JanisShed, which still registers _PrivateTools
+            if name.startswith("__"):
+                continue
+            try:
+                if ismodule(obj):
+                    # data types are also found through modules imported from
+                    # outside the shed, eg: `from janis_core import types`
+                    if not any(
+                        obj.__name__ == r or obj.__name__.startswith(r + ".")
+                        for r in roots
+                    ):
+                        ShedSnapshot._discover_external_datatypes(
+                            obj, datatypes, seen_modules=set()
+                        )
+                    continue
+                if isclass(obj):
+                    # only record a class in the module it's declared in, unless
+                    # it's from outside the shed (eg: janis_core's File, String)
+                    declared_in_shed = any(
+                        obj.__module__ == r or obj.__module__.startswith(r + ".")
+                        for r in roots
+                    )
+                    if obj in ignored_classes or (
+                        declared_in_shed and obj.__module__ != modname
+                    ):
+                        continue
+                    if issubclass(obj, DataType):
+                        datatypes.append(
+                            {"name": obj.name(), "module": modname, "attr": name}
+                        )
+                        continue
+                    if not issubclass(obj, Tool) or isabstract(obj):
+                        continue
+                    tool = obj()
+                elif isinstance(obj, Tool):
+                    tool = obj
+                else:
+                    continue
+
+                if tool.type() not in recognised_types or not tool.version():
+                    continue
+
+                tools.append(
+                    {
+                        "id": tool.id(),
+                        "version": tool.version(),
+                        "module": modname,
+                        "attr": name,
+                        "friendly_name": tool.friendly_name(),
+                        "type": tool.type().value,
+                    }
+                )
+            except Exception as e:
+                Logger.warn(f"{repr(e)} for '{modname}.{name}' when hydrating shed")
+
+        return {"tools": tools, "datatypes": datatypes}
+
+    @staticmethod
+    def _discover_external_datatypes(
+        module, datatypes: List[dict], seen_modules: set, current_layer=1
+    ):
+        from janis_core import DataType, JanisShed
+
+        if module.__name__ in seen_modules:
+            return
+        seen_modules.add(module.__name__)
+
+        for k, v in list(module.__dict__.items()):
+            if k.startswith("__"):
+                continue
+            if ismodule(v) and current_layer <= JanisShed.MAX_RECURSION_DEPTH:
+                ShedSnapshot._discover_external_datatypes(
+                    v, datatypes, seen_modules, current_layer + 1
+                )
+            elif isclass(v) and issubclass(v, DataType):
+                try:
+                    name = v.name()
+                except Exception:
+                    # abstract types (eg: DataType) don't have a name
+                    continue
+                datatypes.append({"name": name, "module": module.__name__, "attr": k})
+
+    # getters
+
+    def tool_records(self) -> List[dict]:
+        self.hydrate()
+        seen, records = set(), []
+        for m in self._records.values():
+            for r in m.get("tools", []):
+                key = (r["id"].lower(), r["version"].lower())
+                if key in seen:
+                    continue
+                seen.add(key)
+                records.append(r)
+        return records
+
+    def datatype_records(self) -> List[dict]:
+        self.hydrate()
+        seen, records = set(), []
+        for m in self._records.values():
+            for r in m.get("datatypes", []):
+                if r["name"].lower() in seen:
+                    continue
+                seen.add(r["name"].lower())
+                records.append(r)
+        return records
+
+    def find_tool_record(self, tool: str, version: str = None) -> Optional[dict]:
+        """
+        Find the record for a tool, if no version is provided, this is the latest
+        version (compared the same way the JanisShed's TaggedRegistry does).
+        """
+        candidates = [r for r in self.tool_records() if r["id"].lower() == tool.lower()]
+        if version:
+            candidates = [
+                r for r in candidates if r["version"].lower() == version.lower()
+            ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda r: r["version"].lower())
+
+    @staticmethod
+    def load_record(record: dict):
+        m = importlib.import_module(record["module"])
+        return getattr(m, record["attr"])
+
+    def get_tool(self, tool: str, version: str = None):
+        record = self.find_tool_record(tool, version)
+        if record is None:
+            return None
+
+        key = (record["id"].lower(), record["version"].lower())
+        if key not in self._tools:
+            t = self.load_record(record)
+            self._tools[key] = t() if isclass(t) else t
+        return self._tools[key]
+
+    def get_all_tools(self) -> List[list]:
+        """
+        All the tools (grouped by tool id), in the same shape as JanisShed.get_all_tools
+        """
+        grouped: Dict[str, list] = {}
+        for r in self.tool_records():
+            grouped.setdefault(r["id"].lower(), []).append(
+                self.get_tool(r["id"], r["version"])
+            )
+        return list(grouped.values())
+
+    def get_datatype(self, datatype: str):
+        if datatype.lower() not in self._datatypes:
+            record = next(
+                (
+                    r
+                    for r in self.datatype_records()
+                    if r["name"].lower() == datatype.lower()
+                ),
+                None,
+            )
+            if record is None:
+                return None
+            self._datatypes[datatype.lower()] = self.load_record(record)
+        return self._datatypes[datatype.lower()]
+
+    def get_all_datatypes(self) -> list:
+        return [self.get_datatype(r["name"]) for r in self.datatype_records()]
+
+
+_default_snapshot: Optional[ShedSnapshot] = None
+
+
+def get_shed_snapshot(modules: Optional[list] = None) -> ShedSnapshot:
+    """
+    Get a hydrated snapshot of the shed, the snapshot of the default
+    (entrypoint) modules is shared for the life of the process.
+    """
+    global _default_snapshot
+    if modules:
+        return ShedSnapshot(modules=modules).hydrate()
+
+    if _default_snapshot is None:
+        _default_snapshot = ShedSnapshot().hydrate()
+    return _default_snapshot
+
+
+def get_one_tool(tool_id: Union[str, object], version: Optional[str] = None):
+    """
+    Drop-in for janis_core.tool.test_helpers.get_one_tool, that's backed by the
+    shed snapshot rather than hydrating the whole JanisShed. Falls back to the
+    JanisShed if the snapshot doesn't know about the tool.
+    """
+    from janis_core import Tool
+    from janis_core.tool import test_helpers
+
+    if isinstance(tool_id, Tool):
+        return tool_id
+
+    tool = get_shed_snapshot().get_tool(tool_id, version)
+    if tool is None:
+        tool = test_helpers.get_one_tool(tool_id, version=version)
+    return tool
@@ -0,0 +1,143 @@
+"""
+Lightweight records of the tools in the shed.
+
+`JanisShed.get_all_tools()` instantiates every version of every tool, most of
+which are never used (eg: the docs only need the metadata of the latest version
+for the index pages). A ToolEntry only holds what the shed snapshot recorded
+(id, version, module, friendly name, tool type), and builds the Tool when it's
+dereferenced with `entry.tool()`. Call `entry.release()` (or stream through
+`ToolRegistry.iter_tools()`) to drop the built tool again, so batch consumers can
+walk thousands of tool versions in bounded memory.
+"""
+
+from inspect import isclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from janisdk.shed.hydrationcache import ShedSnapshot, get_shed_snapshot
+
+
+class ToolEntry:
+
+    __slots__ = (
+        "id",
+        "version",
+        "module",
+        "attr",
+        "friendly_name",
+        "tool_type",
+        "_tool",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        version: str,
+        module: str,
+        attr: str,
+        friendly_name: Optional[str] = None,
+        tool_type: Optional[str] = None,
+    ):
+        self.id = id
+        self.version = version
+        self.module = module
+        self.attr = attr
+        self.friendly_name = friendly_name
+        self.tool_type = tool_type
+        self._tool = None
+
+    @staticmethod
+    def from_record(record: dict) -> "ToolEntry":
+        return ToolEntry(
+            id=record["id"],
+            version=record["version"],
+            module=record["module"],
+            attr=record["attr"],
+            friendly_name=record.get("friendly_name"),
+            tool_type=record.get("type"),
+        )
+
+    def versioned_id(self) -> str:
+        return f"{self.id}/{self.version}"
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._tool is not None
+
+    def tool(self):
+        """
+        Build (or return the already built) Tool for this entry.
+        """
+        if self._tool is None:
+            t = ShedSnapshot.load_record({"module": self.module, "attr": self.attr})
+            self._tool = t() if isclass(t) else t
+        return self._tool
+
+    def release(self):
+        """
+        Drop the built Tool, it'll be rebuilt if it's dereferenced again.
+        """
+        self._tool = None
+
+    def __repr__(self):
+        return f"ToolEntry<{self.versioned_id()}>"
+
+
+class ToolRegistry:
+    def __init__(self, entries: List[ToolEntry]):
+        self._entries = entries
+        # (lowercase id, lowercase version) -> index into entries
+        self._index: Dict[Tuple[str, str], int] = {
+            (e.id.lower(), e.version.lower()): i for i, e in enumerate(entries)
+        }
+
+    @staticmethod
+    def from_snapshot(snapshot: Optional[ShedSnapshot] = None) -> "ToolRegistry":
+        snapshot = snapshot or get_shed_snapshot()
+        return ToolRegistry([ToolEntry.from_record(r) for r in snapshot.tool_records()])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[ToolEntry]:
+        return iter(self._entries)
+
+    def get(self, tool_id: str, version: Optional[str] = None) -> Optional[ToolEntry]:
+        """
+        Get the entry for a tool, if no version is provided, this is the latest
+        version (compared the same way the JanisShed's TaggedRegistry does).
+        """
+        if version:
+            i = self._index.get((tool_id.lower(), version.lower()))
+            return self._entries[i] if i is not None else None
+
+        candidates = [k for k in self._index if k[0] == tool_id.lower()]
+        if not candidates:
+            return None
+        return self._entries[self._index[max(candidates, key=lambda k: k[1])]]
+
+    def by_id(self) -> Dict[str, Dict[str, ToolEntry]]:
+        """
+        {tool id: {version: ToolEntry}}, the id is the case of the first version found
+        """
+        grouped: Dict[str, Dict[str, ToolEntry]] = {}
+        ids: Dict[str, str] = {}
+        for e in self._entries:
+            tid = ids.setdefault(e.id.lower(), e.id)
+            grouped.setdefault(tid, {})[e.version] = e
+        return grouped
+
+    def iter_tools(self, release=True) -> Iterator[Tuple[ToolEntry, object]]:
+        """
+        Stream (entry, tool) for every tool version. With release=True, each tool
+        is released once the consumer asks for the next one, so only one tool
+        (that wasn't already loaded) is held at a time.
+        """
+        for e in self._entries:
+            was_loaded = e.is_loaded
+            yield e, e.tool()
+            if release and not was_loaded:
+                e.release()
+
+    def release(self):
+        for e in self._entries:
+            e.release()
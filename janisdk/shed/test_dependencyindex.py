@@ -0,0 +1,191 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from janisdk.runtest.changes import get_changed_files, get_changed_modules
+from janisdk.shed.dependencyindex import DependencyIndex
+from janisdk.shed.hydrationcache import ShedSnapshot
+from janisdk.shed.registry import ToolRegistry
+
+BASE_TYPES = """
+from janis_core import File
+
+
+class DepsBaseFile(File):
+    @staticmethod
+    def name():
+        return "DepsBaseFile"
+"""
+
+DATA_TYPES = """
+from janis_mockdeps.base_types import DepsBaseFile
+
+
+class DepsFile(DepsBaseFile):
+    @staticmethod
+    def name():
+        return "DepsFile"
+"""
+
+HELPERS = """
+DEFAULT_CONTAINER = "ubuntu:latest"
+"""
+
+TOOLS = """
+from janis_core import CommandTool, ToolInput, ToolOutput, String, Stdout
+
+from janis_mockdeps.data_types import DepsFile
+from janis_mockdeps.helpers import DEFAULT_CONTAINER
+
+
+class _MockTool(CommandTool):
+    def base_command(self):
+        return "cat"
+
+    def outputs(self):
+        return [ToolOutput("out", Stdout)]
+
+    def container(self):
+        return "ubuntu:latest"
+
+    def version(self):
+        return "v1"
+
+
+class ReadsFile(_MockTool):
+    def tool(self):
+        return "ReadsFile"
+
+    def inputs(self):
+        return [ToolInput("inp", DepsFile, position=0)]
+
+
+class ReadsString(_MockTool):
+    def tool(self):
+        return "ReadsString"
+
+    def inputs(self):
+        return [ToolInput("inp", String, position=0)]
+
+    def container(self):
+        return DEFAULT_CONTAINER
+"""
+
+WORKFLOWS = """
+from janis_core import WorkflowBuilder
+
+from janis_mockdeps.data_types import DepsFile
+from janis_mockdeps.tools import ReadsFile
+
+UsesFile = WorkflowBuilder("UsesFile", version="v1")
+UsesFile.input("inp", DepsFile)
+UsesFile.step("read", ReadsFile(inp=UsesFile.inp))
+UsesFile.output("out", source=UsesFile.read.out)
+"""
+
+
+class TestDependencyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.package = os.path.join(self.tmpdir.name, "janis_mockdeps")
+        os.makedirs(self.package)
+        for filename, contents in [
+            ("__init__.py", ""),
+            ("base_types.py", BASE_TYPES),
+            ("data_types.py", DATA_TYPES),
+            ("helpers.py", HELPERS),
+            ("tools.py", TOOLS),
+            ("workflows.py", WORKFLOWS),
+        ]:
+            with open(os.path.join(self.package, filename), "w+") as f:
+                f.write(textwrap.dedent(contents))
+
+        sys.path.insert(0, self.tmpdir.name)
+        self.addCleanup(sys.path.remove, self.tmpdir.name)
+        self.addCleanup(self.forget_package)
+
+        snapshot = ShedSnapshot(
+            modules=["janis_mockdeps"],
+            path=os.path.join(self.tmpdir.name, "snapshot.json"),
+        )
+        self.index = DependencyIndex.build(
+            ToolRegistry.from_snapshot(snapshot), roots=["janis_mockdeps"]
+        )
+
+    @staticmethod
+    def forget_package():
+        for m in [m for m in sys.modules if m.split(".")[0] == "janis_mockdeps"]:
+            del sys.modules[m]
+
+    def affected(self, *modules):
+        return {k[0] for k in self.index.affected_tools(set(modules))}
+
+    def test_index(self):
+        self.assertEqual(
+            {("readsfile", "v1")}, self.index.sub_tools[("usesfile", "v1")]
+        )
+        self.assertEqual(
+            {("readsfile", "v1"), ("usesfile", "v1")},
+            self.index.tools_using_datatype("DepsFile"),
+        )
+
+    def test_data_type_affects_its_tools_and_their_workflows(self):
+        self.assertEqual(
+            {"readsfile", "usesfile"}, self.affected("janis_mockdeps.data_types")
+        )
+
+    def test_base_data_type_affects_the_tools_of_its_subclasses(self):
+        self.assertEqual(
+            {"readsfile", "usesfile"}, self.affected("janis_mockdeps.base_types")
+        )
+
+    def test_helper_affects_the_tools_of_modules_that_import_it(self):
+        self.assertEqual(
+            {"readsfile", "readsstring", "usesfile"},
+            self.affected("janis_mockdeps.helpers"),
+        )
+
+    def test_workflow_only_affects_itself(self):
+        self.assertEqual({"usesfile"}, self.affected("janis_mockdeps.workflows"))
+        self.assertEqual(set(), self.affected("janis_mockdeps"))
+
+
+class TestChangedFiles(unittest.TestCase):
+    def git(self, *args):
+        subprocess.run(
+            ["git", *args], cwd=self.repo, check=True, stdout=subprocess.DEVNULL
+        )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.repo = os.path.realpath(self.tmpdir.name)
+        self.git("init", "-q")
+        for filename in ["committed.py", "unchanged.py"]:
+            with open(os.path.join(self.repo, filename), "w+") as f:
+                f.write("x = 1\n")
+        self.git("add", ".")
+        self.git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "1")
+        self.git("tag", "base")
+
+    def test_changed_since(self):
+        with open(os.path.join(self.repo, "committed.py"), "a") as f:
+            f.write("y = 2\n")
+        with open(os.path.join(self.repo, "untracked.py"), "w+") as f:
+            f.write("z = 3\n")
+
+        changed = get_changed_files("base", cwd=self.repo)
+        self.assertEqual(
+            {os.path.join(self.repo, f) for f in ["committed.py", "untracked.py"]},
+            changed,
+        )
+        self.assertEqual(
+            {"janisdk.shed.dependencyindex"},
+            get_changed_modules(
+                {os.path.realpath(sys.modules["janisdk.shed.dependencyindex"].__file__)}
+            ),
+        )
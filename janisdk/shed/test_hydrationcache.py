@@ -0,0 +1,147 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from janisdk.shed.hydrationcache import ShedSnapshot
+
+
+TOOL_MODULE = """
+from janis_core import CommandTool, ToolInput, ToolOutput, String, Stdout
+
+
+class {name}(CommandTool):
+    def tool(self):
+        return "{toolid}"
+
+    def base_command(self):
+        return "echo"
+
+    def inputs(self):
+        return [ToolInput("inp", String(), position=1)]
+
+    def outputs(self):
+        return [ToolOutput("out", Stdout())]
+
+    def container(self):
+        return "ubuntu:latest"
+
+    def version(self):
+        return "{version}"
+"""
+
+TYPE_MODULE = """
+from janis_core import File
+
+
+class MockFile(File):
+    @staticmethod
+    def name():
+        return "MockFile"
+"""
+
+
+class TestShedSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.package = os.path.join(self.tmpdir.name, "janis_mockshed")
+        os.makedirs(self.package)
+        self.write("__init__.py", "")
+        self.write(
+            "echo.py",
+            TOOL_MODULE.format(name="MockEcho", toolid="mockecho", version="v1"),
+        )
+        self.write("types.py", TYPE_MODULE)
+        sys.path.insert(0, self.tmpdir.name)
+
+        self.snapshot_path = os.path.join(self.tmpdir.name, "snapshot.json")
+
+    def tearDown(self):
+        sys.path.remove(self.tmpdir.name)
+        for m in [m for m in sys.modules if m.startswith("janis_mockshed")]:
+            del sys.modules[m]
+        self.tmpdir.cleanup()
+
+    def write(self, filename, contents):
+        with open(os.path.join(self.package, filename), "w+") as f:
+            f.write(contents)
+
+    def snapshot(self):
+        return ShedSnapshot(modules=["janis_mockshed"], path=self.snapshot_path)
+
+    def test_discovers_tools_and_datatypes(self):
+        snapshot = self.snapshot().hydrate()
+        records = snapshot.tool_records()
+        self.assertEqual(1, len(records))
+        self.assertEqual("mockecho", records[0]["id"])
+        self.assertEqual("janis_mockshed.echo", records[0]["module"])
+        self.assertEqual("MockEcho", records[0]["attr"])
+        self.assertIn(
+            "mockfile", [r["name"].lower() for r in snapshot.datatype_records()]
+        )
+
+    def test_only_changed_modules_are_imported(self):
+        self.snapshot().hydrate()
+
+        self.write(
+            "echo.py",
+            TOOL_MODULE.format(name="MockEcho", toolid="mockecho", version="v2.0"),
+        )
+        with mock.patch.object(
+            ShedSnapshot, "_discover_module", wraps=ShedSnapshot._discover_module
+        ) as discover:
+            snapshot = self.snapshot().hydrate()
+            discovered = [c.args[0] for c in discover.call_args_list]
+
+        self.assertListEqual(["janis_mockshed.echo"], discovered)
+        self.assertEqual("v2.0", snapshot.find_tool_record("mockecho")["version"])
+
+    def test_module_that_failed_to_import_is_retried(self):
+        # it needs a module that isn't installed yet (and isn't in the shed)
+        self.write(
+            "cat.py",
+            "import janis_mockdependency\n"
+            + TOOL_MODULE.format(name="MockCat", toolid="mockcat", version="v1"),
+        )
+        self.addCleanup(sys.modules.pop, "janis_mockdependency", None)
+        snapshot = self.snapshot().hydrate()
+        self.assertIsNone(snapshot.find_tool_record("mockcat"))
+
+        with open(os.path.join(self.tmpdir.name, "janis_mockdependency.py"), "w+"):
+            pass
+        importlib.invalidate_caches()
+        snapshot = self.snapshot().hydrate()
+        self.assertEqual("v1", snapshot.find_tool_record("mockcat")["version"])
+
+    def test_only_modules_imported_before_hydrating_are_reloaded(self):
+        # imported as a dependency (of the package) while hydrating
+        self.write("__init__.py", "from janis_mockshed.echo import MockEcho\n")
+        with mock.patch("importlib.reload", wraps=importlib.reload) as reload:
+            self.snapshot().hydrate()
+        reload.assert_not_called()
+        self.assertIs(
+            sys.modules["janis_mockshed"].MockEcho,
+            sys.modules["janis_mockshed.echo"].MockEcho,
+        )
+
+        # imported (eg: by a long-lived process), then changed
+        self.write(
+            "echo.py",
+            TOOL_MODULE.format(name="MockEcho", toolid="mockecho", version="v2.0"),
+        )
+        snapshot = self.snapshot().hydrate()
+        self.assertEqual("v2.0", snapshot.get_tool("mockecho").version())
+
+    def test_tool_is_loaded_on_first_use(self):
+        self.snapshot().hydrate()
+        for m in [m for m in sys.modules if m.startswith("janis_mockshed")]:
+            del sys.modules[m]
+
+        snapshot = self.snapshot().hydrate()
+        self.assertNotIn("janis_mockshed.echo", sys.modules)
+
+        tool = snapshot.get_tool("mockecho")
+        self.assertEqual("v1", tool.version())
+        self.assertIs(tool, snapshot.get_tool("MockEcho", "v1"))
@@ -0,0 +1,130 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from janisdk.shed.hydrationcache import ShedSnapshot
+from janisdk.shed.registry import ToolEntry, ToolRegistry
+
+TOOL_MODULE = """
+from janis_core import CommandTool, ToolInput, ToolOutput, String, Stdout
+
+
+class _MockTool(CommandTool):
+    def base_command(self):
+        return "echo"
+
+    def inputs(self):
+        return [ToolInput("inp", String(), position=1)]
+
+    def outputs(self):
+        return [ToolOutput("out", Stdout())]
+
+    def container(self):
+        return "ubuntu:latest"
+
+
+class RegEchoV1(_MockTool):
+    def tool(self):
+        return "RegEcho"
+
+    def friendly_name(self):
+        return "Registry echo"
+
+    def version(self):
+        return "v1.0"
+
+
+class RegEchoV2(RegEchoV1):
+    def version(self):
+        return "v2.0"
+
+
+class RegCat(_MockTool):
+    def tool(self):
+        return "RegCat"
+
+    def version(self):
+        return "1"
+"""
+
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        package = os.path.join(self.tmpdir.name, "janis_mockregistry")
+        os.makedirs(package)
+        for filename, contents in [("__init__.py", ""), ("tools.py", TOOL_MODULE)]:
+            with open(os.path.join(package, filename), "w+") as f:
+                f.write(contents)
+
+        sys.path.insert(0, self.tmpdir.name)
+        self.addCleanup(sys.path.remove, self.tmpdir.name)
+        self.addCleanup(self.forget_package)
+
+        snapshot = ShedSnapshot(
+            modules=["janis_mockregistry"],
+            path=os.path.join(self.tmpdir.name, "snapshot.json"),
+        )
+        self.registry = ToolRegistry.from_snapshot(snapshot.hydrate())
+
+    @staticmethod
+    def forget_package():
+        for m in [m for m in sys.modules if m.split(".")[0] == "janis_mockregistry"]:
+            del sys.modules[m]
+
+    def test_entry_from_record(self):
+        entry = self.registry.get("RegEcho", "v1.0")
+        self.assertEqual("RegEcho/v1.0", entry.versioned_id())
+        self.assertEqual("janis_mockregistry.tools", entry.module)
+        self.assertEqual("RegEchoV1", entry.attr)
+        self.assertEqual("Registry echo", entry.friendly_name)
+        self.assertEqual("command-tool", entry.tool_type)
+
+    def test_versioned_lookup(self):
+        self.assertEqual(3, len(self.registry))
+        # ids and versions aren't case sensitive
+        self.assertEqual("v1.0", self.registry.get("regecho", "V1.0").version)
+        # the latest version, by default
+        self.assertEqual("v2.0", self.registry.get("RegEcho").version)
+        self.assertIsNone(self.registry.get("RegEcho", "v3.0"))
+        self.assertIsNone(self.registry.get("NotATool"))
+
+    def test_by_id(self):
+        by_id = self.registry.by_id()
+        self.assertEqual({"RegEcho", "RegCat"}, set(by_id))
+        self.assertEqual({"v1.0", "v2.0"}, set(by_id["RegEcho"]))
+
+    def test_tool_is_built_when_dereferenced_and_released(self):
+        entry = self.registry.get("RegEcho", "v2.0")
+        self.assertFalse(entry.is_loaded)
+
+        tool = entry.tool()
+        self.assertEqual("v2.0", tool.version())
+        self.assertIs(tool, entry.tool())
+
+        entry.release()
+        self.assertFalse(entry.is_loaded)
+        self.assertIsNot(tool, entry.tool())
+
+    def test_iter_tools_releases_as_it_goes(self):
+        kept = self.registry.get("RegCat").tool()
+        for entry, tool in self.registry.iter_tools():
+            self.assertEqual(entry.version, tool.version())
+            # only the current tool is held (and the one that was already loaded)
+            loaded = [e for e in self.registry if e.is_loaded]
+            self.assertLessEqual(set(loaded), {entry, self.registry.get("RegCat")})
+
+        self.assertEqual(
+            [self.registry.get("RegCat")], [e for e in self.registry if e.is_loaded]
+        )
+        self.assertIs(kept, self.registry.get("RegCat").tool())
+
+        self.registry.release()
+        self.assertFalse(any(e.is_loaded for e in self.registry))
+
+    def test_slots(self):
+        entry = ToolEntry("RegCat", "1", "janis_mockregistry.tools", "RegCat")
+        with self.assertRaises(AttributeError):
+            entry.extra = 1
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+# Budget (in seconds) for `janisdk --help`, this includes the Python startup
+STARTUP_BUDGET = float(os.getenv("JANISDK_STARTUP_BUDGET", "1.0"))
+
+
+class TestStartupTime(unittest.TestCase):
+    def test_help_does_not_import_heavy_modules(self):
+        code = (
+            "import sys\n"
+            "from janisdk.main import build_parser\n"
+            "build_parser().format_help()\n"
+            "heavy = ['janis_core', 'janis_assistant', 'requests']\n"
+            "print(','.join(m for m in heavy if m in sys.modules))\n"
+        )
+        p = subprocess.run(
+            [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+        )
+        self.assertEqual("", p.stdout.decode().strip())
+
+    def test_version_does_not_import_janis_core(self):
+        code = (
+            "import sys\n"
+            "from janisdk.main import run_command\n"
+            "run_command(['version'])\n"
+            "print('janis_core' in sys.modules)\n"
+        )
+        p = subprocess.run(
+            [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+        )
+        version, imported = p.stdout.decode().split()
+        self.assertTrue(version.startswith("v"), version)
+        self.assertEqual("False", imported)
+
+    def test_help_within_budget(self):
+        # best of 3, so a busy machine doesn't make this flaky
+        durations = []
+        for _ in range(3):
+            start = time.time()
+            subprocess.run(
+                [sys.executable, "-m", "janisdk.main", "--help"],
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            durations.append(time.time() - start)
+
+        self.assertLess(
+            min(durations),
+            STARTUP_BUDGET,
+            f"`janisdk --help` took {min(durations):.2f}s (budget {STARTUP_BUDGET}s)",
+        )
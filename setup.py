@@ -56,6 +56,7 @@ setup(
     extras_require={
         "bioinformatics": [fixed_bioinf_version, fixed_pipes_version],
         "doc": ["docutils", "sphinx", "sphinx_rtd_theme", "recommonmark"],
+        "tabular": ["numpy"],
         "ci": [
             "keyring==21.4.0",
             "setuptools",